@@ -0,0 +1,27 @@
+import pytest
+
+from britive.britive import Britive
+
+from .server import FakeBritiveServer
+
+# benchmarks are opt-in - skip them entirely when the plugin is not installed (e.g. plain `pytest -v` via `tox`)
+pytest.importorskip('pytest_benchmark')
+
+
+@pytest.fixture(scope='session')
+def server():
+    with FakeBritiveServer() as fake_server:
+        yield fake_server
+
+
+@pytest.fixture
+def britive(server, monkeypatch):
+    server.reset()
+    monkeypatch.setattr('britive.britive.parse_tenant', lambda tenant: server.host)
+    client = Britive(tenant='benchmark', token='benchmark', query_features=False)
+
+    # the stand-in speaks plain http and retries should measure SDK overhead, not sleeping
+    client.base_url = f'http://{server.host}/api'
+    client.retry_backoff_factor = 0
+    client._initialize_components(query_features=False)
+    return client
@@ -0,0 +1,220 @@
+import csv
+import io
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+class FakeBritiveServer:
+    """
+    Local stand-in for the Britive API, used to benchmark the SDK without a live tenant.
+
+    Implements just enough of the API to exercise each pagination style the SDK supports (`inline`, `audit`,
+    `report` and `secmgr`), profile checkout/checkin, CSV reports and error responses. Latency and throttling
+    (`429`) or unavailability (`503`) responses can be injected to measure retry overhead.
+    """
+
+    def __init__(
+        self, users: int = 1000, audit_events: int = 1000, report_rows: int = 1000, secrets: int = 1000
+    ) -> None:
+        self.users = users
+        self.audit_events = audit_events
+        self.report_rows = report_rows
+        self.secrets = secrets
+        self.page_size = 100
+        self.checkout_polls = 0
+        self.latency = 0.0
+        self.inject_status = None
+        self.inject_every = 0
+        self.request_count = 0
+        self.transactions = {}
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+        self._routes = [
+            ('GET', re.compile(r'/api/users$'), self._users),
+            ('GET', re.compile(r'/api/logs$'), self._logs),
+            ('GET', re.compile(r'/api/reports/(?P<report_id>[^/]+)$'), self._report),
+            ('GET', re.compile(r'/api/reports/(?P<report_id>[^/]+)/csv$'), self._report_csv),
+            ('GET', re.compile(r'/api/v1/secretmanager/vault/secrets$'), self._secrets),
+            ('GET', re.compile(r'/api/access/app-access-status$'), self._access_status),
+            (
+                'POST',
+                re.compile(r'/api/access/(?P<profile_id>[^/]+)/environments/(?P<environment_id>[^/]+)$'),
+                self._checkout,
+            ),
+            ('GET', re.compile(r'/api/access/(?P<transaction_id>[^/]+)/tokens$'), self._tokens),
+            ('PUT', re.compile(r'/api/access/(?P<transaction_id>[^/]+)$'), self._checkin),
+            ('GET', re.compile(r'/api/errors/(?P<status>\d+)/(?P<error_code>[^/]+)$'), self._error),
+        ]
+
+    def __enter__(self) -> 'FakeBritiveServer':
+        return self.start()
+
+    def __exit__(self, *args) -> None:
+        self.stop()
+
+    @property
+    def host(self) -> str:
+        return f'127.0.0.1:{self._server.server_address[1]}'
+
+    def reset(self) -> None:
+        with self._lock:
+            self.checkout_polls = 0
+            self.latency = 0.0
+            self.inject_status = None
+            self.inject_every = 0
+            self.request_count = 0
+            self.transactions = {}
+
+    def start(self) -> 'FakeBritiveServer':
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+
+    def handle(self, method: str, path: str, query: dict) -> tuple:
+        with self._lock:
+            self.request_count += 1
+            inject = self.inject_every and self.request_count % self.inject_every == 0
+
+        if self.latency:
+            time.sleep(self.latency)
+
+        if inject:
+            return self.inject_status, {'errorCode': f'E{self.inject_status}', 'message': 'injected'}, {}
+
+        for route_method, pattern, handler in self._routes:
+            if route_method == method and (match := pattern.match(path)):
+                return handler(query, **match.groupdict())
+        return 404, {'errorCode': 'E0000', 'message': f'{method} {path} not found'}, {}
+
+    def _handler(self) -> type:
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            disable_nagle_algorithm = True
+
+            def _dispatch(self) -> None:
+                if length := int(self.headers.get('Content-Length') or 0):
+                    self.rfile.read(length)
+                url = urlparse(self.path)
+                query = {k: v[0] for k, v in parse_qs(url.query).items()}
+                status, body, headers = server.handle(self.command, url.path, query)
+                if isinstance(body, str):
+                    content, content_type = body.encode('utf-8'), 'text/csv'
+                else:
+                    content, content_type = json.dumps(body).encode('utf-8'), 'application/json'
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(content)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(content)
+
+            do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = _dispatch
+
+            def log_message(self, *args) -> None:
+                pass
+
+        return Handler
+
+    def _users(self, query: dict) -> tuple:
+        page, size = int(query.get('page', 0)), int(query.get('size', self.page_size))
+        data = [
+            {'userId': f'user-{i}', 'username': f'user{i}', 'email': f'user{i}@example.com', 'status': 'active'}
+            for i in range(page * size, min(self.users, (page + 1) * size))
+        ]
+        return 200, {'count': self.users, 'page': page, 'size': size, 'data': data}, {}
+
+    def _next_page(self, path: str, offset: int, total: int) -> dict:
+        if offset + self.page_size >= total:
+            return {}
+        return {'next-page': f'http://{self.host}{path}?offset={offset + self.page_size}'}
+
+    def _logs(self, query: dict) -> tuple:
+        offset = int(query.get('offset', 0))
+        events = [
+            {
+                'id': f'event-{i}',
+                'timestamp': f'2026-01-01T00:{i // 60 % 60:02d}:{i % 60:02d}.000Z',
+                'actor': {'displayName': f'user{i % 10}'},
+                'event': {'eventType': 'profile.checkout' if i % 2 else 'profile.checkin'},
+                'target': {'displayName': f'profile{i % 5}'},
+            }
+            for i in range(offset, min(self.audit_events, offset + self.page_size))
+        ]
+        return 200, events, self._next_page('/api/logs', offset, self.audit_events)
+
+    def _rows(self, start: int, stop: int) -> list:
+        return [
+            {'user': f'user{i}', 'profile': f'profile{i % 5}', 'tags': json.dumps([f'tag{i % 3}'])}
+            for i in range(start, stop)
+        ]
+
+    def _report(self, query: dict, report_id: str) -> tuple:
+        offset = int(query.get('offset', 0))
+        body = {'reportId': report_id, 'data': self._rows(offset, min(self.report_rows, offset + self.page_size))}
+        return 200, body, self._next_page(f'/api/reports/{report_id}', offset, self.report_rows)
+
+    def _report_csv(self, query: dict, report_id: str) -> tuple:
+        output = io.StringIO()
+        writer = csv.DictWriter(output, fieldnames=['user', 'profile', 'tags'], quoting=csv.QUOTE_ALL)
+        writer.writeheader()
+        writer.writerows(self._rows(0, self.report_rows))
+        return 200, output.getvalue(), {}
+
+    def _secrets(self, query: dict) -> tuple:
+        offset = int(query.get('offset', 0))
+        result = [
+            {'name': f'secret{i}', 'path': f'/secret{i}'}
+            for i in range(offset, min(self.secrets, offset + self.page_size))
+        ]
+        next_url = self._next_page('/api/v1/secretmanager/vault/secrets', offset, self.secrets).get('next-page', '')
+        return 200, {'result': result, 'pagination': {'next': next_url}}, {}
+
+    def _access_status(self, query: dict) -> tuple:
+        with self._lock:
+            for transaction in self.transactions.values():
+                if transaction['status'] == 'checkOutSubmitted':
+                    transaction['polls'] += 1
+                    if transaction['polls'] > self.checkout_polls:
+                        transaction['status'] = 'checkedOut'
+            return 200, [{k: v for k, v in t.items() if k != 'polls'} for t in self.transactions.values()], {}
+
+    def _checkout(self, query: dict, profile_id: str, environment_id: str) -> tuple:
+        with self._lock:
+            transaction_id = f'transaction-{len(self.transactions)}-{profile_id}-{environment_id}'
+            transaction = {
+                'transactionId': transaction_id,
+                'papId': profile_id,
+                'environmentId': environment_id,
+                'accessType': query.get('accessType', 'PROGRAMMATIC'),
+                'status': 'checkOutSubmitted',
+                'checkedIn': None,
+                'polls': 0,
+            }
+            self.transactions[transaction_id] = transaction
+        return 200, {k: v for k, v in transaction.items() if k != 'polls'}, {}
+
+    def _tokens(self, query: dict, transaction_id: str) -> tuple:
+        return 200, {'accessKeyID': 'AKIA', 'secretAccessKey': 'secret', 'sessionToken': transaction_id}, {}
+
+    def _checkin(self, query: dict, transaction_id: str) -> tuple:
+        with self._lock:
+            transaction = self.transactions.pop(transaction_id)
+        return 200, {**{k: v for k, v in transaction.items() if k != 'polls'}, 'status': 'checkedIn'}, {}
+
+    def _error(self, query: dict, status: str, error_code: str) -> tuple:
+        return int(status), {'errorCode': error_code, 'message': 'benchmark error', 'details': 'details'}, {}
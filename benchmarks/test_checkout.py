@@ -0,0 +1,19 @@
+def checkout_and_checkin(britive) -> dict:
+    transaction = britive.my_access.checkout(
+        profile_id='profile', environment_id='environment', include_credentials=True
+    )
+    britive.my_access.checkin(transaction_id=transaction['transactionId'])
+    return transaction
+
+
+def test_checkout(benchmark, britive):
+    transaction = benchmark(checkout_and_checkin, britive)
+    assert transaction['status'] == 'checkedOut'
+    assert transaction['credentials']['sessionToken'] == transaction['transactionId']
+
+
+def test_checkout_polling(benchmark, britive, server):
+    # each poll of a pending checkout sleeps for a second so keep the number of rounds small
+    server.checkout_polls = 1
+    transaction = benchmark.pedantic(checkout_and_checkin, args=(britive,), rounds=3)
+    assert transaction['status'] == 'checkedOut'
@@ -0,0 +1,33 @@
+import pytest
+
+from britive.exceptions import BritiveException, NotFound
+from britive.exceptions.badrequest import ProfileApprovalRequiredError
+from britive.exceptions.generic import BritiveGenericError
+from britive.exceptions.unauthorized import AuthenticationFailureError
+from britive.helpers.utils import check_response_for_error
+
+errors = [
+    (400, 'MA-0010', ProfileApprovalRequiredError),
+    (400, 'E1001', BritiveGenericError),
+    (401, 'AU-0000', AuthenticationFailureError),
+    (404, 'E0000', NotFound),
+]
+
+
+def raised(func, *args) -> type:
+    try:
+        func(*args)
+    except BritiveException as e:
+        return type(e)
+    return None
+
+
+@pytest.mark.parametrize('status,error_code,exception', errors)
+def test_error_mapping(benchmark, status, error_code, exception):
+    content = {'errorCode': error_code, 'message': 'benchmark error', 'details': 'details'}
+    assert benchmark(raised, check_response_for_error, status, content) is exception
+
+
+@pytest.mark.parametrize('status,error_code,exception', errors)
+def test_error_response(benchmark, britive, status, error_code, exception):
+    assert benchmark(raised, britive.get, f'{britive.base_url}/errors/{status}/{error_code}') is exception
@@ -0,0 +1,35 @@
+import pytest
+
+
+def test_inline_pagination(benchmark, britive, server):
+    users = benchmark(britive.identity_management.users.list)
+    assert len(users) == server.users
+
+
+def test_audit_pagination(benchmark, britive, server):
+    events = benchmark(britive.audit_logs.logs.query)
+    assert len(events) == server.audit_events
+
+
+def test_report_pagination(benchmark, britive, server):
+    rows = benchmark(britive.get, f'{britive.base_url}/reports/benchmark')
+    assert len(rows) == server.report_rows
+
+
+def test_secmgr_pagination(benchmark, britive, server):
+    secrets = benchmark(britive.get, f'{britive.base_url}/v1/secretmanager/vault/secrets')
+    assert len(secrets) == server.secrets
+
+
+@pytest.mark.parametrize('status', [429, 503])
+def test_inline_pagination_with_retries(benchmark, britive, server, status):
+    server.inject_status = status
+    server.inject_every = 3
+    users = benchmark(britive.identity_management.users.list)
+    assert len(users) == server.users
+
+
+def test_inline_pagination_with_latency(benchmark, britive, server):
+    server.latency = 0.005
+    users = benchmark.pedantic(britive.identity_management.users.list, rounds=5)
+    assert len(users) == server.users
@@ -0,0 +1,9 @@
+def test_report_csv_parsing(benchmark, britive, server):
+    rows = benchmark(britive.reports.run, report_id='benchmark')
+    assert len(rows) == server.report_rows
+    assert rows[0]['tags'] == ['tag0']
+
+
+def test_report_csv(benchmark, britive, server):
+    csv = benchmark(britive.reports.run, report_id='benchmark', csv=True)
+    assert len(csv.splitlines()) == server.report_rows + 1
@@ -2,13 +2,16 @@ from .access_builder import AccessBuilderSettings
 from .accounts import Accounts
 from .advanced_settings import AdvancedSettings
 from .applications import Applications
+from .entitlements import Entitlements
 from .environment_groups import EnvironmentGroups
 from .environments import Environments
 from .groups import Groups
+from .inventory import Inventory
 from .managed_permissions import ManagedPermissions
 from .permissions import Permissions
 from .profiles import Profiles
 from .scans import Scans
+from .topology import Topology
 
 
 class ApplicationManagement:
@@ -17,10 +20,13 @@ class ApplicationManagement:
         self.accounts = Accounts(britive)
         self.advanced_settings = AdvancedSettings(britive)
         self.applications = Applications(britive)
+        self.entitlements = Entitlements(britive)
         self.environment_groups = EnvironmentGroups(britive)
         self.environments = Environments(britive)
         self.groups = Groups(britive)
+        self.inventory = Inventory(britive)
         self.managed_permissions = ManagedPermissions(britive)
         self.permissions = Permissions(britive)
         self.profiles = Profiles(britive)
         self.scans = Scans(britive)
+        self.topology = Topology(britive)
@@ -163,4 +163,7 @@ class Applications:
         """
 
         params = {'appContainerId': application_id}
-        return self.britive.delete(self.base_url, params=params)
+        response = self.britive.delete(self.base_url, params=params)
+        self.britive.forget_root_environment_group(application_id)
+        self.britive.application_management.topology.invalidate(application_id)
+        return response
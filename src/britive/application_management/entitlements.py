@@ -0,0 +1,530 @@
+import gzip
+import json
+import time
+from array import array
+from collections import deque
+from datetime import datetime, timezone
+from typing import Iterable, Union
+
+from britive.application_management.inventory import InventoryState
+from britive.helpers.concurrency import run_concurrently
+
+entitlement_kinds = ('account', 'group', 'permission')
+
+# the associations listed on each kind of record, and whether the record holds (True) or is held by (False) them
+_associations = {
+    'account': (('groups', 'group', True), ('permissions', 'permission', True)),
+    'group': (('accounts', 'account', False), ('permissions', 'permission', True)),
+    'permission': (('accounts', 'account', False), ('groups', 'group', False)),
+}
+
+
+def _reference(reference: Union[dict, str], kind: str) -> tuple:
+    # associations are usually dicts but may be bare ids or names
+    if not isinstance(reference, dict):
+        return reference, None
+    entity_id = reference.get(f'{kind}Id') or reference.get('id') or reference.get('nativeId') or reference.get('name')
+    return entity_id, reference.get('name')
+
+
+class EntitlementNode:
+    """An account, group or permission of an `EntitlementGraph`."""
+
+    __slots__ = ('application_id', 'environment_id', 'id', 'kind', 'name')
+
+    def __init__(self, kind: str, application_id: str, environment_id: str, entity_id: str, name: str) -> None:
+        self.kind = kind
+        self.application_id = application_id
+        self.environment_id = environment_id
+        self.id = entity_id
+        self.name = name
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, EntitlementNode) and all(getattr(self, s) == getattr(other, s) for s in self.__slots__)
+
+    def __hash__(self) -> int:
+        return hash((self.kind, self.application_id, self.environment_id, self.id))
+
+    def __repr__(self) -> str:
+        return (
+            f'EntitlementNode(kind={self.kind!r}, application_id={self.application_id!r}, '
+            f'environment_id={self.environment_id!r}, id={self.id!r}, name={self.name!r})'
+        )
+
+
+class EntitlementGraph:
+    """
+    In-memory graph of which accounts, groups and permissions hold each other.
+
+    An edge points from the holder to what it holds - an account to its groups and permissions, and a group to its
+    permissions. Groups nested in other groups are not loaded, so a permission is only reachable through the groups
+    an account is directly a member of. Nodes are numbered and the edges of each node are kept in compact arrays of
+    node numbers in both directions, so reachability queries never touch the Britive API.
+
+    Build a graph with `britive.application_management.entitlements.build`, and `save` it to rerun analyses later
+    without fetching everything again. `britive.application_management.entitlements.update` keeps a graph current
+    by applying the scan deltas of each environment, using `watermarks` (the last scan applied to each environment,
+    keyed by `(application_id, environment_id)`) to skip environments which have not been scanned since.
+    """
+
+    def __init__(self) -> None:
+        self.watermarks = {}
+        self._kinds = array('B')
+        self._nodes = []
+        self._out = []
+        self._in = []
+        self._index = {}
+        self._names = {}
+        self._lookup = {}
+
+    def __len__(self) -> int:
+        return len(self._nodes)
+
+    @property
+    def edge_count(self) -> int:
+        """The number of edges in the graph."""
+
+        return sum(len(edges) for edges in self._out)
+
+    def add_node(self, kind: str, application_id: str, environment_id: str, entity_id: str, name: str = None) -> int:
+        """
+        Add an account, group or permission to the graph.
+
+        :param kind: One of `account`, `group` or `permission`.
+        :param application_id: The ID of the application.
+        :param environment_id: The ID of the environment.
+        :param entity_id: The ID of the account, group or permission.
+        :param name: Optionally the name of the account, group or permission.
+        :return: The number of the node. Adding a node which already exists returns its existing number, filling in
+            its name if it was not known yet.
+        """
+
+        key = (kind, application_id, environment_id, entity_id)
+        if (node := self._index.get(key)) is not None:
+            if name and not self._nodes[node].name:
+                self._nodes[node].name = name
+                self._add_name(node)
+            return node
+        node = len(self._nodes)
+        self._kinds.append(entitlement_kinds.index(kind))
+        self._nodes.append(EntitlementNode(kind, application_id, environment_id, entity_id, name))
+        self._out.append(array('I'))
+        self._in.append(array('I'))
+        self._index[key] = node
+        self._lookup.setdefault((kind, entity_id), []).append(node)
+        self._add_name(node)
+        return node
+
+    def add_edge(self, holder: int, held: int) -> bool:
+        """
+        Record that one node holds another.
+
+        :param holder: The number of the holding node, e.g. an account.
+        :param held: The number of the held node, e.g. a permission.
+        :return: True if the edge was added, False if it already existed.
+        """
+
+        if held in self._out[holder]:
+            return False
+        self._out[holder].append(held)
+        self._in[held].append(holder)
+        return True
+
+    def remove_edge(self, holder: int, held: int) -> bool:
+        """
+        Remove the edge between two nodes.
+
+        :param holder: The number of the holding node.
+        :param held: The number of the held node.
+        :return: True if the edge was removed, False if it did not exist.
+        """
+
+        if held not in self._out[holder]:
+            return False
+        self._out[holder].remove(held)
+        self._in[held].remove(holder)
+        return True
+
+    def edges(self, node: int, reverse: bool = False) -> list:
+        """
+        Return the numbers of the nodes directly held by a node.
+
+        :param node: The number of the node.
+        :param reverse: Return the nodes which directly hold the node instead. Defaults to False.
+        :return: List of node numbers.
+        """
+
+        return (self._in if reverse else self._out)[node].tolist()
+
+    def node(self, number: int) -> EntitlementNode:
+        """
+        Return a node by number.
+
+        :param number: The number of the node.
+        :return: The node.
+        """
+
+        return self._nodes[number]
+
+    def find(self, kind: str, id_or_name: str, application_id: str = None, environment_id: str = None) -> list:
+        """
+        Return the numbers of the nodes with the given ID or name.
+
+        :param kind: One of `account`, `group` or `permission`.
+        :param id_or_name: The ID or the exact name of the node.
+        :param application_id: Optionally only return nodes of this application.
+        :param environment_id: Optionally only return nodes of this environment.
+        :return: List of node numbers. Nodes of every application and environment are included unless filtered.
+        """
+
+        numbers = dict.fromkeys(self._lookup.get((kind, id_or_name), []))
+        numbers.update(dict.fromkeys(self._names.get((kind, id_or_name), [])))
+        return [
+            n
+            for n in numbers
+            if (not application_id or self._nodes[n].application_id == application_id)
+            and (not environment_id or self._nodes[n].environment_id == environment_id)
+        ]
+
+    def reachable(self, nodes: Iterable[int], reverse: bool = False, kind: str = None) -> list:
+        """
+        Return every node reachable from the given nodes, following edges transitively.
+
+        :param nodes: The numbers of the nodes to start from.
+        :param reverse: Follow edges from held to holder instead, i.e. find what holds the given nodes. Defaults to
+            False.
+        :param kind: Optionally only return nodes of this kind.
+        :return: List of `EntitlementNode`, excluding the starting nodes.
+        """
+
+        edges = self._in if reverse else self._out
+        wanted = entitlement_kinds.index(kind) if kind else None
+        start = list(nodes)
+        seen = bytearray(len(self._nodes))
+        for node in start:
+            seen[node] = 1
+        queue = deque(start)
+        found = []
+        while queue:
+            for neighbour in edges[queue.popleft()]:
+                if seen[neighbour]:
+                    continue
+                seen[neighbour] = 1
+                queue.append(neighbour)
+                if wanted is None or self._kinds[neighbour] == wanted:
+                    found.append(self._nodes[neighbour])
+        return found
+
+    def who_has(self, permission: str, application_id: str = None, environment_id: str = None) -> list:
+        """
+        Return the accounts which effectively hold a permission, directly or through their groups.
+
+        :param permission: The ID or exact name of the permission.
+        :param application_id: Optionally only consider the permission in this application.
+        :param environment_id: Optionally only consider the permission in this environment. By default the permission
+            is looked up across all environments.
+        :return: List of `EntitlementNode` of kind `account`.
+        """
+
+        nodes = self.find('permission', permission, application_id=application_id, environment_id=environment_id)
+        return self.reachable(nodes, reverse=True, kind='account')
+
+    def what_does(self, account: str, application_id: str = None, environment_id: str = None) -> list:
+        """
+        Return the permissions an account effectively holds, directly or through its groups.
+
+        :param account: The ID or exact name of the account.
+        :param application_id: Optionally only consider the account in this application.
+        :param environment_id: Optionally only consider the account in this environment. By default the account is
+            looked up across all environments.
+        :return: List of `EntitlementNode` of kind `permission`.
+        """
+
+        nodes = self.find('account', account, application_id=application_id, environment_id=environment_id)
+        return self.reachable(nodes, kind='permission')
+
+    def to_dict(self) -> dict:
+        """
+        Return the graph as a JSON serializable dict.
+
+        :return: Dict with keys `nodes` (list of `[kind, application_id, environment_id, id, name]`), `edges` (list
+            of the numbers of the nodes held by each node) and `watermarks` (list of
+            `[application_id, environment_id, watermark]`).
+        """
+
+        return {
+            'nodes': [[n.kind, n.application_id, n.environment_id, n.id, n.name] for n in self._nodes],
+            'edges': [edges.tolist() for edges in self._out],
+            'watermarks': [[*environment, watermark] for environment, watermark in self.watermarks.items()],
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'EntitlementGraph':
+        """
+        Restore a graph saved with `to_dict`.
+
+        :param data: The saved graph.
+        :return: The restored graph.
+        """
+
+        graph = cls()
+        for node in data['nodes']:
+            graph.add_node(*node)
+        for holder, held in enumerate(data['edges']):
+            for node in held:
+                graph.add_edge(holder, node)
+        for application_id, environment_id, watermark in data.get('watermarks') or []:
+            graph.watermarks[(application_id, environment_id)] = watermark
+        return graph
+
+    def save(self, path: str) -> None:
+        """
+        Write the graph to a JSON file, compressed with gzip if `path` ends with `.gz`.
+
+        :param path: The path of the file.
+        :return: None
+        """
+
+        opener = gzip.open if path.endswith('.gz') else open
+        with opener(path, 'wt', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, separators=(',', ':'))
+
+    @classmethod
+    def load(cls, path: str) -> 'EntitlementGraph':
+        """
+        Read a graph written by `save`.
+
+        :param path: The path of the file.
+        :return: The graph.
+        """
+
+        opener = gzip.open if path.endswith('.gz') else open
+        with opener(path, 'rt', encoding='utf-8') as f:
+            return cls.from_dict(json.load(f))
+
+    def _add_name(self, node: int) -> None:
+        n = self._nodes[node]
+        if n.name:
+            self._names.setdefault((n.kind, n.name), []).append(node)
+
+
+def _scan_time(value) -> Union[datetime, None]:
+    # scan history timestamps are ISO 8601 strings (usually with a trailing `Z`) or epoch milliseconds
+    if isinstance(value, (int, float)):
+        return datetime.fromtimestamp(value / 1000, tz=timezone.utc)
+    try:
+        parsed = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def _watermarks(history: list) -> dict:
+    # the latest successful scan of each environment in a scan history, as an `[ISO 8601 time, task id]` pair - scans
+    # are compared by their parsed time, with the task id only breaking ties
+    latest = {}
+    for scan in history or []:
+        environment_id = scan.get('environmentId') or scan.get('envId')
+        if not environment_id or scan.get('status') not in (None, 'Success'):
+            continue
+        when = next((scan[k] for k in ('endTime', 'completedOn', 'startTime', 'createdOn') if scan.get(k)), None)
+        if when is None or (when := _scan_time(when)) is None:
+            continue
+        key = (when, str(scan.get('taskId') or scan.get('id') or ''))
+        if environment_id not in latest or key > latest[environment_id]:
+            latest[environment_id] = key
+    return {environment_id: [when.isoformat(), task_id] for environment_id, (when, task_id) in latest.items()}
+
+
+class Entitlements:
+    """Build and update an `EntitlementGraph` of the accounts, groups and permissions of the tenant."""
+
+    def __init__(self, britive) -> None:
+        self.britive = britive
+
+    def build(
+        self,
+        application_ids: Iterable[str] = None,
+        state: InventoryState = None,
+        application_workers: int = 4,
+        workers: int = 8,
+        retries: int = 2,
+    ) -> EntitlementGraph:
+        """
+        Crawl the accounts, groups and permissions of every environment, with their associations, into a graph.
+
+        The crawl is done by `britive.application_management.inventory.crawl`, so it is concurrent and goes through
+        the client throttle (`britive.throttle`), and listings which failed are recorded in `state`.
+
+        :param application_ids: Optionally only include these applications. Defaults to every application.
+        :param state: Optional `InventoryState` to track the crawl with. Inspect `state.failed` for the listings which
+            could not be fetched, as the graph will be incomplete for their environments.
+        :param application_workers: The number of applications to walk concurrently. Defaults to 4.
+        :param workers: The number of listings to fetch concurrently. Defaults to 8.
+        :param retries: The number of times to retry a listing which failed with a transient error. Defaults to 2.
+        :return: The entitlement graph, with the latest scan of each environment as its watermark.
+        """
+
+        graph = EntitlementGraph()
+        associations = []
+        for record in self.britive.application_management.inventory.crawl(
+            application_ids=application_ids,
+            kinds=('environment', *entitlement_kinds),
+            include_associations=True,
+            state=state,
+            application_workers=application_workers,
+            workers=workers,
+            retries=retries,
+        ):
+            graph.watermarks.setdefault((record.application_id, record.environment_id), None)
+            if record.kind == 'environment':
+                continue
+            entity_id, name = _reference(record.data, record.kind)
+            node = graph.add_node(record.kind, record.application_id, record.environment_id, entity_id, name)
+            associations.append((node, record))
+
+        # associations are resolved once every record is known, as they may refer to a record by name only
+        for node, record in associations:
+            for field, kind, holds in _associations[record.kind]:
+                for reference in record.data.get(field) or []:
+                    other = self._resolve(graph, kind, record.application_id, record.environment_id, reference)
+                    graph.add_edge(*((node, other) if holds else (other, node)))
+
+        # scans which completed during the crawl are applied again by the next `update`, which is harmless
+        for (application_id, environment_id), watermark in self._latest_scans(graph, workers, retries).items():
+            graph.watermarks[(application_id, environment_id)] = watermark
+        return graph
+
+    def update(self, graph: EntitlementGraph, workers: int = 8, retries: int = 2) -> dict:
+        """
+        Bring a graph up to date by applying the membership changes of the last scan of each environment.
+
+        The scan history of each application in the graph is checked first and only environments which have been
+        scanned since their watermark have their deltas (see `britive.application_management.scans.diff`) fetched -
+        for permissions, groups and accounts, all concurrently through the client throttle (`britive.throttle`).
+        The deltas are applied to the graph in place and the watermark of an environment is only moved once all three
+        of its deltas were applied, so an environment which failed is attempted again by the next update.
+
+        Environments are scanned as a whole, so an environment which has been scanned more than once since the last
+        update is only brought up to date by its last scan - rebuild the graph if updates may have been missed.
+
+        :param graph: The graph to update.
+        :param workers: The number of requests to send concurrently. Defaults to 8.
+        :param retries: The number of times to retry a request which failed with a transient error. Defaults to 2.
+        :return: Dict with keys `environments` (the number of environments which were updated), `current` (the
+            number which had not been scanned since their watermark), `added` and `removed` (the number of edges),
+            `failed` (list of dicts with keys `application_id`, `environment_id`, `resource` and `error`) and `seconds`.
+        """
+
+        started = time.monotonic()
+        latest = self._latest_scans(graph, workers, retries)
+        due = [e for e in graph.watermarks if latest.get(e) is None or latest[e] != graph.watermarks[e]]
+        report = {
+            'environments': 0,
+            'current': len(graph.watermarks) - len(due),
+            'added': 0,
+            'removed': 0,
+            'failed': [],
+            'seconds': 0.0,
+        }
+        scans = self.britive.application_management.scans
+
+        def diff(item: tuple) -> list:
+            (application_id, environment_id), resource = item
+            return scans.diff(resource, application_id=application_id, environment_id=environment_id)
+
+        items = [(environment, resource) for environment in due for resource in ('permissions', 'groups', 'accounts')]
+        failed = set()
+        deltas = {}
+        for outcome in run_concurrently(
+            diff,
+            items,
+            workers=workers,
+            throttle=self.britive.throttle,
+            retries=retries,
+            backoff_factor=self.britive.retry_backoff_factor,
+            ordered=True,
+        ):
+            (application_id, environment_id), resource = outcome.item
+            if outcome.ok:
+                deltas.setdefault((application_id, environment_id), []).append((resource, outcome.result))
+                continue
+            failed.add((application_id, environment_id))
+            report['failed'].append(
+                {
+                    'application_id': application_id,
+                    'environment_id': environment_id,
+                    'resource': resource,
+                    'error': str(outcome.error),
+                }
+            )
+
+        for environment in due:
+            if environment in failed:
+                continue
+            for resource, delta in deltas.get(environment, []):
+                added, removed = self._apply(graph, *environment, resource[:-1], delta)
+                report['added'] += added
+                report['removed'] += removed
+            graph.watermarks[environment] = latest.get(environment)
+            report['environments'] += 1
+
+        report['seconds'] = time.monotonic() - started
+        return report
+
+    def _latest_scans(self, graph: EntitlementGraph, workers: int, retries: int) -> dict:
+        # the latest successful scan of every environment of the graph, from the scan history of each application
+        scans = self.britive.application_management.scans
+        latest = {}
+        for outcome in run_concurrently(
+            scans.history,
+            list(dict.fromkeys(application_id for application_id, _ in graph.watermarks)),
+            workers=workers,
+            throttle=self.britive.throttle,
+            retries=retries,
+            backoff_factor=self.britive.retry_backoff_factor,
+        ):
+            if outcome.ok:  # without a history the environments of the application are always updated
+                for environment_id, watermark in _watermarks(outcome.result).items():
+                    latest[(outcome.item, environment_id)] = watermark
+        return latest
+
+    @classmethod
+    def _apply(cls, graph: EntitlementGraph, application_id: str, environment_id: str, kind: str, delta: list) -> tuple:
+        added = removed = 0
+        for record in delta or []:
+            entity_id, name = _reference(record, kind)
+            node = graph.add_node(kind, application_id, environment_id, entity_id, name)
+            if record.get('scanStatus') == 'Deleted':
+                removed += sum(graph.remove_edge(node, other) for other in graph.edges(node))
+                removed += sum(graph.remove_edge(other, node) for other in graph.edges(node, reverse=True))
+                continue
+            for field, other_kind, holds in _associations[kind]:
+                if field not in record:
+                    continue
+                references = record[field] or []
+                listed = set()
+                for reference in references:
+                    other = cls._resolve(graph, other_kind, application_id, environment_id, reference)
+                    edge = (node, other) if holds else (other, node)
+                    if isinstance(reference, dict) and reference.get('scanStatus') == 'Deleted':
+                        removed += graph.remove_edge(*edge)
+                    else:
+                        listed.add(other)
+                        added += graph.add_edge(*edge)
+                if any(isinstance(r, dict) and 'scanStatus' in r for r in references):
+                    continue
+                # without a status per membership the list is the complete set of memberships, so drop the rest
+                for other in graph.edges(node, reverse=not holds):
+                    if other not in listed and graph.node(other).kind == other_kind:
+                        removed += graph.remove_edge(*((node, other) if holds else (other, node)))
+        return added, removed
+
+    @staticmethod
+    def _resolve(
+        graph: EntitlementGraph, kind: str, application_id: str, environment_id: str, reference: Union[dict, str]
+    ) -> int:
+        entity_id, name = _reference(reference, kind)
+        if nodes := graph.find(kind, entity_id, application_id=application_id, environment_id=environment_id):
+            return nodes[0]
+        return graph.add_node(kind, application_id, environment_id, entity_id, name)
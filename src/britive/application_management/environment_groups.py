@@ -24,7 +24,10 @@ class EnvironmentGroups:
             'parentId': parent_id or self.get_or_create_root(application_id=application_id),
         }
 
-        return self.britive.post(f'{self.base_url}/{application_id}/root-environment-group/groups', json=data)
+        group = self.britive.post(f'{self.base_url}/{application_id}/root-environment-group/groups', json=data)
+        self.britive.forget_root_environment_group(application_id)
+        self.britive.application_management.topology.invalidate(application_id)
+        return group
 
     def get_or_create_root(self, application_id: str) -> str:
         """
@@ -41,26 +44,32 @@ class EnvironmentGroups:
         :return: ID of the root environment group for the given application.
         """
 
-        groups = self.list(application_id=application_id)
-        root_id = None
-        for group in groups:
-            if group['name'].lower() == 'root' and group['parentId'] == '' and group['type'] == 'group':
-                root_id = group['id']
-                break
+        # always checked live - a root created or removed elsewhere must not lead to a duplicate or dangling root
+        root_id = self._find_root(self.list(application_id=application_id))
 
         if not root_id:
             data = {'name': 'root', 'type': 'group', 'description': '', 'parentId': ''}
-
             root_id = self.britive.post(f'{self.base_url}/{application_id}/root-environment-group/groups', json=data)[
                 'id'
             ]
+            self.britive.forget_root_environment_group(application_id)
+            self.britive.application_management.topology.invalidate(application_id)
 
         return root_id
 
+    @staticmethod
+    def _find_root(groups) -> str:
+        for group in groups:
+            if group['name'].lower() == 'root' and group['parentId'] == '' and group['type'] == 'group':
+                return group['id']
+        return None
+
     def get(self, application_id: str, environment_group_id: str) -> dict:
         """
         Return details about the specified environment group.
 
+        For repeated lookups `application_management.topology.lookup` answers from a cached application topology.
+
         :param application_id: The ID of the application where the environment group resides.
         :param environment_group_id: The ID of the environment group.
         :return: Details about the specified environment group.
@@ -94,4 +103,7 @@ class EnvironmentGroups:
         :return: None
         """
 
-        return self.britive.delete(f'{self.base_url}/{application_id}/environment-groups/{environment_group_id}')
+        response = self.britive.delete(f'{self.base_url}/{application_id}/environment-groups/{environment_group_id}')
+        self.britive.forget_root_environment_group(application_id)
+        self.britive.application_management.topology.invalidate(application_id)
+        return response
@@ -25,12 +25,18 @@ class Environments:
             or self.britive.application_management.environment_groups.get_or_create_root(application_id=application_id),
         }
 
-        return self.britive.post(f'{self.base_url}/{application_id}/root-environment-group/environments', json=data)
+        environment = self.britive.post(
+            f'{self.base_url}/{application_id}/root-environment-group/environments', json=data
+        )
+        self.britive.application_management.topology.invalidate(application_id)
+        return environment
 
     def get(self, application_id: str, environment_id: str) -> dict:
         """
         Return details about the specified environment.
 
+        For repeated lookups `application_management.topology.lookup` answers from a cached application topology.
+
         :param application_id: The ID of the application where the environment resides.
         :param environment_id: The ID of the environment.
         :return: Details about the environment.
@@ -79,9 +85,11 @@ class Environments:
         data = {'propertyTypes': []}
         for key, value in kwargs.items():
             data['propertyTypes'].append({'name': key, 'value': value, 'defaultValue': value})
-        return self.britive.patch(
+        response = self.britive.patch(
             f'{self.base_url}/{application_id}/environments/{environment_id}/properties', json=data
         )
+        self.britive.application_management.topology.invalidate(application_id)
+        return response
 
     def scan(self, application_id: str, environment_id: str) -> dict:
         """
@@ -114,4 +122,6 @@ class Environments:
         :return: None
         """
 
-        return self.britive.delete(f'{self.base_url}/{application_id}/environments/{environment_id}')
+        response = self.britive.delete(f'{self.base_url}/{application_id}/environments/{environment_id}')
+        self.britive.application_management.topology.invalidate(application_id)
+        return response
@@ -0,0 +1,218 @@
+import contextlib
+import threading
+import time
+from typing import Iterable, Iterator
+
+from britive.exceptions import RootEnvironmentGroupNotFound
+from britive.helpers.concurrency import get_all_pages, run_concurrently
+
+record_kinds = ('application', 'environment', 'profile', 'account', 'permission', 'group')
+environment_kinds = ('account', 'permission', 'group')
+
+
+class InventoryRecord:
+    """A single entity found by an inventory crawl."""
+
+    __slots__ = ('application_id', 'data', 'environment_id', 'kind')
+
+    def __init__(self, kind: str, application_id: str, environment_id: str, data: dict) -> None:
+        self.kind = kind
+        self.application_id = application_id
+        self.environment_id = environment_id
+        self.data = data
+
+    def __repr__(self) -> str:
+        return (
+            f'InventoryRecord(kind={self.kind!r}, application_id={self.application_id!r}, '
+            f'environment_id={self.environment_id!r})'
+        )
+
+
+class InventoryState:
+    """
+    Progress of an inventory crawl.
+
+    Tracks which units of work (an application itself, its environments or profiles, or the accounts, permissions or
+    groups of an environment) have completed, so a crawl which failed or was interrupted can be resumed by passing the
+    same state (or one restored with `from_dict`) to `Inventory.crawl`. Completed units are not fetched again. Each
+    unit holds records of a single kind and is only completed by a crawl which includes that kind, so the state can
+    also be resumed with more `kinds` than it was started with.
+    """
+
+    def __init__(self, completed: Iterable[str] = None) -> None:
+        self.completed = set(completed or [])
+        self.failed = []
+        self.records = 0
+        self.seconds = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def metrics(self) -> dict:
+        """Throughput of the crawl so far as a dict with keys `units`, `failed`, `records`, `seconds` and
+        `records_per_second`."""
+
+        return {
+            'units': len(self.completed),
+            'failed': len(self.failed),
+            'records': self.records,
+            'seconds': self.seconds,
+            'records_per_second': self.records / self.seconds if self.seconds else 0.0,
+        }
+
+    def to_dict(self) -> dict:
+        """
+        Return the state as a JSON serializable dict.
+
+        :return: Dict with keys `completed` and `failed`.
+        """
+
+        return {'completed': sorted(self.completed), 'failed': list(self.failed)}
+
+    @classmethod
+    def from_dict(cls, state: dict) -> 'InventoryState':
+        """
+        Restore a state saved with `to_dict`.
+
+        :param state: The saved state.
+        :return: The restored state. Failed units are attempted again when the crawl is resumed.
+        """
+
+        return cls(completed=state.get('completed'))
+
+
+class Inventory:
+    """
+    Crawl the application inventory of a tenant - applications, their environments and profiles, and the accounts,
+    permissions and groups of each environment.
+    """
+
+    def __init__(self, britive) -> None:
+        self.britive = britive
+        self.base_url = f'{self.britive.base_url}/apps'
+
+    def crawl(
+        self,
+        application_ids: Iterable[str] = None,
+        kinds: Iterable[str] = record_kinds,
+        include_associations: bool = False,
+        state: InventoryState = None,
+        application_workers: int = 4,
+        workers: int = 8,
+        retries: int = 2,
+    ) -> Iterator[InventoryRecord]:
+        """
+        Stream the inventory of the tenant as `InventoryRecord` objects.
+
+        The hierarchy is walked with a bounded pool per level - `application_workers` applications have their
+        environments fetched at once, feeding a pool of `workers` which fetch the profiles of each application and the
+        accounts, permissions and groups of each environment. Every request also passes through the client throttle
+        (`britive.throttle`) and the pages of each listing are fetched concurrently. Records are yielded as they arrive
+        so memory use stays bounded regardless of the size of the tenant.
+
+        A unit of work which fails (after `retries` retries of transient errors) is recorded in `state.failed` and
+        the crawl carries on. Pass the same `state` again to fetch only the units which did not complete.
+
+        :param application_ids: Optionally only crawl these applications. Defaults to every application.
+        :param kinds: The kinds of records to yield. Valid values are `application`, `environment`, `profile`,
+            `account`, `permission` and `group`. Defaults to all of them.
+        :param include_associations: Include the associations of each account, permission and group (e.g. the groups
+            and permissions of an account) in the records. Defaults to False.
+        :param state: Optional `InventoryState` to track progress with and resume from. Inspect `state.metrics` for
+            the throughput of the crawl.
+        :param application_workers: The number of applications to walk concurrently. Defaults to 4.
+        :param workers: The number of profile, account, permission and group listings to fetch concurrently.
+            Defaults to 8.
+        :param retries: The number of times to retry a listing which failed with a transient error. Defaults to 2.
+        :return: Generator of `InventoryRecord`.
+        """
+
+        kinds = set(kinds)
+        if invalid := kinds - set(record_kinds):
+            raise ValueError(f'invalid kinds {sorted(invalid)}')
+        state = state or InventoryState()
+        options = {
+            'throttle': self.britive.throttle,
+            'retries': retries,
+            'backoff_factor': self.britive.retry_backoff_factor,
+        }
+        params = {'includeMembers': include_associations}
+        started = time.monotonic()
+
+        applications = self.britive.get(self.base_url)
+        if application_ids is not None:
+            wanted = set(application_ids)
+            applications = [a for a in applications if a['appContainerId'] in wanted]
+
+        def walk_application(application: dict) -> tuple:
+            application_id = application['appContainerId']
+            environments = self.britive.get(f'{self.base_url}/{application_id}/environments') or []
+            environment_ids = [e.get('environmentId') or e.get('id') for e in environments]
+            if not environment_ids:
+                # applications without environments keep their accounts, permissions and groups on the root group
+                with contextlib.suppress(RootEnvironmentGroupNotFound):
+                    environment_ids = [self.britive.get_root_environment_group(application_id)]
+            return environments, environment_ids
+
+        def units() -> Iterator[tuple]:
+            # each unit is (name, application id, environment id, kind, records) - records are already known for
+            # application level units, and fetched by `fetch` for the rest
+            for outcome in run_concurrently(walk_application, applications, workers=application_workers, **options):
+                application = outcome.item
+                application_id = application['appContainerId']
+                if not outcome.ok:
+                    self._fail(state, f'{application_id}/environments', outcome.error)
+                    continue
+                environments, environment_ids = outcome.result
+                if 'application' in kinds and f'{application_id}/application' not in state.completed:
+                    records = [InventoryRecord('application', application_id, None, application)]
+                    yield f'{application_id}/application', application_id, None, 'application', records
+                if 'environment' in kinds and f'{application_id}/environments' not in state.completed:
+                    records = [
+                        InventoryRecord('environment', application_id, environment_id, environment)
+                        for environment, environment_id in zip(environments, environment_ids)
+                    ]
+                    yield f'{application_id}/environments', application_id, None, 'environment', records
+                if 'profile' in kinds and f'{application_id}/profiles' not in state.completed:
+                    yield f'{application_id}/profiles', application_id, None, 'profile', None
+                for environment_id in environment_ids:
+                    for kind in environment_kinds:
+                        name = f'{application_id}/{environment_id}/{kind}s'
+                        if kind in kinds and name not in state.completed:
+                            yield name, application_id, environment_id, kind, None
+
+        def fetch(unit: tuple) -> list:
+            _, application_id, environment_id, kind, records = unit
+            if records is not None:
+                return records
+            if kind == 'profile':
+                url, unit_params = f'{self.base_url}/{application_id}/paps', {'view': 'summary'}
+            else:
+                url = f'{self.base_url}/{application_id}/environments/{environment_id}/{kind}s'
+                unit_params = params
+            data = get_all_pages(self.britive, url, unit_params) or []
+            return [InventoryRecord(kind, application_id, environment_id, d) for d in data]
+
+        try:
+            # listings throttle each of their pages themselves, so this level must not hold a slot of the throttle too
+            listing_options = {**options, 'throttle': None}
+            for outcome in run_concurrently(fetch, units(), workers=workers, **listing_options):
+                name = outcome.item[0]
+                if not outcome.ok:
+                    self._fail(state, name, outcome.error)
+                    continue
+                for record in outcome.result:
+                    state.records += 1
+                    yield record
+                self._complete(state, name)
+        finally:
+            state.seconds += time.monotonic() - started
+
+    @staticmethod
+    def _complete(state: InventoryState, unit: str) -> None:
+        with state._lock:
+            state.completed.add(unit)
+
+    @staticmethod
+    def _fail(state: InventoryState, unit: str, error: Exception) -> None:
+        with state._lock:
+            state.failed.append({'unit': unit, 'error': str(error)})
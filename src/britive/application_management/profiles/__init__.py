@@ -1,5 +1,12 @@
+import contextlib
+import json
+import time
+from typing import Callable, Iterable, Iterator, Union
+
 from britive import exceptions
 from britive.application_management.advanced_settings import AdvancedSettings
+from britive.exceptions.badrequest import BritiveBadRequestException
+from britive.helpers.concurrency import BulkReport, get_all_pages, run_concurrently
 
 from .additional_settings import AdditionalSettings
 from .permissions import Permissions
@@ -24,6 +31,116 @@ update_fields_to_keep: list = list(
     set(list(creation_defaults) + ['name']) - set(['excludeAdminFromAdminRelatedCommunication', 'status'])
 )
 
+profile_resources = (
+    'permissions',
+    'policies',
+    'session_attributes',
+    'additional_settings',
+    'advanced_settings',
+    'scopes',
+)
+
+# sub-resources which only exist for some application types - they are exported as None where they do not apply
+optional_resources = ('session_attributes', 'additional_settings', 'advanced_settings')
+not_applicable_exceptions = (exceptions.InvalidRequest, exceptions.NotFound, BritiveBadRequestException)
+
+# keys of an exported policy which identify the source policy and must not be sent when it is created again
+policy_fields_to_drop = ('id', 'policyId', 'resource', 'resources')
+
+
+# the sub-resources reconciled by `Profiles.plan`
+reconciled_resources = ('permissions', 'policies', 'session_attributes', 'scopes')
+
+# the order in which `Profiles.apply` runs operations, as sets of (resource, action)
+apply_stages = (
+    {('profile', 'create'), ('profile', 'update')},
+    {('scopes', 'set')},
+    {(resource, action) for resource in reconciled_resources[:3] for action in ('add', 'update', 'remove')},
+    {('profile', 'delete')},
+)
+
+
+def _operation(name: str, profile_id: str, resource: str, action: str, data=None, entity_id: str = None) -> dict:
+    return {
+        'profile': name,
+        'profile_id': profile_id,
+        'resource': resource,
+        'action': action,
+        'id': entity_id,
+        'data': data,
+    }
+
+
+def _normalized(value):
+    # policy conditions may be returned as stringified json or as a dict
+    if isinstance(value, str) and value.startswith('{'):
+        with contextlib.suppress(ValueError):
+            return json.loads(value)
+    return value
+
+
+def _policy_body(policy: dict) -> dict:
+    # an exported policy without the keys which identify the source policy
+    return {key: value for key, value in policy.items() if key not in policy_fields_to_drop}
+
+
+def _differs(desired: dict, current: dict) -> bool:
+    return any(_normalized(value) != _normalized(current.get(key)) for key, value in desired.items())
+
+
+def _diff_profile(entry: dict, current: dict, profile_id: str) -> list:
+    # the operations needed to turn the current state of a profile (None if it does not exist) into the desired state
+    fields = entry['profile']
+    name = fields['name']
+    operations = []
+    if current is None:
+        # only the fields `create` accepts - an exported profile also holds read only fields such as its ID
+        data = {key: fields[key] for key in creation_defaults if key in fields}
+        operations.append(_operation(name, None, 'profile', 'create', {**data, 'name': name}))
+        current = {}
+    elif changed := {
+        key: fields[key]
+        for key in update_fields_to_keep
+        if key != 'name' and key in fields and fields[key] != current['profile'].get(key)
+    }:
+        operations.append(_operation(name, profile_id, 'profile', 'update', changed))
+
+    if (scopes := entry.get('scopes')) is not None:
+        wanted = [{'type': scope['type'], 'value': scope['value']} for scope in scopes]
+        existing = {(scope['type'], scope['value']) for scope in current.get('scopes') or []}
+        if {(scope['type'], scope['value']) for scope in wanted} != existing:
+            operations.append(_operation(name, profile_id, 'scopes', 'set', wanted))
+
+    if (permissions := entry.get('permissions')) is not None:
+        wanted = {(p['type'], p['name']): p for p in permissions}
+        existing = {(p['type'], p['name']): p for p in current.get('permissions') or []}
+        for key in wanted.keys() - existing.keys():
+            operations.append(_operation(name, profile_id, 'permissions', 'add', {'type': key[0], 'name': key[1]}))
+        for key in existing.keys() - wanted.keys():
+            operations.append(_operation(name, profile_id, 'permissions', 'remove', {'type': key[0], 'name': key[1]}))
+
+    if (policies := entry.get('policies')) is not None:
+        existing = {p['name']: p for p in current.get('policies') or []}
+        for policy in policies:
+            body = _policy_body(policy)
+            if (match := existing.pop(policy['name'], None)) is None:
+                operations.append(_operation(name, profile_id, 'policies', 'add', {**body, 'consumer': 'papservice'}))
+            elif _differs(body, _policy_body(match)):
+                operations.append(_operation(name, profile_id, 'policies', 'update', body, match['id']))
+        for policy in existing.values():
+            operations.append(_operation(name, profile_id, 'policies', 'remove', None, policy['id']))
+
+    if (attributes := entry.get('session_attributes')) is not None:
+        existing = {(a['sessionAttributeType'], a['mappingName']): a for a in current.get('session_attributes') or []}
+        for attribute in attributes:
+            if (match := existing.pop((attribute['sessionAttributeType'], attribute['mappingName']), None)) is None:
+                operations.append(_operation(name, profile_id, 'session_attributes', 'add', attribute))
+            elif _differs(attribute, match):
+                operations.append(_operation(name, profile_id, 'session_attributes', 'update', attribute, match['id']))
+        for attribute in existing.values():
+            operations.append(_operation(name, profile_id, 'session_attributes', 'remove', None, attribute['id']))
+    return operations
+
 
 class Profiles:
     def __init__(self, britive) -> None:
@@ -73,7 +190,9 @@ class Profiles:
         # merge defaults and provided information - keys in kwargs will overwrite the defaults in creation_defaults
         data = {**creation_defaults, **kwargs}  # note python 3.5 or greater but only 3.5 and up are supported so okay!
 
-        return self.britive.post(f'{self.base_url}/{application_id}/paps', json=data)
+        profile = self.britive.post(f'{self.base_url}/{application_id}/paps', json=data)
+        self.britive.application_management.topology.invalidate(application_id)
+        return profile
 
     def list(
         self,
@@ -117,6 +236,68 @@ class Profiles:
 
         return self.britive.get(f'{self.base_url}/{application_id}/paps', params=params)
 
+    def list_all(
+        self,
+        application_ids: Iterable[str] = None,
+        include_policies: bool = False,
+        include_permissions: bool = False,
+        application_workers: int = 4,
+        workers: int = 8,
+        retries: int = 2,
+    ) -> Iterator[dict]:
+        """
+        Stream the profiles of every application.
+
+        The profiles of `application_workers` applications are listed at once, with the pages of each listing fetched
+        concurrently, and the assigned permissions of `workers` profiles are joined at once. Every request passes
+        through the client throttle (`britive.throttle`). Profiles are yielded as they arrive, in no particular order,
+        and only the profiles of the applications and joins in flight are held in memory.
+
+        :param application_ids: Optionally only list the profiles of these applications. Defaults to every
+            application.
+        :param include_policies: Include all policies on each profile and all members on each policy. Defaults to
+            False.
+        :param include_permissions: Include the permissions assigned to each profile (see
+            `permissions.list_assigned`) under the key `permissions`. Defaults to False.
+        :param application_workers: The number of applications to list the profiles of concurrently. Defaults to 4.
+        :param workers: The number of profiles to join the permissions of concurrently. Defaults to 8.
+        :param retries: The number of times to retry a listing which failed with a transient error. Defaults to 2.
+        :return: Generator of profiles, each including the key `appContainerId`.
+        :raises: The error of the first listing which failed, after retries.
+        """
+
+        with self.britive.throttle:
+            applications = [a['appContainerId'] for a in self.britive.get(self.base_url)]
+        if application_ids is not None:
+            wanted = set(application_ids)
+            applications = [a for a in applications if a in wanted]
+        params = {'view': 'includePolicies' if include_policies else 'summary'}
+        # listings throttle each of their pages themselves, so neither level holds a slot of the throttle too
+        options = {'retries': retries, 'backoff_factor': self.britive.retry_backoff_factor}
+
+        def list_profiles(application_id: str) -> list:
+            return get_all_pages(self.britive, f'{self.base_url}/{application_id}/paps', params) or []
+
+        def profiles() -> Iterator[dict]:
+            for outcome in run_concurrently(list_profiles, applications, workers=application_workers, **options):
+                if not outcome.ok:
+                    raise outcome.error
+                for profile in outcome.result:
+                    profile.setdefault('appContainerId', outcome.item)
+                    yield profile
+
+        def join(profile: dict) -> dict:
+            profile['permissions'] = get_all_pages(self.britive, self.permissions.url(profile['papId'])) or []
+            return profile
+
+        if not include_permissions:
+            yield from profiles()
+            return
+        for outcome in run_concurrently(join, profiles(), workers=workers, **options):
+            if not outcome.ok:
+                raise outcome.error
+            yield outcome.result
+
     def get(self, application_id: str, profile_id: str, summary: bool = None) -> dict:
         """
         Return details of the provided profile.
@@ -126,7 +307,8 @@ class Profiles:
         :param summary: Whether to provide a summarized response. Defaults to None to support backwards compatibility
             with the legacy functionality/way of obtaining details of the profile. Setting to True will return a
             summarized set of attributes for the profile. Setting to False will return a larger set of attributes
-            for the profile.
+            for the profile. For repeated lookups of the legacy response `application_management.topology.lookup`
+            answers from a cached application topology.
         :return: Details of the profile.
         :raises: ProfileNotFound if the profile does not exist.
         """
@@ -158,7 +340,9 @@ class Profiles:
         kwargs['appContainerId'] = application_id
         data = {**base, **kwargs}
 
-        return self.britive.patch(f'{self.base_url}/{application_id}/paps/{profile_id}', json=data)
+        response = self.britive.patch(f'{self.base_url}/{application_id}/paps/{profile_id}', json=data)
+        self.britive.application_management.topology.invalidate(application_id)
+        return response
 
     def available_resources(self, profile_id: str, filter_expression: str = None) -> list:
         """
@@ -234,6 +418,113 @@ class Profiles:
 
         return self.britive.delete(f'{self.britive.base_url}/paps/{profile_id}/scopes/{environment_id}')
 
+    def bulk_scope(
+        self,
+        profile_ids: Iterable[str],
+        add: Iterable[Union[str, dict]] = None,
+        remove: Iterable[Union[str, dict]] = None,
+        workers: int = 8,
+        retries: int = 2,
+        progress_func: Callable = None,
+    ) -> dict:
+        """
+        Add scopes to and remove scopes from many profiles.
+
+        The current scopes of every profile are read concurrently and the merged scopes computed per profile. Each
+        profile is then changed with whichever needs fewer calls - a single scope call per environment added or
+        removed (`add_single_environment_scope` and `remove_single_environment_scope`), or one `set_scopes` call with
+        the merged scopes. Single scope calls are used when both need the same number of calls, as they stay fast for
+        profiles with many scopes. Environment group scopes can only be changed with `set_scopes`. All calls are sent
+        concurrently through the client throttle (`britive.throttle`).
+
+        :param profile_ids: The IDs of the profiles to change.
+        :param add: The scopes to add, either environment IDs or dicts with keys `type` (`EnvironmentGroup` or
+            `Environment`) and `value` (the ID).
+        :param remove: The scopes to remove, in the same format as `add`. A scope in both `add` and `remove` is
+            removed.
+        :param workers: The number of requests to send concurrently. Defaults to 8.
+        :param retries: The number of times to retry a request which failed with a transient error. Defaults to 2.
+        :param progress_func: An optional callback invoked with each per profile result as it completes.
+        :return: A report as described by `BulkReport`. `results` are in the order of `profile_ids`, with keys
+            `profile_id`, `status` (`updated`, `unchanged` or `failed`), `method` (`single` or `set`, None if
+            unchanged), `added` and `removed` (lists of scope dicts), `calls` and `error`. `metrics` also include
+            `calls`.
+        """
+
+        def scope_key(scope: Union[str, dict]) -> tuple:
+            return ('Environment', scope) if isinstance(scope, str) else (scope['type'], scope['value'])
+
+        to_add = dict.fromkeys(map(scope_key, add or []))
+        to_remove = dict.fromkeys(map(scope_key, remove or []))
+        report = BulkReport(('updated', 'unchanged', 'failed'), progress_func)
+        options = {
+            'workers': workers,
+            'throttle': self.britive.throttle,
+            'retries': retries,
+            'backoff_factor': self.britive.retry_backoff_factor,
+        }
+        results = {
+            profile_id: {
+                'profile_id': profile_id,
+                'status': 'unchanged',
+                'method': None,
+                'added': [],
+                'removed': [],
+                'calls': 0,
+                'error': None,
+            }
+            for profile_id in dict.fromkeys(profile_ids)
+        }
+
+        calls = []
+        pending = {}
+        for outcome in run_concurrently(self.get_scopes, results, ordered=True, **options):
+            result = results[outcome.item]
+            if not outcome.ok:
+                result.update(status='failed', error=str(outcome.error))
+                report.done(result)
+                continue
+            current = dict.fromkeys(scope_key(scope) for scope in outcome.result or [])
+            added = [key for key in to_add if key not in current and key not in to_remove]
+            removed = [key for key in to_remove if key in current]
+            if not added and not removed:
+                report.done(result)
+                continue
+            result['added'] = [{'type': t, 'value': v} for t, v in added]
+            result['removed'] = [{'type': t, 'value': v} for t, v in removed]
+            if len(added) + len(removed) > 1 or any(t != 'Environment' for t, _ in added + removed):
+                merged = [{'type': t, 'value': v} for t, v in current if (t, v) not in to_remove]
+                result.update(method='set', calls=1)
+                calls.append((outcome.item, 'set', merged + result['added']))
+                continue
+            result.update(method='single', calls=len(added) + len(removed))
+            calls += [(outcome.item, 'add', value) for _, value in added]
+            calls += [(outcome.item, 'remove', value) for _, value in removed]
+
+        def change(call: tuple) -> None:
+            profile_id, method, argument = call
+            if method == 'set':
+                self.set_scopes(profile_id=profile_id, scopes=argument)
+            elif method == 'add':
+                self.add_single_environment_scope(profile_id=profile_id, environment_id=argument)
+            else:
+                self.remove_single_environment_scope(profile_id=profile_id, environment_id=argument)
+
+        for profile_id, _, _ in calls:
+            pending[profile_id] = pending.get(profile_id, 0) + 1
+        for outcome in run_concurrently(change, calls, **options):
+            profile_id = outcome.item[0]
+            result = results[profile_id]
+            if not outcome.ok:
+                result.update(status='failed', error=str(outcome.error))
+            elif result['status'] != 'failed':
+                result['status'] = 'updated'
+            pending[profile_id] -= 1
+            if not pending[profile_id]:
+                report.done(result)
+        report.results.extend(results.values())
+        return report.summarize(calls=sum(result['calls'] for result in results.values()))
+
     def enable(self, application_id: str, profile_id: str) -> dict:
         """
         Enables a profile.
@@ -243,7 +534,9 @@ class Profiles:
         :return: Details of the enabled profile.
         """
 
-        return self.britive.post(f'{self.base_url}/{application_id}/paps/{profile_id}/enabled-statuses')
+        response = self.britive.post(f'{self.base_url}/{application_id}/paps/{profile_id}/enabled-statuses')
+        self.britive.application_management.topology.invalidate(application_id)
+        return response
 
     def disable(self, application_id: str, profile_id: str) -> dict:
         """
@@ -254,7 +547,9 @@ class Profiles:
         :return: Details of the disabled profile.
         """
 
-        return self.britive.post(f'{self.base_url}/{application_id}/paps/{profile_id}/disabled-statuses')
+        response = self.britive.post(f'{self.base_url}/{application_id}/paps/{profile_id}/disabled-statuses')
+        self.britive.application_management.topology.invalidate(application_id)
+        return response
 
     def delete(self, application_id: str, profile_id: str) -> None:
         """
@@ -265,4 +560,379 @@ class Profiles:
         :return: None
         """
 
-        return self.britive.delete(f'{self.base_url}/{application_id}/paps/{profile_id}')
+        response = self.britive.delete(f'{self.base_url}/{application_id}/paps/{profile_id}')
+        self.britive.application_management.topology.invalidate(application_id)
+        return response
+
+    def export(
+        self,
+        application_id: str,
+        profile_ids: Iterable[str] = None,
+        resources: Iterable[str] = profile_resources,
+        workers: int = 8,
+        retries: int = 2,
+    ) -> dict:
+        """
+        Export profiles, with all of their sub-resources, as a self-contained document.
+
+        The details, assigned permissions, policies, session attributes, additional settings, advanced settings and
+        scopes of every profile are fetched concurrently - across profiles as well as within each profile - through
+        the client throttle (`britive.throttle`), followed by the full details of every policy. Pass the document to
+        `import_` to recreate the profiles.
+
+        :param application_id: The ID of the application.
+        :param profile_ids: Optionally only export these profiles. Defaults to every profile of the application.
+        :param resources: The sub-resources to export. Valid values are `permissions`, `policies`,
+            `session_attributes`, `additional_settings`, `advanced_settings` and `scopes`. Defaults to all of them.
+        :param workers: The number of requests to send concurrently. Defaults to 8.
+        :param retries: The number of times to retry a request which failed with a transient error. Defaults to 2.
+        :return: Dict with keys `application_id`, `profiles` (list of dicts with the key `profile` and a key for each
+            of the exported sub-resources), `failed` (list
+            of dicts with keys `profile_id`, `resource` and `error` for each sub-resource which could not be fetched
+            and is None in the document) and `seconds`.
+        """
+
+        resources = set(resources)
+        if invalid := resources - set(profile_resources):
+            raise ValueError(f'invalid resources {sorted(invalid)}')
+        started = time.monotonic()
+        if profile_ids is None:
+            profile_ids = self.britive.application_management.topology.get(application_id, refresh=True).profiles
+        profile_ids = list(dict.fromkeys(profile_ids))
+
+        fetchers = {
+            'profile': lambda profile_id: self.get(application_id=application_id, profile_id=profile_id, summary=False),
+            'permissions': self.permissions.list_assigned,
+            'policies': self.policies.list,
+            'session_attributes': self.session_attributes.list,
+            'additional_settings': self.additional_settings.get,
+            'advanced_settings': self.advanced_settings.get,
+            'scopes': self.get_scopes,
+        }
+        fetchers = {resource: f for resource, f in fetchers.items() if resource == 'profile' or resource in resources}
+        options = {
+            'workers': workers,
+            'throttle': self.britive.throttle,
+            'retries': retries,
+            'backoff_factor': self.britive.retry_backoff_factor,
+            'ordered': True,
+        }
+        profiles = {profile_id: dict.fromkeys(fetchers) for profile_id in profile_ids}
+        document = {'application_id': application_id, 'profiles': list(profiles.values()), 'failed': [], 'seconds': 0.0}
+
+        def fetch(unit: tuple) -> dict:
+            profile_id, resource = unit
+            return fetchers[resource](profile_id)
+
+        def get_policy(unit: tuple) -> dict:
+            profile_id, policy = unit
+            policy_id = policy.get('id') or policy.get('policyId')
+            return self.policies.get(profile_id=profile_id, policy_id=policy_id, condition_as_dict=True)
+
+        units = [(profile_id, resource) for profile_id in profile_ids for resource in fetchers]
+        for outcome in run_concurrently(fetch, units, **options):
+            profile_id, resource = outcome.item
+            if outcome.ok:
+                profiles[profile_id][resource] = outcome.result
+            elif resource not in optional_resources or not isinstance(outcome.error, not_applicable_exceptions):
+                document['failed'].append({'profile_id': profile_id, 'resource': resource, 'error': str(outcome.error)})
+
+        # policy listings are summaries, so the full policy is fetched once every listing is known
+        units = [(profile_id, p) for profile_id in profile_ids for p in profiles[profile_id].get('policies') or []]
+        policies = {profile_id: [] for profile_id in profile_ids}
+        incomplete = set()
+        for outcome in run_concurrently(get_policy, units, **options):
+            profile_id, policy = outcome.item
+            if outcome.ok:
+                policies[profile_id].append(outcome.result)
+                continue
+            incomplete.add(profile_id)
+            document['failed'].append({'profile_id': profile_id, 'resource': 'policies', 'error': str(outcome.error)})
+        for profile_id in profile_ids:
+            if profiles[profile_id].get('policies') is not None:
+                profiles[profile_id]['policies'] = None if profile_id in incomplete else policies[profile_id]
+
+        document['seconds'] = time.monotonic() - started
+        return document
+
+    def import_(
+        self,
+        document: dict,
+        application_id: str = None,
+        workers: int = 8,
+        retries: int = 2,
+        progress_func: Callable = None,
+    ) -> dict:
+        """
+        Create the profiles of a document produced by `export`.
+
+        Profiles are recreated in dependency order - all profiles are created first, then their scopes are set (the
+        permissions available to a profile can depend on its scopes) and finally their permissions, policies, session
+        attributes, additional settings and advanced settings are added. Each stage runs concurrently through the
+        client throttle (`britive.throttle`). A failure does not abort the other profiles, and a profile which could
+        not be created is skipped by the later stages.
+
+        Named `import_` as `import` is a reserved word.
+
+        :param document: The document produced by `export`.
+        :param application_id: The ID of the application to create the profiles in. Defaults to the application the
+            document was exported from.
+        :param workers: The number of requests to send concurrently. Defaults to 8.
+        :param retries: The number of times to retry a request which failed with a transient error. Defaults to 2.
+        :param progress_func: An optional callback invoked with each per profile result as it completes.
+        :return: A report as described by `BulkReport`. `results` are in the order of the document, with keys `name`,
+            `source_profile_id`, `profile_id` (of the new profile), `status` (`imported`, `partial` if the profile
+            was created but some of its sub-resources were not, or `failed`) and `errors` (list of dicts with keys
+            `resource` and `error`).
+        """
+
+        report = BulkReport(('imported', 'partial', 'failed'), progress_func)
+        application_id = application_id or document['application_id']
+        entries = document['profiles']
+        results = report.results
+        results.extend(
+            {
+                'name': entry['profile'].get('name'),
+                'source_profile_id': entry['profile'].get('papId'),
+                'profile_id': None,
+                'status': 'imported',
+                'errors': [],
+            }
+            for entry in entries
+        )
+        options = {
+            'workers': workers,
+            'throttle': self.britive.throttle,
+            'retries': retries,
+            'backoff_factor': self.britive.retry_backoff_factor,
+        }
+
+        def create(index: int) -> str:
+            profile = entries[index]['profile']
+            fields = {key: profile[key] for key in creation_defaults if key in profile}
+            return self.create(application_id=application_id, name=profile['name'], **fields)['papId']
+
+        def apply(step: tuple) -> None:
+            index, _, func, args = step
+            func(results[index]['profile_id'], *args)
+
+        def run(steps: list) -> None:
+            for outcome in run_concurrently(apply, steps, **options):
+                index, resource, _, _ = outcome.item
+                if not outcome.ok:
+                    results[index]['errors'].append({'resource': resource, 'error': str(outcome.error)})
+
+        for outcome in run_concurrently(create, range(len(entries)), **options):
+            if outcome.ok:
+                results[outcome.item]['profile_id'] = outcome.result
+            else:
+                results[outcome.item]['status'] = 'failed'
+                results[outcome.item]['errors'].append({'resource': 'profile', 'error': str(outcome.error)})
+        created = [index for index, result in enumerate(results) if result['profile_id']]
+
+        run(
+            [
+                (index, 'scopes', self.set_scopes, ([{'type': s['type'], 'value': s['value']} for s in scopes],))
+                for index in created
+                if (scopes := entries[index].get('scopes'))
+            ]
+        )
+        run([step for index in created for step in self._import_steps(index, entries[index])])
+
+        for result in results:
+            if result['status'] != 'failed' and result['errors']:
+                result['status'] = 'partial'
+            report.done(result)
+        return report.summarize()
+
+    def _import_steps(self, index: int, entry: dict) -> list:
+        # the calls which recreate the sub-resources of an exported profile, as (index, resource, func, args) tuples
+        steps = [
+            (index, 'permissions', self.permissions.add, (permission['type'], permission['name']))
+            for permission in entry.get('permissions') or []
+        ]
+        for policy in entry.get('policies') or []:
+            steps.append(
+                (index, 'policies', self.policies.create, ({**_policy_body(policy), 'consumer': 'papservice'},))
+            )
+        for attribute in entry.get('session_attributes') or []:
+            if attribute.get('sessionAttributeType') == 'Static':
+                func, args = self.session_attributes.add_static, (attribute['mappingName'], attribute['attributeValue'])
+            else:
+                func, args = (
+                    self.session_attributes.add_dynamic,
+                    (attribute['attributeSchemaId'], attribute['mappingName']),
+                )
+            steps.append((index, 'session_attributes', func, (*args, attribute.get('transitive', False))))
+        if settings := entry.get('additional_settings'):
+            args = (
+                settings.get('useApplicationCredentialType'),
+                settings.get('consoleAccess'),
+                settings.get('programmaticAccess'),
+                settings.get('projectIdForServiceAccount'),
+            )
+            steps.append((index, 'additional_settings', self.additional_settings.create, args))
+        if settings := entry.get('advanced_settings'):
+            steps.append((index, 'advanced_settings', self.advanced_settings.create, (settings,)))
+        return steps
+
+    def plan(
+        self,
+        application_id: str,
+        desired: Iterable[dict],
+        prune: bool = False,
+        workers: int = 8,
+        retries: int = 2,
+    ) -> list:
+        """
+        Compute the minimal changes needed to bring the profiles of an application to the desired state.
+
+        Desired profiles are matched to existing profiles by name. The current state of the matched profiles is
+        fetched concurrently (see `export`) and compared with the desired state, so only the calls needed to reconcile
+        any differences are planned. The plan is also the dry run - nothing is changed until it is passed to `apply`.
+
+        :param application_id: The ID of the application.
+        :param desired: The desired profiles, in the format of the entries of an `export` document - dicts with the
+            key `profile` (the profile fields, `name` being required - only the fields accepted by `create` are
+            reconciled, and `status` only when the profile is created) and optionally `permissions` (list of dicts
+            with keys `name` and `type`), `policies` (list of policies, matched by name), `session_attributes` (list
+            of session attributes, matched by `sessionAttributeType` and `mappingName`) and `scopes` (list of dicts
+            with keys `type` and `value`). Sub-resources which are omitted or None are left as they are, while the
+            sub-resources which are provided are reconciled exactly - anything not desired is removed.
+        :param prune: Delete existing profiles of the application which are not desired. Defaults to False.
+        :param workers: The number of requests to send concurrently. Defaults to 8.
+        :param retries: The number of times to retry a request which failed with a transient error. Defaults to 2.
+        :return: List of operations, each a dict with keys `profile` (the profile name), `profile_id` (None for
+            profiles which are yet to be created), `resource` (`profile`, `scopes`, `permissions`, `policies` or
+            `session_attributes`), `action` (`create`, `update`, `delete`, `set`, `add` or `remove`), `id` (of the
+            policy or session attribute being changed) and `data` (the request body or arguments of the call).
+        :raises: ValueError - If a desired profile has no name, a name is desired twice, or the current state of a
+            profile could not be fetched.
+        """
+
+        desired = list(desired)
+        names = [entry['profile'].get('name') for entry in desired]
+        if not all(names) or len(set(names)) != len(names):
+            raise ValueError('every desired profile requires a unique name.')
+
+        topology = self.britive.application_management.topology.get(application_id, refresh=True)
+        existing = {profile['name']: profile_id for profile_id, profile in topology.profiles.items()}
+        matched = [existing[name] for name in names if name in existing]
+        managed = {
+            resource for entry in desired for resource in reconciled_resources if entry.get(resource) is not None
+        }
+        document = self.export(application_id, profile_ids=matched, resources=managed, workers=workers, retries=retries)
+        if document['failed']:
+            failed = document['failed'][0]
+            raise ValueError(
+                f'could not fetch {failed["resource"]} of profile {failed["profile_id"]}: {failed["error"]}'
+            )
+        current = {entry['profile']['name']: entry for entry in document['profiles']}
+
+        plan = []
+        for entry in desired:
+            name = entry['profile']['name']
+            plan += _diff_profile(entry, current.get(name), existing.get(name))
+        if prune:
+            for name, profile_id in existing.items():
+                if name not in names:
+                    plan.append(_operation(name, profile_id, 'profile', 'delete'))
+        return plan
+
+    def apply(
+        self,
+        application_id: str,
+        plan: list,
+        workers: int = 8,
+        retries: int = 2,
+        progress_func: Callable = None,
+    ) -> dict:
+        """
+        Apply the operations planned by `plan`.
+
+        Operations are applied in dependency order - profiles are created and updated first, then scopes are set,
+        then permissions, policies and session attributes are changed and finally profiles are deleted. The
+        operations of each stage run concurrently through the client throttle (`britive.throttle`). A failure does not
+        abort the other operations, but the operations of a profile which could not be created are skipped.
+
+        :param application_id: The ID of the application.
+        :param plan: The operations returned by `plan`.
+        :param workers: The number of operations to apply concurrently. Defaults to 8.
+        :param retries: The number of times to retry an operation which failed with a transient error. Defaults to 2.
+        :param progress_func: An optional callback invoked with each per operation result as it completes.
+        :return: A report as described by `BulkReport`. `results` are in the order of `plan`, with the keys of the
+            operation plus `status` (`applied`, `failed` or `skipped`) and `error`.
+        """
+
+        report = BulkReport(('applied', 'failed', 'skipped'), progress_func)
+        results = report.results
+        results.extend({**operation, 'status': None, 'error': None} for operation in plan)
+        created = {}
+
+        def execute(result: dict) -> None:
+            profile_id = result['profile_id'] or created.get(result['profile'])
+            if result['resource'] == 'profile' and result['action'] == 'create':
+                created[result['profile']] = self.create(application_id=application_id, **result['data'])['papId']
+            else:
+                self._execute(application_id, profile_id, result)
+
+        for stage in apply_stages:
+            batch = []
+            for result in results:
+                if (result['resource'], result['action']) not in stage or result['status']:
+                    continue
+                if not result['profile_id'] and result['profile'] not in created and result['action'] != 'create':
+                    result['status'] = 'skipped'
+                    result['error'] = 'the profile was not created.'
+                    report.done(result)
+                else:
+                    batch.append(result)
+            for outcome in run_concurrently(
+                execute,
+                batch,
+                workers=workers,
+                throttle=self.britive.throttle,
+                retries=retries,
+                backoff_factor=self.britive.retry_backoff_factor,
+            ):
+                outcome.item['status'] = 'applied' if outcome.ok else 'failed'
+                outcome.item['error'] = None if outcome.ok else str(outcome.error)
+                report.done(outcome.item)
+
+        for result in results:
+            if result['profile_id'] is None and result['profile'] in created:
+                result['profile_id'] = created[result['profile']]
+        return report.summarize()
+
+    def _execute(self, application_id: str, profile_id: str, operation: dict) -> None:
+        resource, action, data = operation['resource'], operation['action'], operation['data']
+        if resource == 'profile':
+            if action == 'update':
+                self.update(application_id=application_id, profile_id=profile_id, **data)
+            else:
+                self.delete(application_id=application_id, profile_id=profile_id)
+        elif resource == 'scopes':
+            self.set_scopes(profile_id=profile_id, scopes=data)
+        elif resource == 'permissions':
+            getattr(self.permissions, action)(profile_id, data['type'], data['name'])
+        elif resource == 'policies':
+            if action == 'add':
+                self.policies.create(profile_id=profile_id, policy=data)
+            elif action == 'update':
+                self.policies.update(profile_id=profile_id, policy_id=operation['id'], policy=data)
+            else:
+                self.policies.delete(profile_id=profile_id, policy_id=operation['id'])
+        elif action == 'remove':
+            self.session_attributes.remove(profile_id=profile_id, attribute_id=operation['id'])
+        else:
+            static = data['sessionAttributeType'] == 'Static'
+            if static:
+                args = (data['mappingName'], data.get('attributeValue'))
+            else:
+                args = (data['attributeSchemaId'], data['mappingName'])
+            if action == 'update':
+                func = self.session_attributes.update_static if static else self.session_attributes.update_dynamic
+                func(profile_id, operation['id'], *args, data.get('transitive', False))
+            else:
+                func = self.session_attributes.add_static if static else self.session_attributes.add_dynamic
+                func(profile_id, *args, data.get('transitive', False))
@@ -4,6 +4,16 @@ class Permissions:
         self.base_url = f'{self.britive.base_url}/paps'
         self.constraints = PermissionConstraints(britive)
 
+    def url(self, profile_id: str) -> str:
+        """
+        Return the URL of the permissions assigned to a profile.
+
+        :param profile_id: The ID of the profile.
+        :return: The URL which the permissions of the profile are listed, added and removed at.
+        """
+
+        return f'{self.base_url}/{profile_id}/permissions'
+
     def add(self, profile_id: str, permission_type: str, permission_name: str) -> dict:
         """
         Add a permission to a profile.
@@ -21,7 +31,7 @@ class Permissions:
 
         data = {'op': 'add', 'permission': {'name': permission_name, 'type': permission_type}}
 
-        return self.britive.post(f'{self.base_url}/{profile_id}/permissions', json=data)
+        return self.britive.post(self.url(profile_id), json=data)
 
     def list_assigned(self, profile_id: str, filter_expression: str = None) -> list:
         """
@@ -38,7 +48,7 @@ class Permissions:
         if filter_expression:
             params['filter'] = filter_expression
 
-        return self.britive.get(f'{self.base_url}/{profile_id}/permissions', params=params)
+        return self.britive.get(self.url(profile_id), params=params)
 
     def list_available(self, profile_id: str) -> list:
         """
@@ -52,7 +62,7 @@ class Permissions:
         """
 
         params = {'page': 0, 'size': 100, 'query': 'available'}
-        return self.britive.get(f'{self.base_url}/{profile_id}/permissions', params=params)
+        return self.britive.get(self.url(profile_id), params=params)
 
     def remove(self, profile_id: str, permission_type: str, permission_name: str) -> dict:
         """
@@ -66,7 +76,7 @@ class Permissions:
 
         data = {'op': 'remove', 'permission': {'name': permission_name, 'type': permission_type}}
 
-        return self.britive.post(f'{self.base_url}/{profile_id}/permissions', json=data)
+        return self.britive.post(self.url(profile_id), json=data)
 
 
 class PermissionConstraints:
@@ -1,3 +1,39 @@
+import contextlib
+import time
+from typing import Iterable, Iterator, Union
+
+from britive.helpers.concurrency import run_concurrently
+
+# task statuses after which a scan will not change any more
+scan_terminal_statuses = ('Success', 'Error', 'Failed', 'Cancelled')
+
+
+class _ScanTask:
+    __slots__ = ('application_id', 'environment_id', 'interval', 'next_poll', 'polls', 'started', 'task', 'task_id')
+
+    def __init__(self, target: dict, task: dict, interval: float) -> None:
+        self.application_id = target['application_id']
+        self.environment_id = target.get('environment_id')
+        self.task = task
+        self.task_id = task['taskId']
+        self.interval = interval
+        self.started = time.monotonic()
+        self.next_poll = self.started + interval
+        self.polls = 0
+
+    def event(self, status: str, error: str = None) -> dict:
+        return {
+            'application_id': self.application_id,
+            'environment_id': self.environment_id,
+            'task_id': self.task_id,
+            'status': status,
+            'task': self.task,
+            'polls': self.polls,
+            'seconds': time.monotonic() - self.started,
+            'error': error,
+        }
+
+
 class Scans:
     def __init__(self, britive) -> None:
         self.britive = britive
@@ -70,3 +106,175 @@ class Scans:
 
         url = f'{self.base_url}/{application_id}/environments/{environment_id}/{resource}/memberships-last-scan-delta'
         return self.britive.get(url)
+
+    def scan_many(
+        self,
+        targets: Iterable[Union[str, dict]],
+        max_concurrent: int = 4,
+        diff: Iterable[str] = None,
+        poll_interval: float = 5,
+        max_poll_interval: float = 60,
+        timeout: float = 3600,
+        retries: int = 2,
+    ) -> Iterator[dict]:
+        """
+        Scan many applications or environments and stream an event as each scan completes.
+
+        At most `max_concurrent` scans are in flight at once - a new scan is started as soon as one completes. The
+        status of every scan in flight is checked by a single poller, which polls each scan after `poll_interval`
+        seconds and then backs off by half as long again after every poll, up to `max_poll_interval` seconds, so long
+        running scans cost few requests while short ones are still noticed quickly. Status checks and diffs are sent
+        concurrently through the client throttle (`britive.throttle`).
+
+        :param targets: The scans to run. Each target is either an application ID or a dict with the key
+            `application_id` and optionally `environment_id` and `org_scan_only` (see `scan`).
+        :param max_concurrent: The maximum number of scans in flight at once. Defaults to 4.
+        :param diff: Optionally the resources (any of `permissions`, `groups` and `accounts`) to retrieve the changes
+            of via `diff` once a scan completes successfully.
+        :param poll_interval: The number of seconds to wait before the first status check of a scan. Defaults to 5.
+        :param max_poll_interval: The maximum number of seconds between status checks of a scan. Defaults to 60.
+        :param timeout: The number of seconds after which a scan is no longer polled and reported as `timed_out`.
+            The scan itself is not cancelled. Defaults to 3600.
+        :param retries: The number of times to retry a status check or diff which failed with a transient error.
+            Starting a scan is never retried, as the scan may have started even though the request failed. Defaults
+            to 2.
+        :return: Generator of dicts, in order of completion, with keys `application_id`, `environment_id`, `task_id`,
+            `status` (the final status of the task, or `failed` if the scan could not be started or polled, or
+            `timed_out`), `task` (the last response of `status`, or of `scan` if never polled), `polls`, `seconds`
+            (from the start of the scan until its completion was noticed), `error` and, if requested, `diff` (dict of
+            each resource to its list of changes, or to None if the diff could not be retrieved) for successful scans.
+        """
+
+        if max_concurrent < 1:
+            raise ValueError('max_concurrent must be at least 1.')
+        resources = list(diff or [])
+        for resource in resources:
+            if resource not in ['permissions', 'groups', 'accounts']:
+                raise ValueError(f'invalid resource {resource}')
+
+        # a failed start is not retried - the first attempt may have started a scan which would then go untracked
+        options = {'throttle': self.britive.throttle, 'backoff_factor': self.britive.retry_backoff_factor}
+        targets = iter({'application_id': t} if isinstance(t, str) else t for t in targets)
+        exhausted = False
+        active = {}
+
+        def start(target: dict) -> dict:
+            task = self.scan(
+                application_id=target['application_id'],
+                environment_id=target.get('environment_id'),
+                org_scan_only=target.get('org_scan_only', False),
+            )
+            if not isinstance(task, dict) or not task.get('taskId'):
+                # reported as a failed scan of this target - there is nothing to poll
+                raise ValueError(f'the scan response did not include a taskId: {task}')
+            return task
+
+        def poll(scan: _ScanTask) -> dict:
+            return self.status(task_id=scan.task_id)
+
+        def get_diff(item: tuple) -> list:
+            event, resource = item
+            return self.diff(resource, application_id=event['application_id'], environment_id=event['environment_id'])
+
+        while True:
+            events = []
+
+            # keep up to `max_concurrent` scans in flight
+            batch = []
+            while not exhausted and len(active) + len(batch) < max_concurrent:
+                if (target := next(targets, None)) is None:
+                    exhausted = True
+                else:
+                    batch.append(target)
+            for outcome in run_concurrently(start, batch, workers=max(len(batch), 1), retries=0, **options):
+                if outcome.ok:
+                    scan = _ScanTask(outcome.item, outcome.result, poll_interval)
+                    active[scan.task_id] = scan
+                else:
+                    target = outcome.item
+                    events.append(
+                        {
+                            'application_id': target['application_id'],
+                            'environment_id': target.get('environment_id'),
+                            'task_id': None,
+                            'status': 'failed',
+                            'task': None,
+                            'polls': 0,
+                            'seconds': outcome.seconds,
+                            'error': str(outcome.error),
+                        }
+                    )
+
+            # poll every scan which is due in one concurrent round
+            now = time.monotonic()
+            due = [scan for scan in active.values() if scan.next_poll <= now]
+            for outcome in run_concurrently(poll, due, workers=max(len(due), 1), retries=retries, **options):
+                scan = outcome.item
+                scan.polls += 1
+                if not outcome.ok:
+                    del active[scan.task_id]
+                    events.append(scan.event('failed', str(outcome.error)))
+                    continue
+                scan.task = outcome.result or {}
+                if scan.task.get('status') in scan_terminal_statuses:
+                    del active[scan.task_id]
+                    events.append(scan.event(scan.task['status']))
+                elif time.monotonic() - scan.started > timeout:
+                    del active[scan.task_id]
+                    events.append(scan.event('timed_out'))
+                else:
+                    scan.interval = min(scan.interval * 1.5, max_poll_interval)
+                    scan.next_poll = time.monotonic() + scan.interval
+
+            # chain the diffs of the scans which just succeeded
+            succeeded = [e for e in events if e['status'] == 'Success']
+            pairs = [(e, resource) for e in succeeded for resource in resources]
+            for event in succeeded:
+                event['diff'] = {}
+            diffs = run_concurrently(
+                get_diff, pairs, workers=max(len(pairs), 1), ordered=True, retries=retries, **options
+            )
+            for outcome in diffs:
+                event, resource = outcome.item
+                event['diff'][resource] = outcome.result if outcome.ok else None
+
+            yield from events
+
+            if not active:
+                if exhausted:
+                    return
+                continue
+            time.sleep(max(min(scan.next_poll for scan in active.values()) - time.monotonic(), 0))
+
+    def scan_and_wait(
+        self,
+        application_id: str,
+        environment_id: str = None,
+        org_scan_only: bool = False,
+        diff: Iterable[str] = None,
+        poll_interval: float = 5,
+        max_poll_interval: float = 60,
+        timeout: float = 3600,
+    ) -> dict:
+        """
+        Initiate a scan and block until it completes.
+
+        The status of the scan is polled with the same backoff as `scan_many`.
+
+        :param application_id: The ID of the application to scan.
+        :param environment_id: Optionally the ID of the environment to scan. See `scan`.
+        :param org_scan_only: Optionally only scan the organization for Azure and GCP.
+        :param diff: Optionally the resources (any of `permissions`, `groups` and `accounts`) to retrieve the changes
+            of via `diff` once the scan completes successfully.
+        :param poll_interval: The number of seconds to wait before the first status check. Defaults to 5.
+        :param max_poll_interval: The maximum number of seconds between status checks. Defaults to 60.
+        :param timeout: The number of seconds after which to stop waiting. Defaults to 3600.
+        :return: The completion event of the scan, as described in `scan_many`.
+        """
+
+        target = {'application_id': application_id, 'environment_id': environment_id, 'org_scan_only': org_scan_only}
+        scans = self.scan_many(
+            [target], diff=diff, poll_interval=poll_interval, max_poll_interval=max_poll_interval, timeout=timeout
+        )
+        with contextlib.closing(scans):
+            return next(scans)
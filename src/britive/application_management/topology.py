@@ -0,0 +1,223 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, Union
+
+from britive.helpers.concurrency import get_all_pages
+
+# the kinds of entity `Topology.lookup` can return
+lookup_kinds = ('environment_group', 'environment', 'profile')
+
+
+class ApplicationTopology:
+    """
+    Point in time view of the environment groups, environments and profiles of a single application.
+
+    Environment groups, environments and profiles are indexed by ID and name, and environment groups hold their child
+    groups and environments, so point lookups and walks of the environment tree are answered without API calls.
+    """
+
+    def __init__(self, application_id: str, application: dict, environments: list, profiles: list) -> None:
+        self.application_id = application_id
+        self.loaded_at = time.monotonic()
+        root = (application or {}).get('rootEnvironmentGroup') or {}
+
+        self.environment_groups = {group['id']: group for group in root.get('environmentGroups') or []}
+        self.environments = {env.get('environmentId') or env.get('id'): env for env in environments or []}
+        self.profiles = {profile['papId']: profile for profile in profiles or []}
+        self.root_id = next((g['id'] for g in self.environment_groups.values() if not g.get('parentId')), None)
+
+        self._groups_by_name = {}
+        self._environments_by_name = {}
+        self._profiles_by_name = {}
+        self._child_groups = {}
+        self._child_environments = {}
+        for group in self.environment_groups.values():
+            self._groups_by_name.setdefault(group.get('name'), []).append(group['id'])
+            if group.get('parentId'):
+                self._child_groups.setdefault(group['parentId'], []).append(group['id'])
+        for env in root.get('environments') or []:
+            self._environments_by_name.setdefault(env.get('name'), []).append(env['id'])
+            self._child_environments.setdefault(env.get('parentGroupId') or self.root_id, []).append(env['id'])
+        for profile in self.profiles.values():
+            self._profiles_by_name.setdefault(profile.get('name'), []).append(profile['papId'])
+
+    def environment_group(self, environment_group_id: str) -> Union[dict, None]:
+        """
+        Return the environment group with the given ID.
+
+        :param environment_group_id: The ID of the environment group.
+        :return: The environment group or None if not found.
+        """
+
+        return self.environment_groups.get(environment_group_id)
+
+    def environment(self, environment_id: str) -> Union[dict, None]:
+        """
+        Return the environment with the given ID.
+
+        :param environment_id: The ID of the environment.
+        :return: The environment or None if not found.
+        """
+
+        return self.environments.get(environment_id)
+
+    def profile(self, profile_id: str) -> Union[dict, None]:
+        """
+        Return the profile with the given ID.
+
+        :param profile_id: The ID of the profile.
+        :return: The profile or None if not found.
+        """
+
+        return self.profiles.get(profile_id)
+
+    def environment_groups_by_name(self, name: str) -> list:
+        """
+        Return the environment groups with the given name.
+
+        :param name: The exact name of the environment group.
+        :return: List of environment groups.
+        """
+
+        return [self.environment_groups[i] for i in self._groups_by_name.get(name, [])]
+
+    def environments_by_name(self, name: str) -> list:
+        """
+        Return the environments with the given name.
+
+        :param name: The exact name of the environment.
+        :return: List of environments.
+        """
+
+        return [self.environments[i] for i in self._environments_by_name.get(name, []) if i in self.environments]
+
+    def profiles_by_name(self, name: str) -> list:
+        """
+        Return the profiles with the given name.
+
+        :param name: The exact name of the profile.
+        :return: List of profiles.
+        """
+
+        return [self.profiles[i] for i in self._profiles_by_name.get(name, [])]
+
+    def children(self, environment_group_id: str = None) -> dict:
+        """
+        Return the direct children of an environment group.
+
+        :param environment_group_id: The ID of the environment group. Defaults to the root environment group.
+        :return: Dict with keys `environment_groups` and `environments`, each a list of IDs.
+        """
+
+        group_id = environment_group_id or self.root_id
+        return {
+            'environment_groups': list(self._child_groups.get(group_id, [])),
+            'environments': list(self._child_environments.get(group_id, [])),
+        }
+
+    def walk(self, environment_group_id: str = None) -> Iterator[tuple]:
+        """
+        Walk the environment tree below an environment group, depth first.
+
+        :param environment_group_id: The ID of the environment group to start from. Defaults to the root environment
+            group.
+        :return: Generator of `(type, id, depth)` tuples where type is `EnvironmentGroup` or `Environment`. The starting
+            group itself is not included.
+        """
+
+        stack = [(environment_group_id or self.root_id, 0)]
+        while stack:
+            group_id, depth = stack.pop()
+            for env_id in self._child_environments.get(group_id, []):
+                yield 'Environment', env_id, depth + 1
+            for child_id in reversed(self._child_groups.get(group_id, [])):
+                yield 'EnvironmentGroup', child_id, depth + 1
+                stack.append((child_id, depth + 1))
+
+
+class Topology:
+    """
+    Per application cache of `ApplicationTopology`.
+
+    The topology of an application is loaded with a few concurrent requests on first use, reloaded once older than
+    `ttl` seconds (300 by default) and discarded whenever an environment group, environment or profile of the
+    application is created, changed or deleted through this SDK.
+
+    The `get` methods of environments, environment groups and profiles always query the API - `lookup` is the opt-in
+    cached equivalent for callers which look up many entities of the same application.
+    """
+
+    def __init__(self, britive) -> None:
+        self.britive = britive
+        self.base_url = f'{self.britive.base_url}/apps'
+        self.ttl = 300
+        self._topologies = {}
+        self._generation = 0  # bumped by `invalidate`, so loads which began before are not cached
+        self._lock = threading.Lock()
+
+    def get(self, application_id: str, refresh: bool = False) -> ApplicationTopology:
+        """
+        Return the topology of an application.
+
+        :param application_id: The ID of the application.
+        :param refresh: Reload the topology even if the cached topology has not expired.
+        :return: The application topology.
+        """
+
+        with self._lock:
+            topology = self._topologies.get(application_id)
+            generation = self._generation
+        if refresh or not topology or time.monotonic() - topology.loaded_at > self.ttl:
+            topology = self._load(application_id)
+            with self._lock:
+                if generation == self._generation:
+                    self._topologies[application_id] = topology
+        return topology
+
+    def lookup(self, application_id: str, kind: str, entity_id: str) -> Union[dict, None]:
+        """
+        Return a single environment group, environment or profile of an application.
+
+        If it is not found in a topology which was cached earlier the topology is reloaded and checked once more, so
+        entities created elsewhere since the topology was loaded are still found.
+
+        :param application_id: The ID of the application.
+        :param kind: One of `environment_group`, `environment` or `profile`.
+        :param entity_id: The ID of the entity.
+        :return: The entity or None if not found.
+        :raises: ValueError - If `kind` is not valid.
+        """
+
+        if kind not in lookup_kinds:
+            raise ValueError(f'invalid kind {kind} - valid values are {", ".join(lookup_kinds)}')
+        with self._lock:
+            cached = self._topologies.get(application_id)
+        topology = self.get(application_id)
+        entity = getattr(topology, kind)(entity_id)
+        if entity is None and topology is cached:
+            entity = getattr(self.get(application_id, refresh=True), kind)(entity_id)
+        return entity
+
+    def invalidate(self, application_id: str = None) -> None:
+        """
+        Discard the cached topology of an application.
+
+        :param application_id: The ID of the application. Defaults to discarding the topology of every application.
+        :return: None
+        """
+
+        with self._lock:
+            self._generation += 1
+            if application_id:
+                self._topologies.pop(application_id, None)
+            else:
+                self._topologies.clear()
+
+    def _load(self, application_id: str) -> ApplicationTopology:
+        url = f'{self.base_url}/{application_id}'
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            application = executor.submit(self.britive.get, url)
+            environments = executor.submit(self.britive.get, f'{url}/environments')
+            profiles = executor.submit(get_all_pages, self.britive, f'{url}/paps', {'view': 'summary'})
+            return ApplicationTopology(application_id, application.result(), environments.result(), profiles.result())
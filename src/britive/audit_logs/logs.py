@@ -1,11 +1,19 @@
+import gzip
 from datetime import datetime, timedelta, timezone
-from typing import Any
+from typing import Any, BinaryIO, Iterator, Union
+
+from britive.helpers.utils import compile_jmespath
+
+from .store import AuditLogStore
+
+newline = b'\n'
 
 
 class Logs:
     def __init__(self, britive) -> None:
         self.britive = britive
         self.base_url = f'{self.britive.base_url}/logs'
+        self.store: AuditLogStore = None
 
     def fields(self) -> dict:
         """
@@ -26,7 +34,13 @@ class Logs:
         return self.britive.get(f'{self.base_url}/operators')
 
     def query(
-        self, from_time: datetime = None, to_time: datetime = None, filter_expression: str = None, csv: bool = False
+        self,
+        from_time: datetime = None,
+        to_time: datetime = None,
+        filter_expression: str = None,
+        csv: bool = False,
+        use_store: bool = True,
+        jmespath_filter: str = None,
     ) -> Any:
         """
         Retrieve audit log events.
@@ -36,6 +50,11 @@ class Logs:
             - True: A CSV string is returned. The caller must persist the CSV string to disk.
             - False: A python list of audit events is returned.
 
+        If a local store has been attached via `use_local_store` then JSON queries are answered from the store. Only
+        the portions of the time frame which have not been fetched before are requested from the API, without a
+        filter, and the filter expression is then evaluated locally. Filter expressions which cannot be evaluated
+        locally are sent to the API as usual.
+
         :param from_time: Lower end of the time frame to search. If not provided will default to
             7 days before `to_time`. `from_time` will be interpreted as if in UTC timezone so it is up to the caller to
             ensure that the datetime object represents UTC. No timezone manipulation will occur.
@@ -47,22 +66,173 @@ class Logs:
             Multiple filter expressions must be joined together by `and`. No other join operator is support.
             Example: actor.displayName co "bob" and event.displayName eq "application"
         :param csv: Will result in a CSV string of the audit events being returned instead of a python list of events.
+        :param use_store: Whether to use the local store, if one has been attached. Defaults to True.
+        :param jmespath_filter: A JMESPath expression evaluated client side against each event, using the same
+            semantics as an audit log webhook filter - only events for which the expression is truthy are returned.
+            Cannot be used in conjunction with `csv`.
         :return: Either python list of events (dicts) or CSV string.
+        :raises: ValueError - If from_time is greater than to_time, or `jmespath_filter` is not valid JMESPath.
+        """
+
+        from_time, to_time = self._time_frame(from_time, to_time)
+
+        if jmespath_filter:
+            if csv:
+                raise ValueError('jmespath_filter cannot be used in conjunction with csv.')
+            return list(self.iter(from_time, to_time, filter_expression, jmespath_filter, use_store))
+
+        # filter expressions which cannot be evaluated locally are left for the API to handle
+        if self.store and use_store and not csv and self.store.supports(filter_expression):
+            return self._query_store(from_time, to_time, filter_expression)
+
+        return self._query(from_time, to_time, filter_expression, csv)
+
+    def iter(
+        self,
+        from_time: datetime = None,
+        to_time: datetime = None,
+        filter_expression: str = None,
+        jmespath_filter: str = None,
+        use_store: bool = True,
+    ) -> Iterator[dict]:
+        """
+        Lazily retrieve audit log events, one page at a time.
+
+        Only a single page of events is held in memory at any point, making this suitable for large time frames. When
+        answered from a local store, events are streamed from the store in batches in the same way.
+
+        :param from_time: Lower end of the time frame to search. Same semantics as `query`.
+        :param to_time: Upper end of the time frame to search. Same semantics as `query`.
+        :param filter_expression: The expression used to filter the results server side. Same syntax as `query`.
+        :param jmespath_filter: A JMESPath expression evaluated client side against each event, using the same
+            semantics as an audit log webhook filter - only events for which the expression is truthy are yielded.
+            The expression is compiled once and compiled expressions are cached for reuse.
+        :param use_store: Whether to use the local store, if one has been attached. Defaults to True.
+        :return: Generator of events (dicts).
+        :raises: ValueError - If from_time is greater than to_time, or `jmespath_filter` is not valid JMESPath.
+        """
+
+        from_time, to_time = self._time_frame(from_time, to_time)
+        expression = compile_jmespath(jmespath_filter or '')
+
+        if self.store and use_store and self.store.supports(filter_expression):
+            self._fill_store(from_time, to_time)
+            pages = [self.store.iter(from_time, to_time, filter_expression)]
+        else:
+            params = {**self._params(from_time, to_time, filter_expression), 'size': 200}
+            pages = self.britive.iter_pages(self.base_url, params=params)
+
+        for page in pages:
+            yield from (event for event in page if not expression or expression.search(event))
+
+    def use_local_store(self, path: str = ':memory:', grace_period: int = 300) -> AuditLogStore:
+        """
+        Attach a local SQLite store which `query` will populate and answer repeat queries from.
+
+        :param path: Path to the SQLite database file. Defaults to an in-memory database.
+        :param grace_period: Number of seconds before now which are always fetched from the API again, as recent
+            events may not have been ingested yet. Defaults to 300 (5 minutes).
+        :return: The attached `AuditLogStore`.
+        """
+
+        self.store = AuditLogStore(path=path, grace_period=grace_period)
+        return self.store
+
+    def _fill_store(self, from_time: datetime, to_time: datetime) -> None:
+        for missing_from, missing_to in self.store.missing_ranges(from_time, to_time):
+            self.store.add(self._query(missing_from, missing_to), from_time=missing_from, to_time=missing_to)
+
+    def _query_store(self, from_time: datetime, to_time: datetime, filter_expression: str = None) -> list:
+        self._fill_store(from_time, to_time)
+        return self.store.query(from_time, to_time, filter_expression)
+
+    def export(
+        self,
+        path_or_fileobj: Union[str, BinaryIO],
+        from_time: datetime = None,
+        to_time: datetime = None,
+        filter_expression: str = None,
+        compress: bool = False,
+        chunk_size: int = 1024 * 1024,
+    ) -> int:
+        """
+        Stream audit log events as CSV directly to a file.
+
+        Unlike `query(csv=True)` the CSV is never held in memory as a whole - the response is written to the
+        destination in chunks as it is received, following any `next-page` links returned by the API.
+
+        :param path_or_fileobj: Path of the file to write, or a file-like object opened in binary mode.
+        :param from_time: Lower end of the time frame to search. Same semantics as `query`.
+        :param to_time: Upper end of the time frame to search. Same semantics as `query`.
+        :param filter_expression: The expression used to filter the results. Same syntax as `query`.
+        :param compress: Gzip compress the CSV as it is written. Defaults to False.
+        :param chunk_size: The number of bytes to read from the response at a time. Defaults to 1MiB.
+        :return: The number of (uncompressed) CSV bytes written.
         :raises: ValueError - If from_time is greater than to_time.
         """
 
+        from_time, to_time = self._time_frame(from_time, to_time)
+
+        if isinstance(path_or_fileobj, str):
+            with open(path_or_fileobj, 'wb') as f:
+                return self.export(f, from_time, to_time, filter_expression, compress, chunk_size)
+
+        if compress:
+            with gzip.GzipFile(fileobj=path_or_fileobj, mode='wb') as f:
+                return self.export(f, from_time, to_time, filter_expression, False, chunk_size)
+
+        written = 0
+        header = None
+        first_line = b''
+        url = f'{self.base_url}/csv'
+        params = self._params(from_time, to_time, filter_expression)
+        while url:
+            with self.britive.get_stream(url, params=params) as response:
+                chunks = response.iter_content(chunk_size=chunk_size)
+                if header is not None:  # drop the header row repeated at the top of each subsequent page
+                    chunks = self._skip_header(chunks, header)
+                for chunk in chunks:
+                    if header is None and newline in (first_line := first_line + chunk):
+                        header = first_line.split(newline, 1)[0]
+                    path_or_fileobj.write(chunk)
+                    written += len(chunk)
+                url = response.headers.get('next-page')
+                params = {}
+            header = first_line if header is None else header
+
+        return written
+
+    @staticmethod
+    def _skip_header(chunks, header: bytes):
+        buffer = b''
+        for chunk in chunks:
+            buffer += chunk
+            if newline in buffer or len(buffer) > len(header):
+                break
+        first, _, rest = buffer.partition(newline)
+        yield rest if first == header else buffer
+        yield from chunks
+
+    def _time_frame(self, from_time: datetime = None, to_time: datetime = None) -> tuple:
         to_time = to_time or datetime.now(timezone.utc)
         from_time = from_time or to_time - timedelta(days=7)
 
         if from_time > to_time:
             raise ValueError('from_time must occur before to_time.')
 
+        return from_time, to_time
+
+    def _params(self, from_time: datetime, to_time: datetime, filter_expression: str = None) -> dict:
         params = {
             'from': from_time.isoformat(sep='T', timespec='seconds').split('+')[0] + 'Z',
             'to': to_time.isoformat(sep='T', timespec='seconds').split('+')[0] + 'Z',
         }
         if filter_expression:
             params['filter'] = filter_expression
+        return params
+
+    def _query(self, from_time: datetime, to_time: datetime, filter_expression: str = None, csv: bool = False) -> Any:
+        params = self._params(from_time, to_time, filter_expression)
         if not csv:
             params['size'] = 200
 
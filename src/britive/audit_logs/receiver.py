@@ -0,0 +1,214 @@
+import asyncio
+import hmac
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Union
+
+import requests
+
+from britive.helpers.utils import compile_jmespath
+
+event_types = ('audit', 'notification')
+
+
+def classify(payload: dict) -> str:
+    """
+    Determine which kind of Britive webhook produced the provided payload.
+
+    Audit log webhooks (`audit_logs.webhooks`) deliver audit events, which always carry an `actor` and an `event`.
+    Everything else is delivered via a webhook notification medium (`global_settings.notification_mediums`), such
+    as approval requests and checkout notifications.
+
+    :param payload: The decoded webhook payload.
+    :return: `audit` or `notification`.
+    """
+
+    if isinstance(payload, dict) and 'actor' in payload and 'event' in payload:
+        return 'audit'
+    return 'notification'
+
+
+def send(url: str, payload: Union[dict, list], token: str = None, timeout: float = 10) -> int:
+    """
+    Simulate Britive delivering a webhook payload.
+
+    Useful to exercise a `WebhookReceiver` locally without having to configure a webhook in a Britive tenant.
+
+    :param url: The URL of the receiver.
+    :param payload: The payload to deliver - a single event or a list of events.
+    :param token: Optional token to present in the `Authorization` header.
+    :param timeout: Request timeout in seconds. Defaults to 10 seconds.
+    :return: The HTTP status code returned by the receiver.
+    """
+
+    headers = {'Authorization': f'Bearer {token}'} if token else {}
+    return requests.post(url, json=payload, headers=headers, timeout=timeout).status_code
+
+
+class WebhookReceiver:
+    """
+    Small embeddable HTTP receiver for Britive webhook deliveries.
+
+    Each payload POSTed to the receiver is decoded, classified as either an `audit` event or a `notification` and
+    dispatched as a dict of the form `{'type': ..., 'path': ..., 'payload': ...}` to every matching callback and
+    attached asyncio queue. Payloads which are JSON lists are dispatched one element at a time.
+
+    The receiver runs in a background thread so callbacks are invoked from that thread. Queues are fed in a thread
+    safe manner via the event loop they were attached with.
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, token: str = None) -> None:
+        """
+        Create (but do not start) a webhook receiver.
+
+        :param host: The interface to listen on. Defaults to `127.0.0.1`.
+        :param port: The port to listen on. Defaults to 0 which picks a free port - see `url` once started.
+        :param token: Optional shared secret. If provided, deliveries must present it in the `Authorization` header
+            (optionally prefixed with `Bearer `) or they are rejected with a 401.
+        """
+
+        self.host = host
+        self.port = port
+        self.token = token
+        self._callbacks = []
+        self._queues = []
+        self._server = None
+        self._thread = None
+
+    def __enter__(self) -> 'WebhookReceiver':
+        return self.start()
+
+    def __exit__(self, *args) -> None:
+        self.stop()
+
+    @property
+    def url(self) -> str:
+        """The URL deliveries should be sent to. Only available once the receiver is started."""
+
+        if not self._server:
+            raise RuntimeError('receiver has not been started.')
+        return f'http://{self.host}:{self._server.server_address[1]}/'
+
+    def on(self, callback: Callable, event_type: str = None, jmespath_filter: str = None) -> Callable:
+        """
+        Register a callback to be invoked for each received event.
+
+        :param callback: Callable accepting a single event dict.
+        :param event_type: Only invoke the callback for `audit` or `notification` events. Defaults to all events.
+        :param jmespath_filter: Only invoke the callback for events whose payload matches this JMESPath expression,
+            using the same semantics as an audit log webhook filter.
+        :return: The callback.
+        """
+
+        self._callbacks.append((callback, *self._matcher(event_type, jmespath_filter)))
+        return callback
+
+    def attach_queue(
+        self, queue: asyncio.Queue, loop: asyncio.AbstractEventLoop, event_type: str = None, jmespath_filter: str = None
+    ) -> None:
+        """
+        Feed received events into an asyncio queue.
+
+        :param queue: The queue to put events onto.
+        :param loop: The event loop which owns the queue.
+        :param event_type: Only queue `audit` or `notification` events. Defaults to all events.
+        :param jmespath_filter: Only queue events whose payload matches this JMESPath expression.
+        :return: None
+        """
+
+        self._queues.append((queue, loop, *self._matcher(event_type, jmespath_filter)))
+
+    def dispatch(self, payload: Union[dict, list], path: str = '/') -> int:
+        """
+        Dispatch a decoded payload as if it had been delivered over HTTP.
+
+        :param payload: The decoded payload - a single event or a list of events.
+        :param path: The request path the payload was delivered to.
+        :return: The number of callbacks which raised an exception.
+        """
+
+        failures = 0
+        for item in payload if isinstance(payload, list) else [payload]:
+            event = {'type': classify(item), 'path': path, 'payload': item}
+            for callback, event_type, expression in self._callbacks:
+                if self._matches(event, event_type, expression):
+                    try:
+                        callback(event)
+                    except Exception:  # one misbehaving callback must not starve the others
+                        failures += 1
+            for queue, loop, event_type, expression in self._queues:
+                if self._matches(event, event_type, expression):
+                    loop.call_soon_threadsafe(queue.put_nowait, event)
+        return failures
+
+    def start(self) -> 'WebhookReceiver':
+        """
+        Start listening in a background thread.
+
+        :return: The receiver.
+        """
+
+        self._server = ThreadingHTTPServer((self.host, self.port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """
+        Stop listening.
+
+        :return: None
+        """
+
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._thread.join()
+            self._server = None
+            self._thread = None
+
+    def _authorized(self, authorization: str) -> bool:
+        if not self.token:
+            return True
+        presented = (authorization or '').removeprefix('Bearer ').strip()
+        return hmac.compare_digest(presented.encode('utf-8'), self.token.encode('utf-8'))
+
+    def _handler(self) -> type:
+        receiver = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self) -> None:
+                if not receiver._authorized(self.headers.get('Authorization')):
+                    self._respond(401)
+                    return
+                body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+                try:
+                    payload = json.loads(body or b'{}')
+                except json.JSONDecodeError:
+                    self._respond(400)
+                    return
+                self._respond(500 if receiver.dispatch(payload, path=self.path) else 200)
+
+            def _respond(self, status: int) -> None:
+                self.send_response(status)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+
+            def log_message(self, *args) -> None:
+                pass
+
+        return Handler
+
+    @staticmethod
+    def _matcher(event_type: str, jmespath_filter: str) -> tuple:
+        if event_type and event_type not in event_types:
+            raise ValueError(f'invalid event_type {event_type}')
+        return event_type, compile_jmespath(jmespath_filter or '')
+
+    @staticmethod
+    def _matches(event: dict, event_type: str, expression) -> bool:
+        if event_type and event['type'] != event_type:
+            return False
+        return not expression or bool(expression.search(event['payload']))
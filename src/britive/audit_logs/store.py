@@ -0,0 +1,311 @@
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Callable
+
+# filter fields whose values are indexed (under the given name) so `eq` clauses can be answered by sqlite directly
+indexed_fields = {
+    'actor.displayName': 'actor',
+    'event.eventType': 'event_type',
+    'target.displayName': 'target',
+}
+
+schema = """
+CREATE TABLE IF NOT EXISTS events (
+    event_key TEXT PRIMARY KEY,
+    timestamp INTEGER NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS events_timestamp ON events (timestamp);
+CREATE TABLE IF NOT EXISTS event_values (
+    event_key TEXT NOT NULL,
+    field TEXT NOT NULL,
+    value TEXT COLLATE NOCASE
+);
+CREATE INDEX IF NOT EXISTS event_values_lookup ON event_values (field, value, event_key);
+CREATE INDEX IF NOT EXISTS event_values_event ON event_values (event_key);
+CREATE TABLE IF NOT EXISTS ranges (
+    from_time INTEGER NOT NULL,
+    to_time INTEGER NOT NULL
+);
+"""
+
+filter_clause = re.compile(r'\s*([\w.]+)\s+(\w+)\s+(?:"([^"]*)"|\'([^\']*)\'|(\S+))\s*(?:and\s+|$)', re.IGNORECASE)
+
+operators = {
+    'eq': lambda actual, expected: actual == expected,
+    'ne': lambda actual, expected: actual != expected,
+    'co': lambda actual, expected: expected in actual,
+    'sw': lambda actual, expected: actual.startswith(expected),
+    'ew': lambda actual, expected: actual.endswith(expected),
+}
+
+
+def _epoch_seconds(value: datetime) -> int:
+    # mirror `Logs.query` which sends the wall clock time as UTC without any timezone manipulation
+    return int(value.replace(tzinfo=timezone.utc).timestamp())
+
+
+def _epoch_millis(timestamp: str) -> int:
+    value = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return int(value.timestamp() * 1000)
+
+
+def _values(event, path: list) -> list:
+    # walk a dotted path through the event, fanning out over any lists encountered along the way
+    if not path:
+        return [event]
+    if isinstance(event, list):
+        return [value for item in event for value in _values(item, path)]
+    if isinstance(event, dict) and path[0] in event:
+        return _values(event[path[0]], path[1:])
+    return []
+
+
+def _scalars(event: dict, field: str) -> set:
+    return {str(v) for v in _values(event, field.split('.')) if v is not None and not isinstance(v, (dict, list))}
+
+
+def parse_filter(filter_expression: str) -> list:
+    """
+    Parse an audit log filter expression into a list of `(field, operator, value)` clauses.
+
+    Only the subset of the filter syntax accepted by `Logs.query` is supported, i.e. clauses in the form
+    `field operator "value"` joined together with `and`.
+
+    :param filter_expression: The filter expression to parse.
+    :return: List of `(field, operator, value)` tuples. Empty if no filter expression was provided.
+    :raises: ValueError - If the filter expression cannot be evaluated locally.
+    """
+
+    clauses = []
+    position = 0
+    expression = (filter_expression or '').strip()
+    while position < len(expression):
+        if not (match := filter_clause.match(expression, position)):
+            raise ValueError(f'unable to parse filter expression {filter_expression}.')
+        field, operator, *values = match.groups()
+        if operator.lower() not in operators:
+            raise ValueError(f'operator {operator} cannot be evaluated locally.')
+        clauses.append((field, operator.lower(), next(v for v in values if v is not None)))
+        position = match.end()
+    return clauses
+
+
+class AuditLogStore:
+    """
+    Local SQLite backed store of audit log events.
+
+    Events are persisted alongside the time ranges which have been fetched from the Britive API, so repeat queries
+    covering a range that has already been fetched are answered locally and only the uncovered portions of a range
+    need to be requested from the API. Ranges are always fetched without a filter expression so any filter
+    expression can be evaluated against the stored events. Events from the last `grace_period` seconds may still be
+    arriving at the API, so that tail of a range is stored but never marked as fetched and is requested again by the
+    next query which covers it.
+
+    Filter expressions are evaluated locally with case-insensitive comparisons. Equality clauses against
+    `actor.displayName`, `event.eventType` and `target.displayName` are resolved via an index of every value of those
+    fields, so events where a field holds a list of values match on any of them.
+    """
+
+    def __init__(self, path: str = ':memory:', grace_period: int = 300) -> None:
+        """
+        Open (or create) a local audit log event store.
+
+        :param path: Path to the SQLite database file. Defaults to an in-memory database which only lives as long as
+            this object.
+        :param grace_period: Number of seconds before now for which fetched ranges are not recorded as fetched, as
+            recent events may not have been ingested by the API yet. Defaults to 300 (5 minutes).
+        """
+
+        self.path = path
+        self.grace_period = grace_period
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.executescript(schema)
+
+    def close(self) -> None:
+        """
+        Close the underlying SQLite connection.
+
+        :return: None
+        """
+
+        self._connection.close()
+
+    def clear(self) -> None:
+        """
+        Remove all stored events and fetched ranges.
+
+        :return: None
+        """
+
+        with self._lock, self._connection:
+            self._connection.execute('DELETE FROM events')
+            self._connection.execute('DELETE FROM event_values')
+            self._connection.execute('DELETE FROM ranges')
+
+    @staticmethod
+    def supports(filter_expression: str) -> bool:
+        """
+        Whether the given filter expression can be evaluated locally.
+
+        :param filter_expression: The filter expression to check.
+        :return: True if the filter expression can be evaluated against stored events.
+        """
+
+        try:
+            parse_filter(filter_expression)
+            return True
+        except ValueError:
+            return False
+
+    def missing_ranges(self, from_time: datetime, to_time: datetime) -> list:
+        """
+        Return the portions of the given time frame which have not yet been fetched from the Britive API.
+
+        :param from_time: Lower end of the time frame.
+        :param to_time: Upper end of the time frame.
+        :return: List of `(from_time, to_time)` datetime tuples, in UTC.
+        """
+
+        start, end = _epoch_seconds(from_time), _epoch_seconds(to_time)
+        with self._lock:
+            covered = self._connection.execute(
+                'SELECT from_time, to_time FROM ranges WHERE to_time >= ? AND from_time <= ? ORDER BY from_time',
+                (start, end),
+            ).fetchall()
+
+        gaps = []
+        cursor = start
+        for covered_from, covered_to in covered:
+            if covered_from > cursor:
+                gaps.append((cursor, covered_from - 1))
+            cursor = max(cursor, covered_to + 1)
+        if cursor <= end:
+            gaps.append((cursor, end))
+
+        return [
+            (datetime.fromtimestamp(gap_from, timezone.utc), datetime.fromtimestamp(gap_to, timezone.utc))
+            for gap_from, gap_to in gaps
+        ]
+
+    def add(self, events: list, from_time: datetime, to_time: datetime) -> None:
+        """
+        Persist unfiltered audit log events fetched for the given time frame and mark the time frame as fetched.
+
+        Any part of the time frame within `grace_period` seconds of now is not marked as fetched.
+
+        :param events: The complete list of events for the time frame, as returned by the Britive API.
+        :param from_time: Lower end of the fetched time frame.
+        :param to_time: Upper end of the fetched time frame.
+        :return: None
+        """
+
+        rows = []
+        values = []
+        for event in events:
+            data = json.dumps(event, sort_keys=True, default=str)
+            event_key = str(event.get('id') or hashlib.sha1(data.encode('utf-8')).hexdigest())
+            rows.append((event_key, _epoch_millis(event['timestamp']), data))
+            for field, column in indexed_fields.items():
+                values.extend((event_key, column, value) for value in _scalars(event, field))
+
+        # the most recent events may not have reached the API yet, so leave that tail to be fetched again
+        covered_from = _epoch_seconds(from_time)
+        covered_to = min(_epoch_seconds(to_time), int(time.time()) - self.grace_period)
+
+        with self._lock, self._connection:
+            self._connection.executemany('DELETE FROM event_values WHERE event_key = ?', [row[:1] for row in rows])
+            self._connection.executemany('INSERT OR REPLACE INTO events VALUES (?, ?, ?)', rows)
+            self._connection.executemany('INSERT INTO event_values VALUES (?, ?, ?)', values)
+            if covered_from <= covered_to:
+                self._connection.execute('INSERT INTO ranges VALUES (?, ?)', (covered_from, covered_to))
+                self._merge_ranges()
+
+    def query(self, from_time: datetime, to_time: datetime, filter_expression: str = None) -> list:
+        """
+        Retrieve stored audit log events.
+
+        Only events which have been persisted are considered - call `missing_ranges` first to determine whether the
+        time frame has been fully fetched.
+
+        :param from_time: Lower end of the time frame to search.
+        :param to_time: Upper end of the time frame to search.
+        :param filter_expression: The expression used to filter the results. Same syntax as `Logs.query`.
+        :return: List of events (dicts) ordered by timestamp.
+        :raises: ValueError - If the filter expression cannot be evaluated locally.
+        """
+
+        return list(self.iter(from_time, to_time, filter_expression))
+
+    def iter(self, from_time: datetime, to_time: datetime, filter_expression: str = None, batch_size: int = 500):
+        """
+        Lazily retrieve stored audit log events.
+
+        Same as `query` except rows are read from SQLite with a cursor, `batch_size` rows at a time, rather than all
+        being loaded into memory up front.
+
+        :param from_time: Lower end of the time frame to search.
+        :param to_time: Upper end of the time frame to search.
+        :param filter_expression: The expression used to filter the results. Same syntax as `Logs.query`.
+        :param batch_size: The number of rows to read from SQLite at a time. Defaults to 500.
+        :return: Generator of events (dicts) ordered by timestamp.
+        :raises: ValueError - If the filter expression cannot be evaluated locally.
+        """
+
+        clauses = parse_filter(filter_expression)
+
+        sql = ['SELECT data FROM events WHERE timestamp >= ? AND timestamp <= ?']
+        args = [_epoch_seconds(from_time) * 1000, _epoch_seconds(to_time) * 1000 + 999]
+        predicates = []
+        for field, operator, value in clauses:
+            if operator == 'eq' and field in indexed_fields:
+                sql.append('AND event_key IN (SELECT event_key FROM event_values WHERE field = ? AND value = ?)')
+                args.extend((indexed_fields[field], value))
+            else:
+                predicates.append(self._predicate(field, operator, value))
+        sql.append('ORDER BY timestamp')
+
+        with self._lock:
+            cursor = self._connection.execute(' '.join(sql), args)
+        try:
+            while True:
+                with self._lock:
+                    rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    return
+                events = (json.loads(data) for (data,) in rows)
+                yield from (event for event in events if all(predicate(event) for predicate in predicates))
+        finally:
+            cursor.close()
+
+    def _merge_ranges(self) -> None:
+        merged = []
+        for range_from, range_to in self._connection.execute('SELECT from_time, to_time FROM ranges ORDER BY 1'):
+            if merged and range_from <= merged[-1][1] + 1:
+                merged[-1][1] = max(merged[-1][1], range_to)
+            else:
+                merged.append([range_from, range_to])
+        self._connection.execute('DELETE FROM ranges')
+        self._connection.executemany('INSERT INTO ranges VALUES (?, ?)', merged)
+
+    @staticmethod
+    def _predicate(field: str, operator: str, value: str) -> Callable:
+        path = field.split('.')
+        expected = value.lower()
+        compare = operators[operator]
+
+        def predicate(event: dict) -> bool:
+            actual = [str(v).lower() for v in _values(event, path) if v is not None]
+            if operator == 'ne':
+                return all(compare(a, expected) for a in actual)
+            return any(compare(a, expected) for a in actual)
+
+        return predicate
@@ -1,7 +1,6 @@
-import contextlib
+from britive.helpers.utils import compile_jmespath
 
-import jmespath
-from jmespath.exceptions import EmptyExpressionError, ParseError
+from .receiver import WebhookReceiver
 
 
 class Webhooks:
@@ -19,11 +18,7 @@ class Webhooks:
         :return: Dict of field keys to field names.
         """
 
-        try:
-            with contextlib.suppress(EmptyExpressionError):
-                jmespath.compile(jmespath_filter)
-        except ParseError as e:
-            raise ValueError('Invalid JMESPath.') from e
+        compile_jmespath(jmespath_filter)
 
         params = {
             'notificationMediumId': notification_medium_id,
@@ -61,3 +56,19 @@ class Webhooks:
         """
 
         return self.britive.delete(f'{self.base_url}/{notification_medium_id}')
+
+    def receiver(self, host: str = '127.0.0.1', port: int = 0, token: str = None) -> WebhookReceiver:
+        """
+        Create a local receiver for webhook deliveries, so audit events and notifications can be consumed as they
+        are pushed rather than by polling.
+
+        The receiver must be reachable at the URL configured on the notification medium backing the webhook. Use
+        `britive.audit_logs.receiver.send` to simulate deliveries locally.
+
+        :param host: The interface to listen on. Defaults to `127.0.0.1`.
+        :param port: The port to listen on. Defaults to 0 which picks a free port.
+        :param token: Optional shared secret deliveries must present in the `Authorization` header.
+        :return: A `WebhookReceiver` which has not yet been started.
+        """
+
+        return WebhookReceiver(host=host, port=port, token=token)
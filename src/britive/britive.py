@@ -1,4 +1,5 @@
 import os
+import threading
 import time
 
 import requests
@@ -14,6 +15,7 @@ from .exceptions import (
     TokenMissingError,
 )
 from .global_settings import GlobalSettings
+from .helpers.concurrency import Throttle
 from .helpers.utils import (
     check_response_for_error,
     handle_response,
@@ -108,6 +110,10 @@ class Britive:
         self.retry_backoff_factor = 1
         self.retry_max_times = 5
         self.retry_response_status = {429, 500, 502, 503, 504}
+        self.throttle = Throttle()
+        self.root_environment_group_ttl = None
+        self._root_environment_groups = {}
+        self._root_environment_groups_lock = threading.Lock()
 
         self._initialize_components(query_features)
 
@@ -186,6 +192,27 @@ class Britive:
 
         return self.__request('get', url, params=params, headers=headers)
 
+    def iter_pages(self, url, params: dict = None, headers: dict = None):
+        """Internal use only."""
+
+        for page, _ in self.__paginate('get', url, params=params, headers=headers):
+            yield page
+
+    def get_page(self, url, params: dict = None, headers: dict = None) -> dict:
+        """Internal use only."""
+
+        response = self.__request_with_exponential_backoff_and_retry(
+            'get', url, params=params or {}, data=None, json=None, headers=headers or {}
+        )
+        return None if response_has_no_content(response) else handle_response(response)
+
+    def get_stream(self, url, params: dict = None, headers: dict = None) -> requests.Response:
+        """Internal use only."""
+
+        return self.__request_with_exponential_backoff_and_retry(
+            'get', url, params=params or {}, data=None, json=None, headers=headers or {}, stream=True
+        )
+
     def post(self, url, params: dict = None, data: dict = None, json: dict = None, headers: dict = None) -> dict:
         """Internal use only."""
 
@@ -223,12 +250,20 @@ class Britive:
         response = self.session.post(url, params=params, files=files, headers={'Content-Type': None})
         return handle_response(response)
 
-    def __request_with_exponential_backoff_and_retry(self, method, url, params, data, json, headers) -> dict:
+    def __request_with_exponential_backoff_and_retry(
+        self, method, url, params, data, json, headers, stream=False
+    ) -> requests.Response:
         num_retries = 0
 
         while num_retries <= self.retry_max_times:
             response = self.session.request(
-                method, url, params=params, data=data, json=json, headers={**self.session.headers, **headers}
+                method,
+                url,
+                params=params,
+                data=data,
+                json=json,
+                headers={**self.session.headers, **headers},
+                stream=stream,
             )
 
             # handle the use case of a tenant being in maintenance mode
@@ -237,17 +272,34 @@ class Britive:
             if tenant_is_under_maintenance(response):
                 raise TenantUnderMaintenance(response.json().get('message'))
 
-            if response.status_code in self.retry_response_status:
+            # a streamed response which is still failing once retries are exhausted is raised below rather than
+            # handed back to the caller to read
+            retryable = response.status_code in self.retry_response_status
+            if retryable and (not stream or num_retries < self.retry_max_times):
+                response.close()
                 time.sleep((2**num_retries) * self.retry_backoff_factor)
                 num_retries += 1
             else:
-                check_response_for_error(response.status_code, handle_response(response))
+                # streamed responses are left unread unless they carry an error
+                if not stream or response.status_code >= 400:
+                    check_response_for_error(response.status_code, handle_response(response))
                 break
 
         return response
 
     def __request(self, method, url, params=None, data=None, json=None, headers=None) -> dict:
         return_data = []
+
+        for page, paginated in self.__paginate(method, url, params, data, json, headers):
+            if not paginated:
+                return page
+            return_data += page
+
+        return return_data
+
+    def __paginate(self, method, url, params=None, data=None, json=None, headers=None):
+        # yields (page, paginated) tuples - `paginated` is False for a response which is returned as is, in which
+        # case it is the only item yielded
         _pagination_type = None
 
         if params is None:
@@ -258,19 +310,22 @@ class Britive:
         while True:
             response = self.__request_with_exponential_backoff_and_retry(method, url, params, data, json, headers)
             if response_has_no_content(response):
-                return None
+                yield None, False
+                return
 
             # handle secrets file download
             content_disposition = response.headers.get('content-disposition', '').lower()
             if 'attachment' in content_disposition and 'downloadfile' in url:
                 filename = response.headers['content-disposition'].split('=')[1].replace('"', '').strip()
-                return {'filename': filename, 'content_bytes': bytes(response.content)}
+                yield {'filename': filename, 'content_bytes': bytes(response.content)}, False
+                return
 
             # load the result as a dict
             result = handle_response(response)
 
             if url.endswith('my-resources') and method == 'get' and params.get('page') == 0 and params.get('size'):
-                return result
+                yield result, False
+                return
 
             _pagination_type = _pagination_type or pagination_type(response.headers, result)
 
@@ -280,33 +335,49 @@ class Britive:
             # which means we drop into the else block below and assign just the LAST page as the result, which
             # is obviously not what we want to be doing.
             if _pagination_type == 'inline':
-                return_data += result['data']
+                yield result['data'], True
                 if result['size'] * (result['page'] + 1) >= result['count']:
                     break
                 params['page'] = result['page'] + 1
             elif _pagination_type in ('audit', 'report'):
-                return_data += result if _pagination_type == 'audit' else result['data']
+                yield result if _pagination_type == 'audit' else result['data'], True
                 if 'next-page' not in response.headers:
                     break
                 url = response.headers['next-page']
                 params = {}
             elif _pagination_type == 'secmgr':
-                return_data += result['result']
+                yield result['result'], True
                 url = result['pagination'].get('next', '')
                 if not url:
                     break
             else:
-                return_data = result
+                yield result, False
                 break
 
-        return return_data
-
     def get_root_environment_group(self, application_id: str) -> str:
         """Internal use only."""
 
+        # memoized per application - set `root_environment_group_ttl` (seconds) to have entries expire
+        with self._root_environment_groups_lock:
+            cached = self._root_environment_groups.get(application_id)
+        ttl = self.root_environment_group_ttl
+        if cached and (ttl is None or time.monotonic() - cached[1] <= ttl):
+            return cached[0]
+
         app = self.application_management.applications.get(application_id=application_id)
         root_env_group = app.get('rootEnvironmentGroup', {}).get('environmentGroups', [])
         for group in root_env_group:
             if not group['parentId']:
+                with self._root_environment_groups_lock:
+                    self._root_environment_groups[application_id] = (group['id'], time.monotonic())
                 return group['id']
         raise RootEnvironmentGroupNotFound
+
+    def forget_root_environment_group(self, application_id: str = None) -> None:
+        """Internal use only."""
+
+        with self._root_environment_groups_lock:
+            if application_id:
+                self._root_environment_groups.pop(application_id, None)
+            else:
+                self._root_environment_groups.clear()
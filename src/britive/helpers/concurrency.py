@@ -0,0 +1,302 @@
+import math
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Iterable, Iterator
+
+import requests
+
+from britive.exceptions import InternalServerError, ServiceUnavailable
+from britive.helpers.utils import pagination_type
+
+# failures which are worth another attempt once the http layer has already exhausted its own retries
+transient_exceptions = (
+    requests.exceptions.ConnectionError,
+    requests.exceptions.Timeout,
+    InternalServerError,
+    ServiceUnavailable,
+)
+
+
+class Throttle:
+    """
+    Bound how hard concurrent operations drive the Britive API.
+
+    A `Britive` instance owns a single throttle (`britive.throttle`) which is shared by all of its bulk operations, so
+    the number of requests in flight stays bounded no matter how many bulk operations are running at once.
+    """
+
+    def __init__(self, max_concurrency: int = 8, max_rate: float = None) -> None:
+        """
+        Create a throttle.
+
+        :param max_concurrency: The maximum number of calls allowed in flight at once. Defaults to 8.
+        :param max_rate: Optional maximum number of calls started per second. Defaults to no limit.
+        """
+
+        if max_concurrency < 1:
+            raise ValueError('max_concurrency must be at least 1.')
+        self.max_concurrency = max_concurrency
+        self.max_rate = max_rate
+        self._semaphore = threading.BoundedSemaphore(max_concurrency)
+        self._lock = threading.Lock()
+        self._next_start = 0.0
+
+    def __enter__(self) -> 'Throttle':
+        self._semaphore.acquire()
+        if self.max_rate:
+            with self._lock:
+                now = time.monotonic()
+                delay = self._next_start - now
+                self._next_start = max(now, self._next_start) + 1 / self.max_rate
+            if delay > 0:
+                time.sleep(delay)
+        return self
+
+    def __exit__(self, *args) -> None:
+        self._semaphore.release()
+
+
+class Outcome:
+    """The outcome of applying a function to a single item via `run_concurrently`."""
+
+    __slots__ = ('attempts', 'error', 'index', 'item', 'result', 'seconds')
+
+    def __init__(self, index: int, item: Any) -> None:
+        self.index = index
+        self.item = item
+        self.result = None
+        self.error = None
+        self.attempts = 0
+        self.seconds = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+class BulkReport:
+    """
+    Collect the per item results of a bulk operation into the report it returns.
+
+    A report is a dict with keys `results` and `metrics`. `results` is a list with a dict per item, each with a
+    `status` key. `metrics` is a dict with keys `total`, the count of each status, any metrics specific to the
+    operation, `seconds` (the duration of the operation) and `per_second` (the number of items per second).
+    """
+
+    def __init__(self, statuses: Iterable[str], progress_func: Callable = None) -> None:
+        """
+        Start a report. The duration of the operation is measured from this point.
+
+        :param statuses: The statuses an item can have, in the order they are counted in `metrics`.
+        :param progress_func: An optional callback invoked with each per item result as it completes.
+        """
+
+        self.statuses = tuple(statuses)
+        self.progress_func = progress_func
+        self.results = []
+        self.started = time.monotonic()
+
+    def add(self, result: dict) -> dict:
+        """Record the result of an item and report it as complete."""
+
+        self.results.append(result)
+        return self.done(result)
+
+    def done(self, result: dict) -> dict:
+        """Report the result of an item as complete, by passing it to `progress_func`."""
+
+        if self.progress_func:
+            self.progress_func(result)
+        return result
+
+    def summarize(self, **metrics) -> dict:
+        """
+        Build the report from the results recorded so far.
+
+        :param metrics: Metrics specific to the operation, included after the status counts.
+        :return: Dict with keys `results` and `metrics`.
+        """
+
+        seconds = time.monotonic() - self.started
+        statuses = [result['status'] for result in self.results]
+        return {
+            'results': self.results,
+            'metrics': {
+                'total': len(self.results),
+                **{status: statuses.count(status) for status in self.statuses},
+                **metrics,
+                'seconds': seconds,
+                'per_second': len(self.results) / seconds if seconds else 0.0,
+            },
+        }
+
+
+def _attempt(
+    func: Callable, outcome: Outcome, throttle: Throttle, retries: int, backoff_factor: float, retry_on: tuple
+) -> Outcome:
+    started = time.monotonic()
+    while True:
+        outcome.attempts += 1
+        try:
+            if throttle:
+                with throttle:
+                    outcome.result = func(outcome.item)
+            else:
+                outcome.result = func(outcome.item)
+            outcome.error = None
+            break
+        except Exception as e:  # failures are reported per item rather than aborting the whole run
+            outcome.error = e
+            if not isinstance(e, retry_on) or outcome.attempts > retries:
+                break
+            time.sleep((2 ** (outcome.attempts - 1)) * backoff_factor)
+    outcome.seconds = time.monotonic() - started
+    return outcome
+
+
+def run_concurrently(
+    func: Callable,
+    items: Iterable,
+    workers: int = 8,
+    throttle: Throttle = None,
+    retries: int = 0,
+    backoff_factor: float = 1,
+    retry_on: tuple = transient_exceptions,
+    ordered: bool = False,
+) -> Iterator[Outcome]:
+    """
+    Apply `func` to each item on a bounded pool of threads.
+
+    Items are pulled from `items` lazily, so at most `workers * 2` items are held in memory at once and `items` can be
+    an arbitrarily large iterable. Exceptions raised by `func` are captured on the `Outcome` of the item instead of
+    being raised.
+
+    :param func: Callable accepting a single item.
+    :param items: The items to process.
+    :param workers: The number of threads to use. Defaults to 8.
+    :param throttle: Optional `Throttle` each call of `func` must pass through, usually `britive.throttle`.
+    :param retries: The number of times to retry an item which failed with one of `retry_on`. Defaults to 0.
+    :param backoff_factor: Retries sleep for `(2 ** (attempt - 1)) * backoff_factor` seconds. Defaults to 1.
+    :param retry_on: Exception types worth retrying. Defaults to connection errors, timeouts and 500/503 responses.
+    :param ordered: Yield outcomes in the order of `items` instead of in order of completion. Defaults to False.
+    :return: Generator of `Outcome`.
+    """
+
+    if workers < 1:
+        raise ValueError('workers must be at least 1.')
+
+    items = enumerate(items)
+    pending = set()
+    completed = {}
+    next_index = 0
+    exhausted = False
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        while True:
+            while not exhausted and len(pending) + len(completed) < workers * 2:
+                try:
+                    index, item = next(items)
+                except StopIteration:
+                    exhausted = True
+                    break
+                pending.add(
+                    executor.submit(_attempt, func, Outcome(index, item), throttle, retries, backoff_factor, retry_on)
+                )
+
+            if not pending:
+                break
+
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                outcome = future.result()
+                if not ordered:
+                    yield outcome
+                    continue
+                completed[outcome.index] = outcome
+            while next_index in completed:
+                yield completed.pop(next_index)
+                next_index += 1
+
+
+def chunked(items: Iterable, size: int) -> Iterator[list]:
+    """
+    Split `items` into lists of at most `size` items.
+
+    :param items: The items to split.
+    :param size: The maximum number of items per chunk.
+    :return: Generator of lists.
+    """
+
+    if size < 1:
+        raise ValueError('size must be at least 1.')
+
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def post_in_chunks(britive, url: str, items: list, chunk_size: int = 100) -> list:
+    """
+    POST a large list body as several smaller requests, sent concurrently through `britive.throttle`.
+
+    Intended for endpoints which accept a list of IDs and respond with a list of records, one per ID.
+
+    :param britive: The `Britive` instance to send the requests with.
+    :param url: The URL to POST to.
+    :param items: The list to send as the request body.
+    :param chunk_size: The maximum number of items sent per request. Defaults to 100.
+    :return: The responses of each request concatenated together, in the order of `items`.
+    :raises: The error of the first failed chunk, after all chunks have been attempted. Chunks which did not fail
+        will have been applied.
+    """
+
+    chunks = list(chunked(items, chunk_size))
+    if len(chunks) <= 1:
+        return britive.post(url, json=chunks[0] if chunks else [])
+
+    def post(chunk: list) -> list:
+        return britive.post(url, json=chunk)
+
+    return [record for result in _results(britive, post, chunks) for record in result or []]
+
+
+def get_all_pages(britive, url: str, params: dict = None, size: int = 100) -> list:
+    """
+    Retrieve every record of an `inline` paginated listing, fetching all pages after the first concurrently through
+    `britive.throttle`.
+
+    :param britive: The `Britive` instance to send the requests with.
+    :param url: The URL to GET.
+    :param params: Optional query parameters, excluding `page` and `size`.
+    :param size: The page size to request. Defaults to 100.
+    :return: The records of all pages, in page order. A response which is not paginated is returned as is.
+    """
+
+    # every page, the first included, takes its own slot of the throttle - so this must not be called while already
+    # holding one, e.g. from a function run via `run_concurrently` with `throttle=britive.throttle`
+    params = {**(params or {}), 'page': 0, 'size': size}
+    with britive.throttle:
+        first = britive.get_page(url, params=params)
+    if pagination_type({}, first) != 'inline':
+        return first
+
+    def get(page: int) -> list:
+        return britive.get_page(url, params={**params, 'page': page})['data']
+
+    pages = range(1, math.ceil(first['count'] / first['size'])) if first['size'] else []
+    return first['data'] + [record for result in _results(britive, get, pages) for record in result]
+
+
+def _results(britive, func: Callable, items: Iterable) -> list:
+    # run `func` over `items` through the client throttle, raising the first error after all items were attempted
+    throttle = britive.throttle
+    outcomes = list(run_concurrently(func, items, workers=throttle.max_concurrency, throttle=throttle, ordered=True))
+    if failed := next((outcome for outcome in outcomes if not outcome.ok), None):
+        raise failed.error
+    return [outcome.result for outcome in outcomes]
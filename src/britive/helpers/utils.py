@@ -1,8 +1,12 @@
 import warnings
+from functools import lru_cache
 from typing import Optional, Union
 
+import jmespath
 import requests
 import urllib3
+from jmespath.exceptions import EmptyExpressionError, ParseError
+from jmespath.parser import ParsedResult
 
 from britive.exceptions import BritiveException, InvalidFederationProvider, allowed_exceptions
 from britive.exceptions.badrequest import bad_request_code_map
@@ -40,6 +44,24 @@ def check_response_for_error(status_code, content) -> None:
         )(message)
 
 
+@lru_cache(maxsize=256)
+def compile_jmespath(expression: str) -> Union[ParsedResult, None]:
+    """
+    Compile a JMESPath expression, caching the compiled expression for reuse.
+
+    :param expression: The JMESPath expression.
+    :return: The compiled expression, or None if the expression is empty.
+    :raises: ValueError - If the expression is not valid JMESPath.
+    """
+
+    try:
+        return jmespath.compile(expression)
+    except EmptyExpressionError:
+        return None
+    except ParseError as e:
+        raise ValueError('Invalid JMESPath.') from e
+
+
 def handle_response(response):
     try:
         return response.json()
@@ -1,3 +1,4 @@
+from .directory import DirectorySnapshot
 from .identity_attributes import IdentityAttributes
 from .identity_providers import IdentityProviders
 from .service_identities import ServiceIdentities, ServiceIdentityTokens
@@ -9,6 +10,7 @@ from .workload import Workload
 class IdentityManagement:
     def __init__(self, britive) -> None:
         self.ai_identities = ServiceIdentities(britive, identity_type='AIIdentity')
+        self.directory = DirectorySnapshot(britive)
         self.identity_attributes = IdentityAttributes(britive)
         self.identity_providers = IdentityProviders(britive)
         self.service_identities = ServiceIdentities(britive)
@@ -0,0 +1,440 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable
+
+from britive.helpers.concurrency import get_all_pages
+
+principal_types = ('User', 'ServiceIdentity')
+
+
+def _key(value: str) -> str:
+    return value.casefold() if value else None
+
+
+def _tag_id(tag) -> str:
+    # tags embedded in principal records are usually dicts but may be bare ids
+    return (tag.get('userTagId') or tag.get('id')) if isinstance(tag, dict) else tag
+
+
+class Principal:
+    """Compact record of a user or service identity held by a `DirectorySnapshot`."""
+
+    __slots__ = ('email', 'id', 'modified', 'name', 'status', 'tag_ids', 'type', 'username')
+
+    def __init__(self, record: dict) -> None:
+        self.id = record['userId']
+        self.type = record.get('type')
+        self.name = record.get('name')
+        self.username = record.get('username')
+        self.email = record.get('email')
+        self.status = record.get('status')
+        self.modified = record.get('modified')
+        self.tag_ids = tuple(_tag_id(tag) for tag in record.get('userTags') or [])
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, Principal) and all(getattr(self, s) == getattr(other, s) for s in self.__slots__)
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f'Principal(id={self.id!r}, type={self.type!r}, name={self.name!r})'
+
+
+class Tag:
+    """Compact record of a tag held by a `DirectorySnapshot`."""
+
+    __slots__ = ('external', 'id', 'modified', 'name', 'status')
+
+    def __init__(self, record: dict) -> None:
+        self.id = record['userTagId']
+        self.name = record.get('name')
+        self.status = record.get('status')
+        self.external = record.get('external')
+        self.modified = record.get('modified')
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, Tag) and all(getattr(self, s) == getattr(other, s) for s in self.__slots__)
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f'Tag(id={self.id!r}, name={self.name!r})'
+
+
+class DirectorySnapshot:
+    """
+    In-memory snapshot of the users, service identities and tags of a tenant.
+
+    The snapshot is loaded with a handful of concurrent paginated listings and indexes principals by id, username,
+    email, name and status, and tags by id and name, so exact lookups and user to tag joins are answered locally
+    without any API calls. Username, email and name lookups are case-insensitive.
+
+    The snapshot is not loaded until `load` is called (or the first lookup is made). After that it reflects the last
+    `load` or `refresh` plus the writes made through this SDK, which are applied as they complete:
+
+        - users and service identities created, updated, enabled, disabled or deleted
+        - tags created, updated, enabled, disabled or deleted
+        - users added to or removed from a tag, including by `Tags.sync_members`
+
+    Changes to tag membership rules discard the snapshot (see `invalidate`) so it is loaded again by the next lookup.
+    Changes made outside of this SDK are only picked up by `load` or `refresh`, or by the refresh which
+    `principals_by_names` makes when a name is not found.
+    """
+
+    def __init__(self, britive) -> None:
+        self.britive = britive
+        self.base_url = f'{self.britive.base_url}'
+        self.loaded_at = None
+        self.negative_ttl = 60
+        self._lock = threading.RLock()
+        self._misses = {}
+        self._principals = {}
+        self._tags = {}
+        self._clear_indexes()
+
+    def _clear_indexes(self) -> None:
+        self._misses = {}
+        self._by_username = {}
+        self._by_email = {}
+        self._by_name = {}
+        self._by_status = {}
+        self._tags_by_name = {}
+        self._members = {}
+
+    def load(self) -> 'DirectorySnapshot':
+        """
+        Load (or fully reload) the snapshot.
+
+        :return: The snapshot.
+        """
+
+        principals, tags = self._fetch()
+        with self._lock:
+            self._principals = {}
+            self._tags = {}
+            self._clear_indexes()
+            for tag in tags:
+                self._put_tag(tag)
+            for principal in principals:
+                self._put_principal(principal)
+            self.loaded_at = time.time()
+        return self
+
+    def refresh(self) -> dict:
+        """
+        Bring a loaded snapshot up to date, re-indexing only the records which changed.
+
+        :return: Dict of the number of records `added`, `updated` and `removed`.
+        """
+
+        if self.loaded_at is None:
+            self.load()
+            return {'added': len(self._principals) + len(self._tags), 'updated': 0, 'removed': 0}
+
+        principals, tags = self._fetch()
+        changes = {'added': 0, 'updated': 0, 'removed': 0}
+        with self._lock:
+            for records, existing, put, remove in (
+                (tags, self._tags, self._put_tag, self._remove_tag),
+                (principals, self._principals, self._put_principal, self._remove_principal),
+            ):
+                seen = set()
+                for record in records:
+                    seen.add(record.id)
+                    if (current := existing.get(record.id)) is None:
+                        changes['added'] += 1
+                    elif current == record:
+                        continue
+                    else:
+                        changes['updated'] += 1
+                    put(record)
+                for record_id in set(existing) - seen:
+                    remove(record_id)
+                    changes['removed'] += 1
+            self.loaded_at = time.time()
+        return changes
+
+    def put(self, record: dict) -> None:
+        """
+        Add or replace a single principal or tag, e.g. one that was just created, without reloading the snapshot.
+
+        Does nothing until the snapshot is loaded. A principal record without tags keeps the tag memberships already
+        known for the principal. Anything other than a principal or tag record discards the snapshot (see
+        `invalidate`).
+
+        :param record: A principal (user or service identity) or tag record as returned by the Britive API.
+        :return: None
+        """
+
+        if self.loaded_at is None:
+            return
+        with self._lock:
+            if not isinstance(record, dict) or not record.keys() & {'userId', 'userTagId'}:
+                self.invalidate()  # the change cannot be applied record by record so the snapshot is not trusted
+                return
+            if 'userTagId' in record:
+                self._put_tag(Tag(record))
+                return
+            principal = Principal(record)
+            # records returned by most calls do not include tags, in which case the known memberships are kept
+            if 'userTags' not in record and (existing := self._principals.get(principal.id)):
+                principal.tag_ids = existing.tag_ids
+            self._put_principal(principal)
+
+    def discard(self, record_id: str) -> None:
+        """
+        Remove a single principal or tag, e.g. one that was just deleted, without reloading the snapshot.
+
+        Does nothing until the snapshot is loaded.
+
+        :param record_id: The ID of the principal or tag.
+        :return: None
+        """
+
+        if self.loaded_at is None:
+            return
+        with self._lock:
+            if record_id in self._tags:
+                self._remove_tag(record_id)
+            elif record_id in self._principals:
+                self._remove_principal(record_id)
+
+    def add_member(self, tag_id: str, principal_id: str) -> None:
+        """
+        Record that a principal was added to a tag, without reloading the snapshot.
+
+        Does nothing until the snapshot is loaded.
+
+        :param tag_id: The ID of the tag.
+        :param principal_id: The ID of the user or service identity.
+        :return: None
+        """
+
+        if self.loaded_at is None:
+            return
+        with self._lock:
+            principal = self._principals.get(principal_id)
+            if principal and tag_id not in principal.tag_ids:
+                principal.tag_ids += (tag_id,)
+                self._members.setdefault(tag_id, set()).add(principal_id)
+
+    def remove_member(self, tag_id: str, principal_id: str) -> None:
+        """
+        Record that a principal was removed from a tag, without reloading the snapshot.
+
+        Does nothing until the snapshot is loaded.
+
+        :param tag_id: The ID of the tag.
+        :param principal_id: The ID of the user or service identity.
+        :return: None
+        """
+
+        if self.loaded_at is None:
+            return
+        with self._lock:
+            if principal := self._principals.get(principal_id):
+                principal.tag_ids = tuple(t for t in principal.tag_ids if t != tag_id)
+            self._members.get(tag_id, set()).discard(principal_id)
+
+    def invalidate(self) -> None:
+        """
+        Discard the snapshot, including remembered misses, so the next lookup loads it again.
+
+        Used after changes which cannot be applied to the snapshot record by record.
+
+        :return: None
+        """
+
+        with self._lock:
+            self.loaded_at = None
+            self._principals = {}
+            self._tags = {}
+            self._clear_indexes()
+
+    def principal(self, principal_id: str) -> Principal:
+        """
+        Return the user or service identity with the given ID.
+
+        :param principal_id: The ID of the user or service identity.
+        :return: The principal or None if not found.
+        """
+
+        return self._loaded()._principals.get(principal_id)
+
+    def user_by_username(self, username: str) -> Principal:
+        """
+        Return the user with the given username.
+
+        :param username: The exact username (case-insensitive).
+        :return: The principal or None if not found.
+        """
+
+        principal_id = self._loaded()._by_username.get(_key(username))
+        return self._principals.get(principal_id)
+
+    def user_by_email(self, email: str) -> Principal:
+        """
+        Return the user with the given email address.
+
+        :param email: The exact email address (case-insensitive).
+        :return: The principal or None if not found.
+        """
+
+        principal_id = self._loaded()._by_email.get(_key(email))
+        return self._principals.get(principal_id)
+
+    def principals_by_name(self, name: str, principal_type: str = None) -> list:
+        """
+        Return the principals with the given name.
+
+        :param name: The exact name (case-insensitive).
+        :param principal_type: Optionally only return principals of this type, e.g. `User` or `ServiceIdentity`.
+        :return: List of principals.
+        """
+
+        ids = self._loaded()._by_name.get(_key(name), ())
+        return [p for p in map(self._principals.get, ids) if not principal_type or p.type == principal_type]
+
+    def principals_by_names(self, names: Iterable[str], principal_type: str = None) -> dict:
+        """
+        Return the principals with each of the given names in a single pass.
+
+        If any name is not found in a snapshot which was loaded earlier, the snapshot is refreshed once so principals
+        created elsewhere since it was loaded are still found. Names which are still not found are remembered for
+        `negative_ttl` seconds (60 by default) so looking them up again does not trigger another refresh.
+
+        :param names: The exact names (case-insensitive).
+        :param principal_type: Optionally only return principals of this type, e.g. `User` or `ServiceIdentity`.
+        :return: Dict of each name to the list of principals with that name. The list is empty if none were found.
+        """
+
+        names = list(dict.fromkeys(names))
+        loaded = self.loaded_at is not None
+        found = {name: self.principals_by_name(name, principal_type) for name in names}
+
+        now = time.monotonic()
+        with self._lock:
+            missing = [n for n in names if not found[n] and self._misses.get((principal_type, _key(n)), 0) <= now]
+        if missing and loaded:
+            self.refresh()
+            for name in missing:
+                found[name] = self.principals_by_name(name, principal_type)
+        with self._lock:
+            for name in missing:
+                if not found[name]:
+                    self._misses[(principal_type, _key(name))] = time.monotonic() + self.negative_ttl
+        return found
+
+    def principals_by_status(self, status: str, principal_type: str = None) -> list:
+        """
+        Return the principals with the given status.
+
+        :param status: The status, e.g. `active` or `inactive`.
+        :param principal_type: Optionally only return principals of this type, e.g. `User` or `ServiceIdentity`.
+        :return: List of principals.
+        """
+
+        ids = self._loaded()._by_status.get(status, ())
+        return [p for p in map(self._principals.get, ids) if not principal_type or p.type == principal_type]
+
+    def tag(self, tag_id: str) -> Tag:
+        """
+        Return the tag with the given ID.
+
+        :param tag_id: The ID of the tag.
+        :return: The tag or None if not found.
+        """
+
+        return self._loaded()._tags.get(tag_id)
+
+    def tag_by_name(self, name: str) -> Tag:
+        """
+        Return the tag with the given name.
+
+        :param name: The exact name (case-insensitive).
+        :return: The tag or None if not found.
+        """
+
+        tag_id = self._loaded()._tags_by_name.get(_key(name))
+        return self._tags.get(tag_id)
+
+    def tags_for(self, principal_id: str) -> list:
+        """
+        Return the tags the given principal is a member of.
+
+        :param principal_id: The ID of the user or service identity.
+        :return: List of tags. Empty if the principal is not found.
+        """
+
+        principal = self.principal(principal_id)
+        return [self._tags[t] for t in principal.tag_ids if t in self._tags] if principal else []
+
+    def members(self, tag_id: str) -> list:
+        """
+        Return the principals which are members of the given tag.
+
+        :param tag_id: The ID of the tag.
+        :return: List of principals.
+        """
+
+        return [self._principals[p] for p in self._loaded()._members.get(tag_id, ())]
+
+    def _loaded(self) -> 'DirectorySnapshot':
+        if self.loaded_at is None:
+            with self._lock:
+                if self.loaded_at is None:
+                    self.load()
+        return self
+
+    def _fetch(self) -> tuple:
+        listings = [(f'{self.base_url}/users', {'type': t, 'includeTags': 'true'}) for t in principal_types]
+        listings.append((f'{self.base_url}/user-tags', {}))
+
+        # each listing fetches its own pages through the client throttle - the listings themselves run side by side
+        with ThreadPoolExecutor(max_workers=len(listings)) as executor:
+            futures = [executor.submit(get_all_pages, self.britive, url, params) for url, params in listings]
+            *principals, tags = [future.result() for future in futures]
+
+        return [Principal(r) for listing in principals for r in listing], [Tag(r) for r in tags]
+
+    def _put_principal(self, principal: Principal) -> None:
+        if principal.id in self._principals:
+            self._remove_principal(principal.id)
+        self._principals[principal.id] = principal
+        for principal_type in (None, principal.type):
+            self._misses.pop((principal_type, _key(principal.name)), None)
+        if principal.username:
+            self._by_username[_key(principal.username)] = principal.id
+        if principal.email:
+            self._by_email[_key(principal.email)] = principal.id
+        if principal.name:
+            self._by_name.setdefault(_key(principal.name), set()).add(principal.id)
+        self._by_status.setdefault(principal.status, set()).add(principal.id)
+        for tag_id in principal.tag_ids:
+            self._members.setdefault(tag_id, set()).add(principal.id)
+
+    def _remove_principal(self, principal_id: str) -> None:
+        principal = self._principals.pop(principal_id)
+        if self._by_username.get(_key(principal.username)) == principal_id:
+            del self._by_username[_key(principal.username)]
+        if self._by_email.get(_key(principal.email)) == principal_id:
+            del self._by_email[_key(principal.email)]
+        self._by_name.get(_key(principal.name), set()).discard(principal_id)
+        self._by_status.get(principal.status, set()).discard(principal_id)
+        for tag_id in principal.tag_ids:
+            self._members.get(tag_id, set()).discard(principal_id)
+
+    def _put_tag(self, tag: Tag) -> None:
+        if tag.id in self._tags:
+            self._remove_tag(tag.id, keep_members=True)
+        self._tags[tag.id] = tag
+        if tag.name:
+            self._tags_by_name[_key(tag.name)] = tag.id
+
+    def _remove_tag(self, tag_id: str, keep_members: bool = False) -> None:
+        tag = self._tags.pop(tag_id)
+        if self._tags_by_name.get(_key(tag.name)) == tag_id:
+            del self._tags_by_name[_key(tag.name)]
+        if not keep_members:
+            self._members.pop(tag_id, None)
@@ -1,19 +1,107 @@
-from typing import Any
+import threading
+import time
+from typing import Any, Callable, Union
+
+from britive.helpers.concurrency import BulkReport, run_concurrently
+
+
+class AttributeCatalogue:
+    """Point in time name <-> ID lookups over the identity attributes of a tenant."""
+
+    def __init__(self, attributes: list) -> None:
+        self.attributes = attributes
+        self.loaded_at = time.monotonic()
+        self.by_id = {}
+        self.by_name = {}
+        self._custom_by_name = {}
+        for attribute in attributes:
+            self.by_id[attribute['id']] = attribute
+            self.by_name.setdefault(attribute['name'], attribute)
+            if not attribute.get('builtIn'):
+                self._custom_by_name.setdefault(attribute['name'], attribute)
+
+    def resolve(self, id_or_name: str, custom_only: bool = False) -> Union[str, None]:
+        """
+        Resolve an identity attribute ID or name to its ID.
+
+        :param id_or_name: The ID or name of the identity attribute.
+        :param custom_only: Only consider custom (not built-in) identity attributes.
+        :return: The ID of the identity attribute or None if not found.
+        """
+
+        attribute = self.by_id.get(id_or_name)
+        if attribute is None or (custom_only and attribute.get('builtIn')):
+            attribute = (self._custom_by_name if custom_only else self.by_name).get(id_or_name)
+        return attribute['id'] if attribute else None
 
 
 class IdentityAttributes:
     def __init__(self, britive) -> None:
         self.britive = britive
         self.base_url = f'{self.britive.base_url}/users/attributes'
+        self.catalogue_ttl = 300
+        self.negative_ttl = 60
+        self._catalogue = None
+        self._lock = threading.Lock()
+        self._misses = {}
 
     def list(self) -> list:
         """
         Return a list of identity attributes.
 
+        Also refreshes the cached attribute catalogue (see `catalogue`).
+
         :return: List of identity attributes.
         """
 
-        return self.britive.get(self.base_url)
+        attributes = self.britive.get(self.base_url)
+        self._catalogue = AttributeCatalogue(attributes)
+        self._misses = {}
+        return attributes
+
+    def catalogue(self, refresh: bool = False) -> AttributeCatalogue:
+        """
+        Return a cached catalogue of the identity attributes, for name <-> ID lookups.
+
+        The catalogue is shared by every operation which needs to translate identity attribute names to IDs. It is
+        reloaded once older than `catalogue_ttl` seconds (300 by default) and discarded whenever an identity attribute
+        is created or deleted through this SDK.
+
+        :param refresh: Reload the catalogue even if the cached catalogue has not expired.
+        :return: The attribute catalogue.
+        """
+
+        with self._lock:
+            catalogue = self._catalogue
+            if refresh or not catalogue or time.monotonic() - catalogue.loaded_at > self.catalogue_ttl:
+                self.list()
+            return self._catalogue
+
+    def resolve(self, id_or_name: str, custom_only: bool = False) -> Union[str, None]:
+        """
+        Resolve an identity attribute ID or name to its ID using the cached catalogue.
+
+        If the attribute is not found in a catalogue which was cached earlier the catalogue is reloaded and checked
+        once more, so attributes created elsewhere since the catalogue was loaded are still found. IDs and names which
+        are still not found are remembered for `negative_ttl` seconds (60 by default), or until the catalogue is next
+        reloaded, so resolving them again does not trigger another reload.
+
+        :param id_or_name: The ID or name of the identity attribute.
+        :param custom_only: Only consider custom (not built-in) identity attributes.
+        :return: The ID of the identity attribute or None if not found.
+        """
+
+        cached = self._catalogue
+        catalogue = self.catalogue()
+        attribute_id = catalogue.resolve(id_or_name, custom_only=custom_only)
+        if attribute_id is not None or catalogue is not cached:
+            return attribute_id
+        if self._misses.get((custom_only, id_or_name), 0) > time.monotonic():
+            return None
+        attribute_id = self.catalogue(refresh=True).resolve(id_or_name, custom_only=custom_only)
+        if attribute_id is None:
+            self._misses[(custom_only, id_or_name)] = time.monotonic() + self.negative_ttl
+        return attribute_id
 
     def create(
         self, name: str, description: str, data_type: str, multi_valued: bool, identity_types: list = ['User']
@@ -45,7 +133,9 @@ class IdentityAttributes:
             'identityTypes': identity_types,
         }
 
-        return self.britive.post(self.base_url, json=data)
+        attribute = self.britive.post(self.base_url, json=data)
+        self._catalogue = None
+        return attribute
 
     def delete(self, attribute_id: str) -> None:
         """
@@ -55,7 +145,9 @@ class IdentityAttributes:
         :return: None
         """
 
-        return self.britive.delete(f'{self.base_url}/{attribute_id}')
+        response = self.britive.delete(f'{self.base_url}/{attribute_id}')
+        self._catalogue = None
+        return response
 
     def identity_types(self) -> list:
         """
@@ -117,22 +209,103 @@ class CustomAttributes:
         """
         return self._modify(principal_id=principal_id, operation='remove', custom_attributes=custom_attributes)
 
+    def apply_many(
+        self,
+        custom_attributes: dict,
+        current: dict = None,
+        workers: int = 8,
+        retries: int = 2,
+        progress_func: Callable = None,
+    ) -> dict:
+        """
+        Set custom attributes on many Service Identities and/or Users concurrently.
+
+        Attribute names are resolved to IDs once for the whole batch and the PATCH requests are sent concurrently
+        through the client throttle (`britive.throttle`). A failed principal does not abort the others.
+
+        If the current custom attributes of a principal are provided via `current` only the difference is sent - values
+        missing from the principal are added and other values of the same attributes are removed. Principals which
+        already hold the desired values are not sent a request at all. Without `current` all desired values are added.
+
+        :param custom_attributes: Dict of principal IDs to attribute maps, where each attribute map has custom
+            attribute ids or names as keys and values as strings or list of strings for multivalued attributes.
+        :param current: Optional dict of principal IDs to the current attributes of the principal, as returned by
+            `get(principal_id, as_dict=True)`.
+        :param workers: The number of principals to update concurrently. Defaults to 8.
+        :param retries: The number of times to retry a principal which failed with a transient error. Defaults to 2.
+        :param progress_func: An optional callback invoked with each per principal result as it completes.
+        :return: A report as described by `BulkReport`. `results` are in the order of `custom_attributes`, with keys
+            `principal_id`, `status` (`updated`, `unchanged` or `failed`), `operations` (the number of attribute
+            values added or removed), `error` and `attempts`.
+        :raises: ValueError - If any custom attribute name cannot be found. No requests are sent in that case.
+        """
+
+        current = current or {}
+        identity_attributes = self.britive.identity_management.identity_attributes
+
+        # resolve every distinct attribute name up front so a typo fails the whole batch before anything is sent
+        attribute_ids = {}
+        for id_or_name in {key for attributes in custom_attributes.values() for key in attributes}:
+            if not (attribute_id := identity_attributes.resolve(id_or_name, custom_only=True)):
+                raise ValueError(f'custom identity attribute name {id_or_name} not found.')
+            attribute_ids[id_or_name] = attribute_id
+
+        report = BulkReport(('updated', 'unchanged', 'failed'), progress_func)
+        documents = []
+        for principal_id, attributes in custom_attributes.items():
+            existing = current.get(principal_id)
+            operations = []
+            for id_or_name, value in attributes.items():
+                attribute_id = attribute_ids[id_or_name]
+                desired = [str(v) for v in (value if isinstance(value, list) else [value])]
+                if existing is None:
+                    held = []
+                else:
+                    held = existing.get(attribute_id, existing.get(id_or_name, []))
+                    held = [str(v) for v in (held if isinstance(held, list) else [held])]
+                operations += [('add', attribute_id, v) for v in desired if v not in held]
+                operations += [('remove', attribute_id, v) for v in held if v not in desired]
+            patch_list = [
+                {'op': op, 'customUserAttribute': {'attributeValue': v, 'attributeId': attribute_id}}
+                for op, attribute_id, v in operations
+            ]
+            documents.append((principal_id, patch_list))
+
+        def patch(document: tuple) -> None:
+            principal_id, operations = document
+            if operations:
+                self.britive.patch(self.base_url.format(id=principal_id), json=operations)
+
+        for outcome in run_concurrently(
+            patch,
+            documents,
+            workers=workers,
+            throttle=self.britive.throttle,
+            retries=retries,
+            backoff_factor=self.britive.retry_backoff_factor,
+            ordered=True,
+        ):
+            principal_id, operations = outcome.item
+            report.add(
+                {
+                    'principal_id': principal_id,
+                    'status': ('updated' if operations else 'unchanged') if outcome.ok else 'failed',
+                    'operations': len(operations),
+                    'error': None if outcome.ok else str(outcome.error),
+                    'attempts': outcome.attempts,
+                }
+            )
+
+        return report.summarize()
+
     def _build_list(self, operation: str, custom_attributes: dict) -> list:
-        # first get list of existing custom identity attributes and build some helpers
-        existing_attrs = [
-            attr for attr in self.britive.identity_management.identity_attributes.list() if not attr['builtIn']
-        ]
-        existing_attr_ids = [attr['id'] for attr in existing_attrs]
-        attrs_by_name = {attr['name']: attr['id'] for attr in existing_attrs}
+        identity_attributes = self.britive.identity_management.identity_attributes
 
         # for each custom_attribute key/value provided ensure we convert to ID and build the list
         attrs_list = []
         for id_or_name, value in custom_attributes.items():
-            # obtain the custom attribute id
-            custom_attribute_id = id_or_name
-            if custom_attribute_id not in existing_attr_ids:
-                custom_attribute_id = attrs_by_name.get(custom_attribute_id)
-            if not custom_attribute_id:
+            # obtain the custom attribute id from the cached attribute catalogue
+            if not (custom_attribute_id := identity_attributes.resolve(id_or_name, custom_only=True)):
                 raise ValueError(f'custom identity attribute name {id_or_name} not found.')
 
             # and create the list dict entry for each value
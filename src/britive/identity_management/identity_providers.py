@@ -1,3 +1,8 @@
+from typing import Callable
+
+from britive.helpers.concurrency import BulkReport, run_concurrently
+
+
 class IdentityProviders:
     def __init__(self, britive) -> None:
         self.britive = britive
@@ -269,3 +274,125 @@ class ScimAttributes:
         """
 
         return self.britive.patch(f'{self.base_url}/{identity_provider_id}/scim-attribute-mappings', json=mappings)
+
+    def plan_mappings(self, desired: dict, prune: bool = True, workers: int = 8, retries: int = 2) -> dict:
+        """
+        Compute the minimal SCIM mapping changes needed to bring many identity providers to the desired mappings.
+
+        The current mappings of all identity providers are fetched concurrently through the client throttle
+        (`britive.throttle`) and compared with the desired mappings. Pass the result to `apply_mappings`.
+
+        :param desired: Dict of identity provider IDs to mapping dicts, where each mapping dict has identity attribute
+            ids or names as keys and the SCIM attribute names (as returned by `list`) they are mapped from as values.
+        :param prune: Remove current mappings of identity attributes which are not in the desired mappings.
+            Defaults to True.
+        :param workers: The number of identity providers to fetch concurrently. Defaults to 8.
+        :param retries: The number of times to retry a fetch which failed with a transient error. Defaults to 2.
+        :return: Dict of identity provider IDs to the list of mapping operations (in the format accepted by
+            `update_mapping`) needed for that identity provider. The list is empty for identity providers which
+            already have the desired mappings.
+        :raises: ValueError - If any identity attribute name cannot be found. No requests are sent in that case.
+        """
+
+        identity_attributes = self.britive.identity_management.identity_attributes
+
+        # resolve every distinct attribute name up front so a typo fails the whole plan before anything is fetched
+        attributes = {}
+        for id_or_name in {key for mappings in desired.values() for key in mappings}:
+            if not (attribute_id := identity_attributes.resolve(id_or_name)):
+                raise ValueError(f'identity attribute name {id_or_name} not found.')
+            attributes[id_or_name] = identity_attributes.catalogue().by_id[attribute_id]
+
+        def get(identity_provider_id: str) -> list:
+            idp = self.britive.get(f'{self.base_url}/{identity_provider_id}')
+            return idp.get('userAttributeScimMappings') or []
+
+        plan = {}
+        for outcome in run_concurrently(
+            get,
+            desired,
+            workers=workers,
+            throttle=self.britive.throttle,
+            retries=retries,
+            backoff_factor=self.britive.retry_backoff_factor,
+            ordered=True,
+        ):
+            if not outcome.ok:
+                raise outcome.error
+            current = {mapping['attributeId']: mapping for mapping in outcome.result}
+            operations = []
+            wanted = set()
+            for id_or_name, scim_attribute_name in desired[outcome.item].items():
+                attribute = attributes[id_or_name]
+                wanted.add(attribute['id'])
+                mapping = current.get(attribute['id'])
+                if mapping and mapping.get('scimAttributeName') == scim_attribute_name:
+                    continue
+                # adding a mapping replaces any existing mapping of the identity attribute
+                operations.append(
+                    {
+                        'scimAttributeName': scim_attribute_name,
+                        'builtIn': bool(attribute.get('builtIn')),
+                        'attributeId': attribute['id'],
+                        'attributeName': attribute['name'],
+                        'op': 'add',
+                    }
+                )
+            if prune:
+                operations += [
+                    {
+                        'scimAttributeName': mapping.get('scimAttributeName'),
+                        'builtIn': mapping.get('builtIn'),
+                        'attributeId': attribute_id,
+                        'attributeName': mapping.get('attributeName'),
+                        'op': 'remove',
+                    }
+                    for attribute_id, mapping in current.items()
+                    if attribute_id not in wanted
+                ]
+            plan[outcome.item] = operations
+        return plan
+
+    def apply_mappings(self, plan: dict, workers: int = 8, retries: int = 2, progress_func: Callable = None) -> dict:
+        """
+        Apply SCIM mapping changes to many identity providers concurrently.
+
+        Only identity providers with changes are sent a request, through the client throttle (`britive.throttle`). A
+        failed identity provider does not abort the others.
+
+        :param plan: Dict of identity provider IDs to lists of mapping operations, as returned by `plan_mappings`.
+        :param workers: The number of identity providers to update concurrently. Defaults to 8.
+        :param retries: The number of times to retry an update which failed with a transient error. Defaults to 2.
+        :param progress_func: An optional callback invoked with each per identity provider result as it completes.
+        :return: A report as described by `BulkReport`. `results` are in the order of `plan`, with keys
+            `identity_provider_id`, `status` (`updated`, `unchanged` or `failed`), `operations` (the number of
+            mappings added or removed), `error` and `attempts`.
+        """
+
+        def update(item: tuple) -> None:
+            identity_provider_id, operations = item
+            if operations:
+                self.update_mapping(identity_provider_id=identity_provider_id, mappings=operations)
+
+        report = BulkReport(('updated', 'unchanged', 'failed'), progress_func)
+        for outcome in run_concurrently(
+            update,
+            plan.items(),
+            workers=workers,
+            throttle=self.britive.throttle,
+            retries=retries,
+            backoff_factor=self.britive.retry_backoff_factor,
+            ordered=True,
+        ):
+            identity_provider_id, operations = outcome.item
+            report.add(
+                {
+                    'identity_provider_id': identity_provider_id,
+                    'status': ('updated' if operations else 'unchanged') if outcome.ok else 'failed',
+                    'operations': len(operations),
+                    'error': None if outcome.ok else str(outcome.error),
+                    'attempts': outcome.attempts,
+                }
+            )
+
+        return report.summarize()
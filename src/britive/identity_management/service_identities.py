@@ -1,8 +1,46 @@
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Iterable
+
+from britive.helpers.concurrency import BulkReport, post_in_chunks, run_concurrently
+
+from .directory import Principal, principal_types
 from .identity_attributes import CustomAttributes
 
 valid_statues = ['active', 'inactive']
 
 
+def _timestamp(value) -> datetime:
+    # token timestamps are ISO 8601 strings (usually with a trailing `Z`) or epoch milliseconds
+    if value is None or value == '':
+        return None
+    if isinstance(value, (int, float)):
+        return datetime.fromtimestamp(value / 1000, tz=timezone.utc)
+    parsed = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def token_expires_at(token: dict) -> datetime:
+    """
+    Determine when a service identity token expires.
+
+    Uses the explicit expiration time of the token when present, otherwise the token expires `tokenExpirationDays`
+    after it was last used (or created, if it was never used).
+
+    :param token: Token details as returned by `ServiceIdentityTokens.get`.
+    :return: Timezone aware expiration time or None if it cannot be determined.
+    """
+
+    if not token:
+        return None
+    if expires := token.get('expiresOn') or token.get('expirationTime'):
+        return _timestamp(expires)
+    last_used = _timestamp(token.get('lastAccessedOn') or token.get('lastUsedOn') or token.get('createdOn'))
+    if last_used is None or not token.get('tokenExpirationDays'):
+        return None
+    return last_used + timedelta(days=token['tokenExpirationDays'])
+
+
 class ServiceIdentities:
     def __init__(self, britive, identity_type: str = 'ServiceIdentity') -> None:
         self.britive = britive
@@ -49,6 +87,43 @@ class ServiceIdentities:
 
         return self.list(filter_expression=f'name co "{name}"')
 
+    def get_by_exact_name(self, name: str) -> list:
+        """
+        Return service identities whose name is exactly `name` (case-insensitive).
+
+        See `get_many_by_name`.
+
+        :param name: The exact name of the service identity.
+        :return: List of compact service identity records (`Principal`). If no service identity is found will return an
+            empty list.
+        """
+
+        return self.get_many_by_name([name])[name]
+
+    def get_many_by_name(self, names: Iterable[str]) -> dict:
+        """
+        Return service identities whose name is exactly each of the given names (case-insensitive).
+
+        All names are resolved in one pass against the directory snapshot (`britive.identity_management.directory`),
+        which is loaded on first use. Names which are not found refresh the snapshot at most once per call and are then
+        remembered as missing for a short while. Identity types which are not held by the snapshot are looked up with
+        one `name eq` filtered list request per name instead.
+
+        :param names: The exact names of the service identities.
+        :return: Dict of each name to a list of compact service identity records (`Principal`). The list is empty for
+            names which were not found.
+        """
+
+        if self.identity_type in principal_types:
+            directory = self.britive.identity_management.directory
+            return directory.principals_by_names(names, principal_type=self.identity_type)
+
+        found = {}
+        for name in dict.fromkeys(names):
+            records = self.list(filter_expression=f'name eq "{name}"')
+            found[name] = [Principal(r) for r in records if (r.get('name') or '').casefold() == name.casefold()]
+        return found
+
     def get_by_status(self, status: str) -> list:
         """
         Return a list of service identities filtered to `status`.
@@ -98,7 +173,9 @@ class ServiceIdentities:
         if not all(x in kwargs for x in required_fields):
             raise ValueError('Not all required keyword arguments were provided.')
 
-        return self.britive.post(self.base_url, json=kwargs)
+        service_identity = self.britive.post(self.base_url, json=kwargs)
+        self._track(service_identity)
+        return service_identity
 
     def update(self, service_identity_id: str, **kwargs) -> dict:
         """
@@ -122,7 +199,9 @@ class ServiceIdentities:
         self.britive.patch(f'{self.base_url}/{service_identity_id}', json=kwargs)
 
         # return the updated service identity record
-        return self.get(service_identity_id)
+        service_identity = self.get(service_identity_id)
+        self._track(service_identity)
+        return service_identity
 
     def delete(self, service_identity_id: str) -> None:
         """
@@ -133,8 +212,11 @@ class ServiceIdentities:
         """
 
         self.britive.delete(f'{self.base_url}/{service_identity_id}')
+        self.britive.identity_management.directory.discard(service_identity_id)
 
-    def enable(self, service_identity_id: str = None, service_identity_ids: list = None) -> object:
+    def enable(
+        self, service_identity_id: str = None, service_identity_ids: list = None, chunk_size: int = 100
+    ) -> object:
         """
         Enable the given service identities.
 
@@ -143,7 +225,9 @@ class ServiceIdentities:
         will be merged together into one list.
 
         :param service_identity_id: The ID of the user you wish to enable.
-        :param service_identity_ids: A list of user IDs that you wish to enable.
+        :param service_identity_ids: A list of user IDs that you wish to enable. Large lists are split into requests of
+            at most `chunk_size` IDs which are sent concurrently, with the responses merged back in order.
+        :param chunk_size: The maximum number of service identity IDs sent per request. Defaults to 100.
         :return: if `service_identity_ids` is set will return a list of user records, else returns a user dict
         """
 
@@ -153,14 +237,18 @@ class ServiceIdentities:
         if service_identity_id:
             computed_identities.append(service_identity_id)
 
-        # de-dup
-        computed_identities = list(set(computed_identities))
-        response = self.britive.post(f'{self.base_url}/enabled-statuses', json=computed_identities)
+        # de-dup, keeping the order the ids were provided in
+        computed_identities = list(dict.fromkeys(computed_identities))
+        response = post_in_chunks(self.britive, f'{self.base_url}/enabled-statuses', computed_identities, chunk_size)
+        for service_identity in response or []:
+            self._track(service_identity)
         if not service_identity_ids:
             return response[0]
         return response
 
-    def disable(self, service_identity_id: str = None, service_identity_ids: list = None) -> object:
+    def disable(
+        self, service_identity_id: str = None, service_identity_ids: list = None, chunk_size: int = 100
+    ) -> object:
         """
         Disable the given service identities.
 
@@ -169,7 +257,9 @@ class ServiceIdentities:
         provided they will be merged together into one list.
 
         :param service_identity_id: The ID of the user you wish to disable.
-        :param service_identity_ids: A list of user IDs that you wish to disable.
+        :param service_identity_ids: A list of user IDs that you wish to disable. Large lists are split into requests of
+            at most `chunk_size` IDs which are sent concurrently, with the responses merged back in order.
+        :param chunk_size: The maximum number of service identity IDs sent per request. Defaults to 100.
         :return: if `user_ids` is set will return a list of user records, else returns a user dict
         """
 
@@ -179,13 +269,20 @@ class ServiceIdentities:
         if service_identity_id:
             computed_identities.append(service_identity_id)
 
-        # de-dup
-        computed_identities = list(set(computed_identities))
-        response = self.britive.post(f'{self.base_url}/disabled-statuses', json=computed_identities)
+        # de-dup, keeping the order the ids were provided in
+        computed_identities = list(dict.fromkeys(computed_identities))
+        response = post_in_chunks(self.britive, f'{self.base_url}/disabled-statuses', computed_identities, chunk_size)
+        for service_identity in response or []:
+            self._track(service_identity)
         if not service_identity_ids:
             return response[0]
         return response
 
+    def _track(self, service_identity: dict) -> None:
+        # keep the directory snapshot current for the identity types it holds
+        if self.identity_type in principal_types:
+            self.britive.identity_management.directory.put(service_identity)
+
 
 class ServiceIdentityTokens:
     def __init__(self, britive) -> None:
@@ -241,3 +338,127 @@ class ServiceIdentityTokens:
         """
 
         return self.britive.get(f'{self.base_url}/users/{service_identity_id}/tokens')
+
+    def rotate_expiring(
+        self,
+        service_identity_ids: Iterable[str],
+        sink: Callable = None,
+        horizon_days: float = 7,
+        token_expiration_days: int = None,
+        dry_run: bool = False,
+        workers: int = 8,
+        retries: int = 2,
+        expires_at_func: Callable = token_expires_at,
+        progress_func: Callable = None,
+    ) -> dict:
+        """
+        Rotate the tokens of many service identities which expire within the given horizon.
+
+        The tokens of all service identities are scanned concurrently and those expiring within `horizon_days` are
+        rotated concurrently, both through the client throttle (`britive.throttle`). Each new token is handed to `sink`
+        as soon as it is created. A failure for one service identity does not abort the others.
+
+        Creating a token immediately invalidates the previous token of the service identity, so there is no window in
+        which both are valid - `sink` should deliver the new token to wherever it is consumed without delay. New tokens
+        are never included in the returned results.
+
+        :param service_identity_ids: The IDs of the service identities to consider.
+        :param sink: Callable accepting the service identity ID and the new token details (as returned by `create`),
+            e.g. to write the token to a secrets store. Invoked from the calling thread. Required unless `dry_run`.
+        :param horizon_days: Rotate tokens which expire within this many days. Defaults to 7.
+        :param token_expiration_days: The expiration days of the new tokens. Defaults to the expiration days of the
+            token being replaced.
+        :param dry_run: Only scan the tokens and report which are due for rotation, without rotating them.
+            Defaults to False.
+        :param workers: The number of tokens to scan or rotate concurrently. Defaults to 8.
+        :param retries: The number of times to retry a scan or rotation which failed with a transient error.
+            Defaults to 2.
+        :param expires_at_func: Callable accepting token details and returning its timezone aware expiration time, or
+            None if unknown. Defaults to `token_expires_at`.
+        :param progress_func: An optional callback invoked with each per service identity result as it completes.
+        :return: A report as described by `BulkReport`. `results` are in the order of `service_identity_ids`, with
+            keys `service_identity_id`, `status` (`rotated`, `due` (with `dry_run`), `current` (expires after the
+            horizon), `unknown` (expiration could not be determined), `undelivered` (rotated but `sink` failed) or
+            `failed`), `expires` (the expiration time of the scanned token), `error` and `attempts`. `metrics` also
+            include `retried`, `scan_seconds` and `rotate_seconds`.
+        """
+
+        if sink is None and not dry_run:
+            raise ValueError('a sink must be provided to receive the rotated tokens unless dry_run is set.')
+        if token_expiration_days is not None:
+            self.__validate_token_expiration(token_expiration_days)
+
+        options = {
+            'workers': workers,
+            'throttle': self.britive.throttle,
+            'retries': retries,
+            'backoff_factor': self.britive.retry_backoff_factor,
+            'ordered': True,
+        }
+        horizon = datetime.now(timezone.utc) + timedelta(days=horizon_days)
+        report = BulkReport(('rotated', 'due', 'current', 'unknown', 'undelivered', 'failed'), progress_func)
+
+        # scan
+        started = time.monotonic()
+        results = {}
+        due = []
+        retried = 0
+        for outcome in run_concurrently(self.get, service_identity_ids, **options):
+            retried += outcome.attempts > 1
+            result = {
+                'service_identity_id': outcome.item,
+                'status': 'failed',
+                'expires': None,
+                'error': None if outcome.ok else str(outcome.error),
+                'attempts': outcome.attempts,
+            }
+            results[outcome.index] = result
+            if not outcome.ok:
+                report.done(result)
+                continue
+            try:
+                expires = expires_at_func(outcome.result)
+            except (TypeError, ValueError) as e:
+                result['error'] = f'unable to determine token expiration - {e}'
+                report.done(result)
+                continue
+            result['expires'] = expires.isoformat() if expires else None
+            if expires is None:
+                result['status'] = 'unknown'
+            elif expires > horizon:
+                result['status'] = 'current'
+            elif dry_run:
+                result['status'] = 'due'
+            else:
+                days = token_expiration_days or outcome.result.get('tokenExpirationDays') or 90
+                due.append((outcome.index, outcome.item, days))
+                continue
+            report.done(result)
+        scan_seconds = time.monotonic() - started
+
+        # rotate
+        def rotate(item: tuple) -> dict:
+            _, service_identity_id, days = item
+            return self.create(service_identity_id=service_identity_id, token_expiration_days=days)
+
+        started = time.monotonic()
+        for outcome in run_concurrently(rotate, due, **options):
+            index, service_identity_id, _ = outcome.item
+            result = results[index]
+            result['attempts'] += outcome.attempts
+            retried += outcome.attempts > 1
+            if not outcome.ok:
+                result['error'] = str(outcome.error)
+                report.done(result)
+                continue
+            try:
+                sink(service_identity_id, outcome.result)
+                result['status'] = 'rotated'
+            except Exception as e:  # the token was rotated regardless - report it rather than abort the others
+                result['status'] = 'undelivered'
+                result['error'] = str(e)
+            report.done(result)
+        rotate_seconds = time.monotonic() - started
+
+        report.results.extend(results[index] for index in sorted(results))
+        return report.summarize(retried=retried, scan_seconds=scan_seconds, rotate_seconds=rotate_seconds)
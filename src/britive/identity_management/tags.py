@@ -1,3 +1,10 @@
+import contextlib
+from typing import Callable, Iterable
+
+from britive.exceptions.badrequest import UserTagAddDuplicateError
+from britive.helpers.concurrency import BulkReport, get_all_pages, post_in_chunks, run_concurrently
+
+
 class TagMembershipRules:
     def __init__(self, britive) -> None:
         self.britive = britive
@@ -16,14 +23,8 @@ class TagMembershipRules:
         if operator.lower() not in ['contains', 'is']:
             raise ValueError('invalid operator provided.')
 
-        # first get list of existing identity attributes and build some helpers
-        existing_attrs = self.britive.identity_management.identity_attributes.list()
-        existing_attr_ids = [attr['id'] for attr in existing_attrs]
-        attrs_by_name = {attr['name']: attr['id'] for attr in existing_attrs}
-
-        attribute_id = attribute_id_or_name
-        if attribute_id not in existing_attr_ids:
-            attribute_id = attrs_by_name.get(attribute_id_or_name)
+        # convert names to ids via the cached identity attribute catalogue
+        attribute_id = self.britive.identity_management.identity_attributes.resolve(attribute_id_or_name)
         if not attribute_id:
             raise ValueError(f'identity attribute name {attribute_id_or_name} not found.')
 
@@ -48,7 +49,9 @@ class TagMembershipRules:
         :returns: List of newly created membership rules for the given tag.
         """
 
-        return self.britive.post(f'{self.base_url}/{tag_id}/attribute-criteria', json=rules)
+        response = self.britive.post(f'{self.base_url}/{tag_id}/attribute-criteria', json=rules)
+        self.britive.identity_management.directory.invalidate()  # memberships follow the rules
+        return response
 
     def update(self, tag_id: str, rules: list) -> None:
         """
@@ -62,7 +65,9 @@ class TagMembershipRules:
         :returns: None.
         """
 
-        return self.britive.patch(f'{self.base_url}/{tag_id}/attribute-criteria', json=rules)
+        response = self.britive.patch(f'{self.base_url}/{tag_id}/attribute-criteria', json=rules)
+        self.britive.identity_management.directory.invalidate()  # memberships follow the rules
+        return response
 
     def delete(self, tag_id: str) -> None:
         """
@@ -72,7 +77,9 @@ class TagMembershipRules:
         :returns: None.
         """
 
-        return self.britive.patch(f'{self.base_url}/{tag_id}/attribute-criteria', json=[])
+        response = self.britive.patch(f'{self.base_url}/{tag_id}/attribute-criteria', json=[])
+        self.britive.identity_management.directory.invalidate()  # memberships follow the rules
+        return response
 
     def matched_users(self, tag_id: str) -> list:
         """
@@ -108,7 +115,9 @@ class Tags:
             data['userTagIdentityProviders'] = [{'identityProvider': {'id': idp}}]
             data['external'] = True
 
-        return self.britive.post(self.base_url, json=data)
+        tag = self.britive.post(self.base_url, json=data)
+        self.britive.identity_management.directory.put(tag)
+        return tag
 
     def get(self, tag_id: str) -> dict:
         """
@@ -183,7 +192,9 @@ class Tags:
         :return: Details of the user.
         """
 
-        return self.britive.post(f'{self.base_url}/{tag_id}/users/{user_id}')
+        user = self.britive.post(f'{self.base_url}/{tag_id}/users/{user_id}')
+        self.britive.identity_management.directory.add_member(tag_id, user_id)
+        return user
 
     def remove_user(self, tag_id: str, user_id: str) -> None:
         """
@@ -194,7 +205,9 @@ class Tags:
         :return: None
         """
 
-        return self.britive.delete(f'{self.base_url}/{tag_id}/users/{user_id}')
+        response = self.britive.delete(f'{self.base_url}/{tag_id}/users/{user_id}')
+        self.britive.identity_management.directory.remove_member(tag_id, user_id)
+        return response
 
     def enable(self, tag_id: str) -> dict:
         """
@@ -204,7 +217,9 @@ class Tags:
         :return: Details of the tag.
         """
 
-        return self.britive.post(f'{self.base_url}/{tag_id}/enabled-statuses')
+        tag = self.britive.post(f'{self.base_url}/{tag_id}/enabled-statuses')
+        self.britive.identity_management.directory.put(tag)
+        return tag
 
     def disable(self, tag_id: str) -> dict:
         """
@@ -214,7 +229,9 @@ class Tags:
         :return: Details of the tag.
         """
 
-        return self.britive.post(f'{self.base_url}/{tag_id}/disabled-statuses')
+        tag = self.britive.post(f'{self.base_url}/{tag_id}/disabled-statuses')
+        self.britive.identity_management.directory.put(tag)
+        return tag
 
     def update(self, tag_id: str, name: str, description: str = None) -> dict:
         """
@@ -229,7 +246,9 @@ class Tags:
         data = {'userTagId': tag_id, 'name': name, 'description': description}
 
         self.britive.patch(self.base_url, json=data)
-        return self.get(tag_id)
+        tag = self.get(tag_id)
+        self.britive.identity_management.directory.put(tag)
+        return tag
 
     def delete(self, tag_id: str) -> None:
         """
@@ -241,14 +260,91 @@ class Tags:
         :return: None
         """
 
-        return self.britive.delete(f'{self.base_url}/{tag_id}')
+        response = self.britive.delete(f'{self.base_url}/{tag_id}')
+        self.britive.identity_management.directory.discard(tag_id)
+        return response
 
-    def minimized_tag_details(self, tag_id: str = None, tag_ids: list = None) -> list:
+    def sync_members(
+        self,
+        tag_id: str,
+        desired_user_ids: Iterable[str],
+        dry_run: bool = False,
+        workers: int = 8,
+        retries: int = 2,
+        progress_func: Callable = None,
+    ) -> dict:
+        """
+        Reconcile the members of a tag with the desired list of users.
+
+        The current members are fetched once and only the users which need to be added or removed are changed, with
+        the changes applied concurrently through the client throttle (`britive.throttle`). A failed change does not
+        abort the others.
+
+        :param tag_id: The ID of the tag.
+        :param desired_user_ids: The IDs of the users which should be members of the tag - and no others.
+        :param dry_run: Only compute the changes, without applying them. Defaults to False.
+        :param workers: The number of changes to apply concurrently. Defaults to 8.
+        :param retries: The number of times to retry a change which failed with a transient error. Defaults to 2.
+        :param progress_func: An optional callback invoked with each per user result as it completes.
+        :return: A report as described by `BulkReport`. `results` have one entry per user added or removed - the
+            additions in the order of `desired_user_ids` followed by the removals - with keys `user_id`, `operation`
+            (`add` or `remove`), `status` (`added`, `removed`, `pending` (with `dry_run`) or `failed`), `error` and
+            `attempts`. `metrics` also include `unchanged` (the number of members left as is).
+        """
+
+        report = BulkReport(('added', 'removed', 'pending', 'failed'), progress_func)
+        current = {user['userId']: None for user in get_all_pages(self.britive, f'{self.base_url}/{tag_id}/users')}
+        desired = dict.fromkeys(desired_user_ids)
+        changes = [('add', user_id) for user_id in desired if user_id not in current]
+        changes += [('remove', user_id) for user_id in current if user_id not in desired]
+        unchanged = len(current.keys() & desired.keys())
+
+        def apply(change: tuple) -> None:
+            operation, user_id = change
+            if operation == 'remove':
+                self.remove_user(tag_id=tag_id, user_id=user_id)
+                return
+            with contextlib.suppress(UserTagAddDuplicateError):  # added since the members were fetched
+                self.add_user(tag_id=tag_id, user_id=user_id)
+
+        if dry_run:
+            for operation, user_id in changes:
+                report.add(
+                    {'user_id': user_id, 'operation': operation, 'status': 'pending', 'error': None, 'attempts': 0}
+                )
+            return report.summarize(unchanged=unchanged)
+
+        outcomes = run_concurrently(
+            apply,
+            changes,
+            workers=workers,
+            throttle=self.britive.throttle,
+            retries=retries,
+            backoff_factor=self.britive.retry_backoff_factor,
+            ordered=True,
+        )
+        for outcome in outcomes:
+            operation, user_id = outcome.item
+            report.add(
+                {
+                    'user_id': user_id,
+                    'operation': operation,
+                    'status': ('added' if operation == 'add' else 'removed') if outcome.ok else 'failed',
+                    'error': None if outcome.ok else str(outcome.error),
+                    'attempts': outcome.attempts,
+                }
+            )
+
+        return report.summarize(unchanged=unchanged)
+
+    def minimized_tag_details(self, tag_id: str = None, tag_ids: list = None, chunk_size: int = 100) -> list:
         """
         Retrieve a small set of user fields given a user id.
 
         :param tag_id: The ID of the tag. Will be combined with `tag_ids`.
-        :param tag_ids: The list of tag ids. Will be combined with `tag_id`.
+        :param tag_ids: The list of tag ids. Will be combined with `tag_id`. Large lists are split into requests of at
+            most `chunk_size` IDs which are sent concurrently, with the responses merged back in order.
+        :param chunk_size: The maximum number of tag IDs sent per request. Defaults to 100.
         :return: List of tags with a small set of attributes.
         """
         if tag_ids is None:
@@ -258,4 +354,4 @@ class Tags:
         if len(tag_ids) == 0:
             return []
 
-        return self.britive.post(f'{self.base_url}/minimized-tag-details', json=tag_ids)
+        return post_in_chunks(self.britive, f'{self.base_url}/minimized-tag-details', tag_ids, chunk_size)
@@ -1,12 +1,19 @@
+from typing import Callable, Iterable
+
 from britive.exceptions import (
+    Conflict,
     UserDoesNotHaveMFAEnabled,
     UserNotAllowedToChangePassword,
     UserNotAssociatedWithDefaultIdentityProvider,
 )
+from britive.exceptions.badrequest import UserAlreadyExistsError
+from britive.exceptions.generic import DuplicateError
+from britive.helpers.concurrency import BulkReport, post_in_chunks, run_concurrently
 
 from .identity_attributes import CustomAttributes
 
 valid_statues = ['active', 'inactive']
+already_exists_exceptions = (Conflict, DuplicateError, UserAlreadyExistsError)
 
 
 class Users:
@@ -54,6 +61,34 @@ class Users:
 
         return self.list(filter_expression=f'name co "{name}"')
 
+    def get_by_exact_name(self, name: str) -> list:
+        """
+        Return the users whose name is exactly `name` (case-insensitive).
+
+        Answered from the directory snapshot (`britive.identity_management.directory`). See `get_many_by_name`.
+
+        :param name: The exact name of the user.
+        :return: List of compact user records (`Principal`). If no user is found will return an empty list.
+        """
+
+        return self.get_many_by_name([name])[name]
+
+    def get_many_by_name(self, names: Iterable[str]) -> dict:
+        """
+        Return the users whose name is exactly each of the given names (case-insensitive).
+
+        All names are resolved in one pass against the directory snapshot (`britive.identity_management.directory`),
+        which is loaded on first use. Names which are not found refresh the snapshot at most once per call and are then
+        remembered as missing for a short while, so resolving many names costs a handful of requests rather than one
+        list request per name.
+
+        :param names: The exact names of the users.
+        :return: Dict of each name to a list of compact user records (`Principal`). The list is empty for names which
+            were not found.
+        """
+
+        return self.britive.identity_management.directory.principals_by_names(names, principal_type='User')
+
     def get_by_status(self, status: str) -> list:
         """
         Return a list of users filtered to `status`.
@@ -115,7 +150,69 @@ class Users:
         if not all(x in kwargs for x in required_fields):
             raise ValueError('Not all required keyword arguments were provided.')
 
-        return self.britive.post(self.base_url, json=kwargs)
+        user = self.britive.post(self.base_url, json=kwargs)
+        self.britive.identity_management.directory.put(user)
+        return user
+
+    def create_many(
+        self,
+        records: Iterable[dict],
+        workers: int = 8,
+        retries: int = 2,
+        skip_existing: bool = False,
+        progress_func: Callable = None,
+    ) -> dict:
+        """
+        Create many user records concurrently.
+
+        Records are streamed from `records` and created on a bounded pool of threads which also passes through the
+        client throttle (`britive.throttle`), so `records` can be a generator over a large source such as a CSV file.
+        A failure to create one record does not abort the others - each record is reported on individually.
+
+        :param records: Iterable of dicts, each being the keyword arguments accepted by `create`, including the optional
+            `idp`.
+        :param workers: The number of users to create concurrently. Defaults to 8.
+        :param retries: The number of times to retry a record which failed with a transient error (connection error,
+            timeout or 500/503 response). Defaults to 2.
+        :param skip_existing: Treat a record which failed because the user already exists as a success, with a status
+            of `exists`. Defaults to False.
+        :param progress_func: An optional callback invoked with each per record result as it completes.
+        :return: A report as described by `BulkReport`. `results` are in the order of `records`, with keys `index`,
+            `username`, `status` (`created`, `exists` or `failed`), `user` (the newly created user), `error` and
+            `attempts`. `metrics` also include `retried`.
+        """
+
+        def create(record: dict) -> dict:
+            return self.create(**dict(record))
+
+        report = BulkReport(('created', 'exists', 'failed'), progress_func)
+        for outcome in run_concurrently(
+            create,
+            records,
+            workers=workers,
+            throttle=self.britive.throttle,
+            retries=retries,
+            backoff_factor=self.britive.retry_backoff_factor,
+            ordered=True,
+        ):
+            if outcome.ok:
+                status = 'created'
+            elif skip_existing and isinstance(outcome.error, already_exists_exceptions):
+                status = 'exists'
+            else:
+                status = 'failed'
+            report.add(
+                {
+                    'index': outcome.index,
+                    'username': outcome.item.get('username'),
+                    'status': status,
+                    'user': outcome.result,
+                    'error': None if status == 'created' else str(outcome.error),
+                    'attempts': outcome.attempts,
+                }
+            )
+
+        return report.summarize(retried=sum(1 for result in report.results if result['attempts'] > 1))
 
     def update(self, user_id: str, **kwargs) -> dict:
         """
@@ -141,7 +238,9 @@ class Users:
         self.britive.patch(f'{self.base_url}/{user_id}', json=kwargs)
 
         # return the updated user record
-        return self.get(user_id)
+        user = self.get(user_id)
+        self.britive.identity_management.directory.put(user)
+        return user
 
     def delete(self, user_id: str) -> None:
         """
@@ -152,8 +251,9 @@ class Users:
         """
 
         self.britive.delete(f'{self.base_url}/{user_id}')
+        self.britive.identity_management.directory.discard(user_id)
 
-    def enable(self, user_id: str = None, user_ids: list = None) -> object:
+    def enable(self, user_id: str = None, user_ids: list = None, chunk_size: int = 100) -> object:
         """
         Enable the given user(s).
 
@@ -161,7 +261,9 @@ class Users:
         `user_id` and `user_ids` are provided they will be merged together into one list.
 
         :param user_id: The ID of the user you wish to enable.
-        :param user_ids: A list of user IDs that you wish to enable.
+        :param user_ids: A list of user IDs that you wish to enable. Large lists are split into requests of at most
+            `chunk_size` IDs which are sent concurrently, with the responses merged back in order.
+        :param chunk_size: The maximum number of user IDs sent per request. Defaults to 100.
         :return: if `user_ids` is set will return a list of user records, else returns a user dict
         """
 
@@ -171,14 +273,16 @@ class Users:
         if user_id:
             computed_users.append(user_id)
 
-        # de-dup
-        computed_users = list(set(computed_users))
-        response = self.britive.post(f'{self.base_url}/enabled-statuses', json=computed_users)
+        # de-dup, keeping the order the ids were provided in
+        computed_users = list(dict.fromkeys(computed_users))
+        response = post_in_chunks(self.britive, f'{self.base_url}/enabled-statuses', computed_users, chunk_size)
+        for user in response or []:
+            self.britive.identity_management.directory.put(user)
         if not user_ids:
             return response[0]
         return response
 
-    def disable(self, user_id: str = None, user_ids: list = None) -> object:
+    def disable(self, user_id: str = None, user_ids: list = None, chunk_size: int = 100) -> object:
         """
         Disable the given user(s).
 
@@ -186,7 +290,9 @@ class Users:
         If both `user_id` and `user_ids` are provided they will be merged together into one list.
 
         :param user_id: The ID of the user you wish to disable.
-        :param user_ids: A list of user IDs that you wish to disable.
+        :param user_ids: A list of user IDs that you wish to disable. Large lists are split into requests of at most
+            `chunk_size` IDs which are sent concurrently, with the responses merged back in order.
+        :param chunk_size: The maximum number of user IDs sent per request. Defaults to 100.
         :return: if `user_ids` is set will return a list of user records, else returns a user dict
         """
 
@@ -196,9 +302,11 @@ class Users:
         if user_id:
             computed_users.append(user_id)
 
-        # de-dup
-        computed_users = list(set(computed_users))
-        response = self.britive.post(f'{self.base_url}/disabled-statuses', json=computed_users)
+        # de-dup, keeping the order the ids were provided in
+        computed_users = list(dict.fromkeys(computed_users))
+        response = post_in_chunks(self.britive, f'{self.base_url}/disabled-statuses', computed_users, chunk_size)
+        for user in response or []:
+            self.britive.identity_management.directory.put(user)
         if not user_ids:
             return response[0]
         return response
@@ -244,12 +352,14 @@ class Users:
 
         return self.britive.patch(f'{self.base_url}/{user_id}/resetmfa')
 
-    def minimized_user_details(self, user_id: str = None, user_ids: list = None) -> list:
+    def minimized_user_details(self, user_id: str = None, user_ids: list = None, chunk_size: int = 100) -> list:
         """
         Retrieve a small set of user fields given a user id.
 
         :param user_id: The ID of the user. Will be combined with `user_ids`.
-        :param user_ids: The list of user ids. Will be combined with `user_id`.
+        :param user_ids: The list of user ids. Will be combined with `user_id`. Large lists are split into requests of
+            at most `chunk_size` IDs which are sent concurrently, with the responses merged back in order.
+        :param chunk_size: The maximum number of user IDs sent per request. Defaults to 100.
         :return: List of users with a small set of attributes.
         """
         if user_ids is None:
@@ -259,7 +369,7 @@ class Users:
         if len(user_ids) == 0:
             return []
 
-        return self.britive.post(f'{self.base_url}/minimized-user-details', json=user_ids)
+        return post_in_chunks(self.britive, f'{self.base_url}/minimized-user-details', user_ids, chunk_size)
 
 
 class EnableMFA:
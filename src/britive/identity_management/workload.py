@@ -1,4 +1,8 @@
-from typing import Union
+import threading
+import time
+from typing import Callable, Iterable, Union
+
+from britive.helpers.concurrency import BulkReport, run_concurrently
 
 
 class Workload:
@@ -10,15 +14,48 @@ class Workload:
         self.scim_user = WorkloadScimUser(self)
 
 
+class ProviderIndex:
+    """Point in time lookups over the workload identity providers of a tenant."""
+
+    def __init__(self, providers: list) -> None:
+        self.providers = providers
+        self.loaded_at = time.monotonic()
+        self.by_id = {}
+        self.by_name = {}
+        self.by_type = {}
+        for provider in providers:
+            self.by_id[provider['id']] = provider
+            self.by_name.setdefault(provider['name'], provider)
+            self.by_type.setdefault(provider.get('idpType'), []).append(provider)
+
+    def resolve(self, id_or_name: Union[int, str]) -> Union[int, None]:
+        """
+        Resolve a workload identity provider ID or name to its ID.
+
+        :param id_or_name: The ID or name of the workload identity provider.
+        :returns: The ID of the workload identity provider or None if not found.
+        """
+
+        provider = self.by_id.get(id_or_name) or self.by_name.get(id_or_name)
+        if provider is None and isinstance(id_or_name, str) and id_or_name.isdigit():
+            provider = self.by_id.get(int(id_or_name))
+        return provider['id'] if provider else None
+
+
 class WorkloadIdentityProviders:
     def __init__(self, workload) -> None:
         self.britive = workload.britive
         self.base_url = f'{workload.base_url}/identity-providers'
+        self.index_ttl = 300
+        self._index = None
+        self._lock = threading.Lock()
 
     def list(self, idp_type: str = None) -> list:
         """
         Return a list of all workload identity providers.
 
+        Also refreshes the cached provider index (see `index`) when no `idp_type` filter is provided.
+
         :param idp_type: Optional filter to apply to reduce the results to a specific workload identity provider
             type. Valid values are `AWS` and `OIDC`.
         :returns: List of all workload identity providers.
@@ -27,7 +64,44 @@ class WorkloadIdentityProviders:
         params = {}
         if idp_type:
             params['type'] = idp_type
-        return self.britive.get(self.base_url, params=params)
+        providers = self.britive.get(self.base_url, params=params)
+        if not idp_type:
+            self._index = ProviderIndex(providers)
+        return providers
+
+    def index(self, refresh: bool = False) -> ProviderIndex:
+        """
+        Return a cached index of the workload identity providers by ID, name and type.
+
+        The index is reloaded once older than `index_ttl` seconds (300 by default) and discarded whenever a workload
+        identity provider is created, updated or deleted through this SDK.
+
+        :param refresh: Reload the index even if the cached index has not expired.
+        :returns: The provider index.
+        """
+
+        with self._lock:
+            index = self._index
+            if refresh or not index or time.monotonic() - index.loaded_at > self.index_ttl:
+                self.list()
+            return self._index
+
+    def resolve(self, id_or_name: Union[int, str]) -> Union[int, None]:
+        """
+        Resolve a workload identity provider ID or name to its ID using the cached index.
+
+        If the provider is not found in an index which was cached earlier the index is reloaded and checked once more.
+
+        :param id_or_name: The ID or name of the workload identity provider.
+        :returns: The ID of the workload identity provider or None if not found.
+        """
+
+        cached = self._index
+        index = self.index()
+        provider_id = index.resolve(id_or_name)
+        if provider_id is None and index is cached:
+            provider_id = self.index(refresh=True).resolve(id_or_name)
+        return provider_id
 
     def get(self, workload_identity_provider_id: int) -> dict:
         """
@@ -40,21 +114,14 @@ class WorkloadIdentityProviders:
         return self.britive.get(f'{self.base_url}/{workload_identity_provider_id}')
 
     def _build_attributes_map_list(self, attributes_map: dict) -> list:
-        # first get list of existing custom identity attributes and build some helpers
-        existing_attrs = [
-            attr for attr in self.britive.identity_management.identity_attributes.list() if not attr['builtIn']
-        ]
-        existing_attr_ids = [attr['id'] for attr in existing_attrs]
-        attrs_by_name = {attr['name']: attr['id'] for attr in existing_attrs}
+        identity_attributes = self.britive.identity_management.identity_attributes
 
         # for each attributeMap key/value provided ensure we convert to ID and build the list
         attrs_list = []
         for idp_attr, custom_identity_attribute in attributes_map.items():
-            if (check_custom_identity_attribute := custom_identity_attribute) not in existing_attr_ids and not (
-                check_custom_identity_attribute := attrs_by_name.get(custom_identity_attribute)
-            ):
+            if not (attribute_id := identity_attributes.resolve(custom_identity_attribute, custom_only=True)):
                 raise ValueError(f'custom identity attribute name {custom_identity_attribute} not found.')
-            attrs_list.append({'idpAttr': idp_attr, 'userAttr': check_custom_identity_attribute})
+            attrs_list.append({'idpAttr': idp_attr, 'userAttr': attribute_id})
         return attrs_list
 
     def create(self, **kwargs) -> dict:
@@ -80,7 +147,9 @@ class WorkloadIdentityProviders:
         if 'attributesMap' in kwargs:
             kwargs['attributesMap'] = self._build_attributes_map_list(attributes_map=kwargs['attributesMap'])
 
-        return self.britive.post(self.base_url, json=kwargs)
+        provider = self.britive.post(self.base_url, json=kwargs)
+        self._index = None
+        return provider
 
     def create_aws(
         self,
@@ -181,7 +250,9 @@ class WorkloadIdentityProviders:
         # and merge in the things that have changed
 
         existing = self.get(workload_identity_provider_id=workload_identity_provider_id)
-        return self.britive.put(self.base_url, json={**existing, **kwargs})
+        provider = self.britive.put(self.base_url, json={**existing, **kwargs})
+        self._index = None
+        return provider
 
     def update_aws(
         self,
@@ -276,7 +347,9 @@ class WorkloadIdentityProviders:
         :param workload_identity_provider_id: The ID of the workload identity provider.
         :returns: None.
         """
-        return self.britive.delete(f'{self.base_url}/{workload_identity_provider_id}')
+        response = self.britive.delete(f'{self.base_url}/{workload_identity_provider_id}')
+        self._index = None
+        return response
 
     def generate_attribute_map(
         self,
@@ -310,13 +383,8 @@ class WorkloadIdentityProviders:
             raise ValueError('one of custom_identity_attribute_id or custom_identity_attribute_name should be provided')
 
         if custom_identity_attribute_name:
-            found = False
-            for attr in self.britive.identity_management.identity_attributes.list():
-                if attr['name'] == custom_identity_attribute_name:
-                    custom_identity_attribute_id = attr['id']
-                    found = True
-                    break
-            if not found:
+            identity_attributes = self.britive.identity_management.identity_attributes
+            if not (custom_identity_attribute_id := identity_attributes.resolve(custom_identity_attribute_name)):
                 raise ValueError(f'custom_identity_attribute_name value of {custom_identity_attribute_name} not found.')
 
         return {'idpAttr': idp_attribute_name, 'userAttr': custom_identity_attribute_id}
@@ -355,26 +423,90 @@ class WorkloadServiceIdentities:
         :returns: Details of the newly assigned workload identity provider.
         """
 
-        mapping_attributes = []
-        converted_federated_attributes = {}
-        converted_attributes = self.britive.identity_management.service_identities.custom_attributes._build_list(
-            operation='add', custom_attributes=federated_attributes
-        )
-
-        for attr in converted_attributes:
-            custom_attr = attr['customUserAttribute']
-            attr_id = custom_attr['attributeId']
-            if attr_id not in converted_federated_attributes:
-                converted_federated_attributes[attr_id] = []
-            converted_federated_attributes[attr_id].append(custom_attr['attributeValue'])
-
-        for custom_attribute_id, values in converted_federated_attributes.items():
-            mapping_attributes.append({'attrId': custom_attribute_id, 'values': values})
+        mapping_attributes = self._mapping_attributes(federated_attributes)
 
         params = {'idpId': idp_id, 'tokenDuration': token_duration, 'mappingAttributes': mapping_attributes}
 
         return self.britive.post(self.base_url.format(id=service_identity_id), json=params)
 
+    def assign_many(
+        self, assignments: Iterable[dict], workers: int = 8, retries: int = 2, progress_func: Callable = None
+    ) -> dict:
+        """
+        Associate workload identity providers with many Service Identities concurrently.
+
+        Every assignment is validated up front against the cached workload identity provider index and identity
+        attribute catalogue, so a bad provider or attribute name fails the whole batch before anything is assigned.
+        The assignments are then sent concurrently through the client throttle (`britive.throttle`). A failed
+        assignment does not abort the others.
+
+        :param assignments: Iterable of dicts, one per Service Identity, with keys:
+            `service_identity_id` - required - the ID of the Service Identity.
+            `idp` - required - the ID or name of the workload identity provider.
+            `federated_attributes` - required - the federated attributes in the same format as the
+                `federated_attributes` parameter of `assign`, i.e. custom attribute names or IDs as keys.
+            `token_duration` - optional - the token duration in seconds. Defaults to 300.
+        :param workers: The number of assignments to send concurrently. Defaults to 8.
+        :param retries: The number of times to retry an assignment which failed with a transient error. Defaults to 2.
+        :param progress_func: An optional callback invoked with each per service identity result as it completes.
+        :returns: A report as described by `BulkReport`. `results` are in the order of `assignments`, with keys
+            `service_identity_id`, `idp_id`, `status` (`assigned` or `failed`), `error` and `attempts`.
+        :raises: ValueError - If any workload identity provider or custom attribute cannot be found. No assignments
+            are sent in that case.
+        """
+
+        providers = self.britive.identity_management.workload.identity_providers
+        documents = []
+        for assignment in assignments:
+            if not (idp_id := providers.resolve(assignment['idp'])):
+                raise ValueError(f'workload identity provider {assignment["idp"]} not found.')
+            params = {
+                'idpId': idp_id,
+                'tokenDuration': assignment.get('token_duration', 300),
+                'mappingAttributes': self._mapping_attributes(assignment['federated_attributes']),
+            }
+            documents.append((assignment['service_identity_id'], params))
+
+        def assign(document: tuple) -> dict:
+            service_identity_id, params = document
+            return self.britive.post(self.base_url.format(id=service_identity_id), json=params)
+
+        report = BulkReport(('assigned', 'failed'), progress_func)
+        for outcome in run_concurrently(
+            assign,
+            documents,
+            workers=workers,
+            throttle=self.britive.throttle,
+            retries=retries,
+            backoff_factor=self.britive.retry_backoff_factor,
+            ordered=True,
+        ):
+            service_identity_id, params = outcome.item
+            report.add(
+                {
+                    'service_identity_id': service_identity_id,
+                    'idp_id': params['idpId'],
+                    'status': 'assigned' if outcome.ok else 'failed',
+                    'error': None if outcome.ok else str(outcome.error),
+                    'attempts': outcome.attempts,
+                }
+            )
+
+        return report.summarize()
+
+    def _mapping_attributes(self, federated_attributes: dict) -> list:
+        identity_attributes = self.britive.identity_management.identity_attributes
+
+        # group the values by custom attribute id, converting names to ids via the cached attribute catalogue
+        mapping_attributes = {}
+        for id_or_name, value in federated_attributes.items():
+            if not (attribute_id := identity_attributes.resolve(id_or_name, custom_only=True)):
+                raise ValueError(f'custom identity attribute name {id_or_name} not found.')
+            values = mapping_attributes.setdefault(attribute_id, [])
+            values += value if isinstance(value, list) else [value]  # handle multivalued attributes
+
+        return [{'attrId': attribute_id, 'values': values} for attribute_id, values in mapping_attributes.items()]
+
     def unassign(self, service_identity_id: str) -> None:
         """
         Removes/deletes the service identity's assigned identity provider, along with any custom attribute mappings.
@@ -9,3 +9,13 @@ def test_list():
 
 def test_create(cached_identity_attribute):
     assert isinstance(cached_identity_attribute, dict)
+
+
+def test_catalogue(cached_identity_attribute):
+    identity_attributes = britive.identity_management.identity_attributes
+    catalogue = identity_attributes.catalogue()
+    assert identity_attributes.catalogue() is catalogue
+    attribute_id = cached_identity_attribute['id']
+    assert identity_attributes.resolve(cached_identity_attribute['name']) == attribute_id
+    assert identity_attributes.resolve(attribute_id, custom_only=True) == attribute_id
+    assert identity_attributes.resolve('pysdktest-does-not-exist') is None
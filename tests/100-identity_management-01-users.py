@@ -32,6 +32,25 @@ def test_create(cached_user):
     assert user_keys.issubset(cached_user)
 
 
+def test_create_many(cached_user, timestamp):
+    records = [
+        {k: cached_user[k] for k in ('username', 'email', 'firstName', 'lastName')},
+        {
+            'username': f'pysdktest-bulk-{timestamp}',
+            'email': f'pysdktest.bulk.{timestamp}@britive.com',
+            'firstName': 'TestPython',
+            'lastName': timestamp,
+            'password': generate_random_password(),
+        },
+    ]
+    records[0]['password'] = generate_random_password()
+    response = britive.identity_management.users.create_many(records, workers=2, skip_existing=True)
+    assert [r['status'] for r in response['results']] == ['exists', 'created']
+    assert response['metrics']['total'] == 2
+    assert response['metrics']['failed'] == 0
+    britive.identity_management.users.delete(response['results'][1]['user']['userId'])
+
+
 def test_list(cached_user):
     response = britive.identity_management.users.list()
     assert isinstance(response, list)
@@ -154,6 +173,19 @@ def test_remove_custom_identity_attributes(cached_user, cached_identity_attribut
     assert len(attributes) == 0
 
 
+def test_apply_many_custom_identity_attributes(cached_user, cached_identity_attribute):
+    custom_attributes = britive.identity_management.users.custom_attributes
+    user_id = cached_user['userId']
+    response = custom_attributes.apply_many({user_id: {cached_identity_attribute['name']: 'bulk'}})
+    assert response['results'][0]['status'] == 'updated'
+    current = {user_id: custom_attributes.get(principal_id=user_id, as_dict=True)}
+    response = custom_attributes.apply_many({user_id: {cached_identity_attribute['name']: 'bulk'}}, current=current)
+    assert response['results'][0]['status'] == 'unchanged'
+    response = custom_attributes.apply_many({user_id: {cached_identity_attribute['name']: []}}, current=current)
+    assert response['results'][0]['operations'] == 1
+    assert len(custom_attributes.get(principal_id=user_id)) == 0
+
+
 def test_minimized_user_details(cached_user):
     details = britive.identity_management.users.minimized_user_details(user_id=cached_user['userId'])
     assert isinstance(details, list)
@@ -163,6 +195,23 @@ def test_minimized_user_details(cached_user):
     assert len(details) == 1
 
 
+def test_minimized_user_details_chunked(cached_user):
+    user_ids = [u['userId'] for u in britive.identity_management.users.list()[:3]]
+    details = britive.identity_management.users.minimized_user_details(user_ids=user_ids, chunk_size=1)
+    assert isinstance(details, list)
+    assert len(details) == len(user_ids)
+
+
+def test_directory_snapshot(cached_user):
+    directory = britive.identity_management.directory.load()
+    assert directory.principal(cached_user['userId']).username == cached_user['username']
+    assert directory.user_by_email(cached_user['email'].upper()).id == cached_user['userId']
+    assert directory.user_by_username(cached_user['username']).id == cached_user['userId']
+    assert cached_user['userId'] in [p.id for p in directory.principals_by_status(cached_user['status'], 'User')]
+    assert isinstance(directory.tags_for(cached_user['userId']), list)
+    assert set(directory.refresh()) == {'added', 'updated', 'removed'}
+
+
 def test_stepup_mfa():
     challenge = britive.identity_management.users.enable_mfa.enable()
     if challenge_key := challenge.get('additionalDetails', {}).get('key'):
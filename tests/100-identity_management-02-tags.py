@@ -62,6 +62,19 @@ def test_remove_user(cached_tag, cached_user):
     assert response is None
 
 
+def test_sync_members(cached_tag, cached_user):
+    tags = britive.identity_management.tags
+    report = tags.sync_members(tag_id=cached_tag['userTagId'], desired_user_ids=[cached_user['userId']])
+    assert [(r['user_id'], r['status']) for r in report['results']] == [(cached_user['userId'], 'added')]
+    assert report['metrics']['failed'] == 0
+    report = tags.sync_members(tag_id=cached_tag['userTagId'], desired_user_ids=[], dry_run=True)
+    assert [(r['user_id'], r['status']) for r in report['results']] == [(cached_user['userId'], 'pending')]
+    report = tags.sync_members(tag_id=cached_tag['userTagId'], desired_user_ids=[])
+    assert [(r['user_id'], r['status']) for r in report['results']] == [(cached_user['userId'], 'removed')]
+    assert report['metrics']['unchanged'] == 0
+    assert len(tags.users_for_tag(tag_id=cached_tag['userTagId'])) == 0
+
+
 def test_enable(cached_tag):
     response = britive.identity_management.tags.enable(cached_tag['userTagId'])
     assert isinstance(response, dict)
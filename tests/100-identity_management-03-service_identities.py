@@ -30,6 +30,16 @@ def test_get_by_name_co(cached_service_identity):
     assert set(service_identity_keys).issubset(users[0].keys())
 
 
+def test_get_many_by_name(cached_service_identity, timestamp):
+    missing = f'pysdktest-missing-{timestamp}'
+    found = britive.identity_management.service_identities.get_many_by_name(
+        [cached_service_identity['name'].upper(), missing]
+    )
+    assert cached_service_identity['userId'] in [p.id for p in found[cached_service_identity['name'].upper()]]
+    assert found[missing] == []
+    assert britive.identity_management.service_identities.get_by_exact_name(missing) == []
+
+
 def test_search(cached_service_identity):
     users = britive.identity_management.service_identities.search(cached_service_identity['name'].split('@')[0])
     assert isinstance(users, list)
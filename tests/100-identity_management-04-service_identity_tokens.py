@@ -18,3 +18,12 @@ def test_service_identity_tokens_get(cached_service_identity):
     assert isinstance(token, dict)
     assert 'tokenExpirationDays' in token
     assert token['tokenExpirationDays'] == 45
+
+
+def test_service_identity_tokens_rotate_expiring_dry_run(cached_service_identity):
+    report = britive.identity_management.service_identity_tokens.rotate_expiring(
+        [cached_service_identity['userId']], horizon_days=365, dry_run=True
+    )
+    assert report['metrics']['total'] == 1
+    assert report['metrics']['rotated'] == 0
+    assert report['results'][0]['status'] in ('due', 'unknown')
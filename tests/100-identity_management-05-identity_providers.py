@@ -100,6 +100,16 @@ def test_scim_tokens_update_attribute_mapping(cached_identity_provider):
     assert 'Phone' not in [m['attributeName'] for m in mappings]
 
 
+def test_scim_attributes_plan_and_apply_mappings(cached_identity_provider):
+    scim_attributes = britive.identity_management.identity_providers.scim_attributes
+    desired = {cached_identity_provider['id']: {'Phone': 'phoneNumbers[type eq "work"]'}}
+    plan = scim_attributes.plan_mappings(desired, prune=False)
+    assert len(plan[cached_identity_provider['id']]) == 1
+    report = scim_attributes.apply_mappings(plan)
+    assert report['metrics']['updated'] == 1
+    assert scim_attributes.plan_mappings(desired, prune=False) == {cached_identity_provider['id']: []}
+
+
 def test_configure_mfa(cached_identity_provider):
     with pytest.raises(BritiveGenericError) as e:
         britive.identity_management.identity_providers.configure_mfa(
@@ -151,6 +151,37 @@ def test_service_identity_assign_and_unassign(
     assert attrs[0]['attributeName'] is None
 
 
+def test_identity_provider_index(cached_workload_identity_provider_oidc):
+    oidc = cached_workload_identity_provider_oidc
+    providers = britive.identity_management.workload.identity_providers
+    index = providers.index(refresh=True)
+    assert index.by_id[oidc['id']]['name'] == oidc['name']
+    assert providers.resolve(oidc['name']) == oidc['id']
+    assert oidc['id'] in [p['id'] for p in index.by_type['OIDC']]
+
+
+@pytest.mark.skipif(skip_federated, reason=skip_federated_message)
+def test_service_identity_assign_many(
+    cached_service_identity_federated, cached_identity_attribute, cached_workload_identity_provider_oidc
+):
+    report = britive.identity_management.workload.service_identities.assign_many(
+        [
+            {
+                'service_identity_id': cached_service_identity_federated['userId'],
+                'idp': cached_workload_identity_provider_oidc['name'],
+                'federated_attributes': {cached_identity_attribute['name']: 'test'},
+            }
+        ]
+    )
+    assert report['metrics']['assigned'] == 1
+    assert report['results'][0]['idp_id'] == cached_workload_identity_provider_oidc['id']
+
+    response = britive.identity_management.workload.service_identities.unassign(
+        service_identity_id=cached_service_identity_federated['userId']
+    )
+    assert response is None
+
+
 def test_identity_provider_delete(cached_workload_identity_provider_oidc, cached_workload_identity_provider_aws):
     try:
         # we do not want to delete the pre-existing aws provider
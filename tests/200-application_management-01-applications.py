@@ -1,3 +1,5 @@
+from britive.application_management.inventory import InventoryState
+
 from .cache import *  # will also import some globals like `britive`
 
 
@@ -80,3 +82,17 @@ def test_set_user_account_mapping(cached_application):
     assert isinstance(app['userAccountMappings'], list)
     assert len(app['userAccountMappings']) == 1
     assert app['userAccountMappings'][0]['name'] == 'email'
+
+
+def test_inventory_crawl(cached_application):
+    app_id = cached_application['appContainerId']
+    state = InventoryState()
+    records = list(
+        britive.application_management.inventory.crawl(
+            application_ids=[app_id], kinds=['application', 'environment'], state=state
+        )
+    )
+    assert records[0].kind == 'application'
+    assert all(record.application_id == app_id for record in records)
+    assert state.metrics['records'] == len(records)
+    assert state.metrics['failed'] == 0
@@ -18,3 +18,27 @@ def test_environment_group_get(cached_application, cached_environment_group):
     )
     assert isinstance(group_get, dict)
     assert group_get['name'] == cached_environment_group['name']
+
+
+def test_root_environment_group_memoized(cached_application, cached_environment_group):
+    application_id = cached_application['appContainerId']
+    root_id = britive.get_root_environment_group(application_id)
+    assert root_id == cached_environment_group['parentId']
+    assert application_id in britive._root_environment_groups
+    assert britive.get_root_environment_group(application_id) == root_id
+    britive.forget_root_environment_group(application_id)
+    assert application_id not in britive._root_environment_groups
+
+
+def test_topology(cached_application, cached_environment_group):
+    topology = britive.application_management.topology.get(cached_application['appContainerId'], refresh=True)
+    assert topology.environment_group(cached_environment_group['id'])['name'] == cached_environment_group['name']
+    assert cached_environment_group['id'] in topology.children()['environment_groups']
+    assert ('EnvironmentGroup', cached_environment_group['id'], 1) in list(topology.walk())
+    lookup = britive.application_management.topology.lookup
+    group = lookup(cached_application['appContainerId'], 'environment_group', cached_environment_group['id'])
+    assert group == britive.application_management.environment_groups.get(
+        cached_application['appContainerId'], cached_environment_group['id']
+    )
+    with pytest.raises(ValueError):
+        lookup(cached_application['appContainerId'], 'environment_groups', cached_environment_group['id'])
@@ -58,3 +58,15 @@ def test_diff_permissions(cached_application, cached_environment):
     )
     assert isinstance(response, list)
     assert len(response) > 0
+
+
+@pytest.mark.skipif(scan_skip, reason=scan_skip_message)
+def test_scan_and_wait(cached_application, cached_environment):
+    event = britive.application_management.scans.scan_and_wait(
+        application_id=cached_application['appContainerId'],
+        environment_id=cached_environment['id'],
+        diff=['accounts'],
+        poll_interval=10,
+    )
+    assert event['status'] == 'Success'
+    assert isinstance(event['diff']['accounts'], list)
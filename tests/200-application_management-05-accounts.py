@@ -81,3 +81,20 @@ def test_groups(cached_application, cached_environment, cached_account):
     )
 
     assert isinstance(groups, list)
+
+
+@pytest.mark.skipif(scan_skip, reason=scan_skip_message)
+def test_entitlement_graph(cached_application, cached_environment, cached_account):
+    graph = britive.application_management.entitlements.build(application_ids=[cached_application['appContainerId']])
+    permissions = graph.what_does(cached_account['accountId'], environment_id=cached_environment['id'])
+    assert len(permissions) > 0
+    assert cached_account['accountId'] in [a.id for a in graph.who_has(permissions[0].id)]
+
+
+@pytest.mark.skipif(scan_skip, reason=scan_skip_message)
+def test_entitlement_graph_update(cached_application):
+    entitlements = britive.application_management.entitlements
+    graph = entitlements.build(application_ids=[cached_application['appContainerId']])
+    report = entitlements.update(graph)
+    assert report['failed'] == []
+    assert report['environments'] + report['current'] == len(graph.watermarks)
@@ -18,6 +18,14 @@ def test_list(cached_profile):
     assert profiles[0]['name'].startswith('test')
 
 
+def test_list_all(cached_profile):
+    profiles = britive.application_management.profiles.list_all(
+        application_ids=[cached_profile['appContainerId']], include_permissions=True
+    )
+    profile = next(p for p in profiles if p['papId'] == cached_profile['papId'])
+    assert isinstance(profile['permissions'], list)
+
+
 def test_get(cached_profile):
     profile = britive.application_management.profiles.get(
         application_id=cached_profile['appContainerId'], profile_id=cached_profile['papId']
@@ -66,6 +74,14 @@ def test_add_single_environment_scope(cached_profile, cached_environment):
     assert response is None
 
 
+def test_bulk_scope(cached_profile, cached_environment):
+    profiles = britive.application_management.profiles
+    for change in ({'remove': [cached_environment['id']]}, {'add': [cached_environment['id']]}):
+        report = profiles.bulk_scope(profile_ids=[cached_profile['papId']], **change)
+        assert report['results'][0]['status'] == 'updated'
+        assert report['results'][0]['method'] == 'single'
+
+
 def test_disable(cached_profile):
     profile = britive.application_management.profiles.disable(
         application_id=cached_profile['appContainerId'], profile_id=cached_profile['papId']
@@ -268,6 +284,85 @@ def test_policies_update(cached_profile, cached_profile_policy):
     )
 
 
+def test_export(cached_profile, cached_profile_policy):
+    document = britive.application_management.profiles.export(
+        application_id=cached_profile['appContainerId'], profile_ids=[cached_profile['papId']]
+    )
+    assert document['failed'] == []
+    assert len(document['profiles']) == 1
+    assert document['profiles'][0]['profile']['papId'] == cached_profile['papId']
+    assert cached_profile_policy['id'] in [p['id'] for p in document['profiles'][0]['policies']]
+
+
+def test_import(cached_profile, cached_profile_policy):
+    profiles = britive.application_management.profiles
+    application_id = cached_profile['appContainerId']
+    document = profiles.export(application_id=application_id, profile_ids=[cached_profile['papId']])
+    entry = document['profiles'][0]
+    entry['profile']['name'] = f'{cached_profile["name"]}-import'
+    report = profiles.import_(document)
+    result = report['results'][0]
+    try:
+        assert result['status'] == 'imported', result['errors']
+        assert result['source_profile_id'] == cached_profile['papId']
+        assert result['profile_id'] != cached_profile['papId']
+        permissions = profiles.permissions.list_assigned(profile_id=result['profile_id'])
+        assert sorted((p['type'], p['name']) for p in permissions) == sorted(
+            (p['type'], p['name']) for p in entry['permissions']
+        )
+        policies = profiles.policies.list(profile_id=result['profile_id'])
+        assert sorted(p['name'] for p in policies) == sorted(p['name'] for p in entry['policies'])
+        assert cached_profile_policy['id'] not in [p['id'] for p in policies]
+    finally:
+        if result['profile_id']:
+            profiles.delete(application_id=application_id, profile_id=result['profile_id'])
+
+
+def test_plan_unchanged_export(cached_profile, cached_profile_policy):
+    profiles = britive.application_management.profiles
+    application_id = cached_profile['appContainerId']
+    document = profiles.export(application_id=application_id, profile_ids=[cached_profile['papId']])
+    assert cached_profile_policy['id'] in [p['id'] for p in document['profiles'][0]['policies']]
+    assert profiles.plan(application_id=application_id, desired=document['profiles']) == []
+
+
+def test_plan_and_apply(cached_profile):
+    profiles = britive.application_management.profiles
+    application_id = cached_profile['appContainerId']
+    original = profiles.get(application_id=application_id, profile_id=cached_profile['papId'])
+    desired = [{'profile': {'name': cached_profile['name'], 'description': 'reconciled'}}]
+    try:
+        plan = profiles.plan(application_id=application_id, desired=desired)
+        assert [(op['resource'], op['action']) for op in plan] == [('profile', 'update')]
+        report = profiles.apply(application_id=application_id, plan=plan)
+        assert report['metrics']['applied'] == 1
+        assert profiles.plan(application_id=application_id, desired=desired) == []
+    finally:
+        profiles.update(
+            application_id=application_id, profile_id=cached_profile['papId'], description=original['description']
+        )
+
+
+def test_plan_and_apply_scopes(cached_profile, cached_environment):
+    profiles = britive.application_management.profiles
+    application_id = cached_profile['appContainerId']
+    original = profiles.get_scopes(profile_id=cached_profile['papId'])
+    assert cached_environment['id'] in [scope['value'] for scope in original]
+    desired = [{'profile': {'name': cached_profile['name']}, 'scopes': []}]
+    try:
+        plan = profiles.plan(application_id=application_id, desired=desired)
+        assert [(op['resource'], op['action'], op['data']) for op in plan] == [('scopes', 'set', [])]
+        report = profiles.apply(application_id=application_id, plan=plan)
+        assert report['metrics']['applied'] == 1
+        assert profiles.get_scopes(profile_id=cached_profile['papId']) == []
+        assert profiles.plan(application_id=application_id, desired=desired) == []
+    finally:
+        profiles.set_scopes(
+            profile_id=cached_profile['papId'],
+            scopes=[{'type': scope['type'], 'value': scope['value']} for scope in original],
+        )
+
+
 def test_policies_delete(cached_profile, cached_profile_policy):
     try:
         assert (
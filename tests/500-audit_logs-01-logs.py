@@ -1,3 +1,4 @@
+import gzip
 from datetime import datetime, timedelta, timezone
 
 from .cache import britive
@@ -29,3 +30,48 @@ def test_query_csv():
         from_time=datetime.now(timezone.utc) - timedelta(1), to_time=datetime.now(timezone.utc), csv=True
     )
     assert '"timestamp","actor.display_name"' in csv
+
+
+def test_query_local_store():
+    now = datetime.now(timezone.utc)
+    to_time = now - timedelta(hours=1)
+    from_time = to_time - timedelta(1)
+    store = britive.audit_logs.logs.use_local_store()
+    try:
+        events = britive.audit_logs.logs.query(from_time=from_time, to_time=to_time)
+        assert store.missing_ranges(from_time, to_time) == []
+        assert len(britive.audit_logs.logs.query(from_time=from_time, to_time=to_time)) == len(events)
+        assert britive.audit_logs.logs.query(from_time=from_time, to_time=to_time, use_store=False) is not None
+        # the tail within the grace period is never recorded as fetched
+        britive.audit_logs.logs.query(from_time=from_time, to_time=now)
+        assert store.missing_ranges(from_time, now)[-1][1] == now.replace(microsecond=0)
+    finally:
+        britive.audit_logs.logs.store = None
+        store.close()
+
+
+def test_export_csv(tmp_path):
+    path = str(tmp_path / 'audit.csv.gz')
+    written = britive.audit_logs.logs.export(
+        path, from_time=datetime.now(timezone.utc) - timedelta(1), to_time=datetime.now(timezone.utc), compress=True
+    )
+    assert written > 0
+    with gzip.open(path, 'rt') as f:
+        assert '"timestamp","actor.display_name"' in f.readline()
+
+
+def test_query_jmespath_filter():
+    events = britive.audit_logs.logs.query(
+        from_time=datetime.now(timezone.utc) - timedelta(1),
+        to_time=datetime.now(timezone.utc),
+        jmespath_filter="contains(event.eventType, 'checkout')",
+    )
+    assert isinstance(events, list)
+    assert all('checkout' in event['event']['eventType'] for event in events)
+
+
+def test_iter():
+    events = britive.audit_logs.logs.iter(
+        from_time=datetime.now(timezone.utc) - timedelta(1), to_time=datetime.now(timezone.utc)
+    )
+    assert isinstance(next(events), dict)
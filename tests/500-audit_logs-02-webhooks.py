@@ -1,3 +1,5 @@
+from britive.audit_logs.receiver import send
+
 from .cache import *
 
 
@@ -6,3 +8,17 @@ def test_audit_logs_webhook_create(cached_audit_logs_webhook_create, cached_noti
     assert cached_audit_logs_webhook_create['notificationMediumId'] == cached_notification_medium_webhook['id']
     assert "contains('event.eventType', 'checkout')" in cached_audit_logs_webhook_create['filter']
     assert 'pysdktest-aws-audit-log-webhook' in cached_audit_logs_webhook_create['description']
+
+
+def test_audit_logs_webhook_receiver():
+    received = []
+    with britive.audit_logs.webhooks.receiver(token='pysdktest') as receiver:
+        receiver.on(received.append, event_type='audit', jmespath_filter="contains(event.eventType, 'checkout')")
+        payload = [
+            {'actor': {'displayName': 'pysdktest'}, 'event': {'eventType': 'profile.checkout'}},
+            {'actor': {'displayName': 'pysdktest'}, 'event': {'eventType': 'profile.checkin'}},
+        ]
+        assert send(receiver.url, payload, token='pysdktest') == 200
+        assert send(receiver.url, payload, token='invalid') == 401
+    assert len(received) == 1
+    assert received[0]['type'] == 'audit'